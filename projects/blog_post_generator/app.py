@@ -4,25 +4,84 @@ Blog Post Generator - Generates well-structured blog posts
 """
 
 import argparse
+import csv
+import json
 import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.jobs import JobQueue, pending_html, register_job_routes, submit_response
+from common.lazy import LazyResource
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.ratelimit import RateLimiter
+from common.serving import add_serve_arguments, serve
+
 load_dotenv()
 
+LENGTH_MAP = {"short": "500-700 words", "medium": "1000-1500 words", "long": "2000+ words"}
+
+# Target words and number of body sections per length for the sectioned pipeline
+SECTION_PLAN = {"short": (600, 3), "medium": (1250, 5), "long": (2400, 7)}
+
+# Lengths written outline-first with sections in parallel (BLOG_SECTIONED_LENGTHS, default "long")
+SECTIONED_LENGTHS = {l.strip() for l in os.getenv("BLOG_SECTIONED_LENGTHS", "long").split(",") if l.strip()}
+
+SYSTEM_PROMPT = "You are an expert blog writer and content creator. Write engaging, well-structured blog posts."
+
+
 class BlogPostGenerator:
-    def __init__(self):
-        """Initialize the blog post generator."""
+    def __init__(self, cache: Optional[ResponseCache] = None, section_workers: Optional[int] = None,
+                 coherence_pass: Optional[bool] = None, rate_limiter: Optional[RateLimiter] = None):
+        """Initialize the blog post generator; rate_limiter, if given, paces every API call."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else ResponseCache.from_env("blog_post_generator")
+        self.section_workers = section_workers or int(os.getenv("BLOG_SECTION_WORKERS", "8"))
+        if coherence_pass is None:
+            coherence_pass = os.getenv("BLOG_COHERENCE_PASS", "").strip().lower() in ("1", "true", "yes", "on")
+        self.coherence_pass = coherence_pass
+        self.rate_limiter = rate_limiter
+
+    def _complete(self, prompt: str, max_tokens: int, temperature: float = 0.8) -> str:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        response = chat_completion(
+            self.client, self.cache, tool="blog_post_generator",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content.strip()
 
     def generate(self, topic: str, length: str = "medium", 
-                 style: str = "professional", keywords: str = "") -> str:
-        """Generate a blog post."""
-        length_map = {"short": "500-700 words", "medium": "1000-1500 words", "long": "2000+ words"}
-        word_count = length_map.get(length, "1000-1500 words")
+                 style: str = "professional", keywords: str = "",
+                 sectioned: Optional[bool] = None) -> str:
+        """Generate a blog post.
+
+        Lengths in SECTIONED_LENGTHS (or sectioned=True) are written outline-first
+        with the sections in parallel; the rest in a single completion.
+        """
+        if sectioned is None:
+            sectioned = length in SECTIONED_LENGTHS
+        if sectioned:
+            return self.generate_sectioned(topic, length, style, keywords)
+
+        word_count = LENGTH_MAP.get(length, "1000-1500 words")
         
         prompt = f"""Write a comprehensive, well-structured blog post on the topic: "{topic}"
 
@@ -36,17 +95,324 @@ Requirements:
 
 Generate the complete blog post:"""
         
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert blog writer and content creator. Write engaging, well-structured blog posts."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,
-            max_tokens=2000
-        )
-        
-        return response.choices[0].message.content.strip()
+        return self._complete(prompt, max_tokens=2000)
+
+    def outline(self, topic: str, length: str = "long", style: str = "professional",
+                keywords: str = "") -> dict:
+        """Plan the post: {"title": ..., "sections": [{"heading", "points", "words"}]}."""
+        total_words, body_sections = SECTION_PLAN.get(length, SECTION_PLAN["medium"])
+        prompt = f"""Plan a blog post on the topic: "{topic}"
+
+Requirements:
+- Total length: about {total_words} words
+- Style: {style}
+- Keywords to include: {keywords or 'None specified'}
+- An Introduction section, {body_sections} body sections and a Conclusion section
+
+Respond with JSON only, in this shape:
+{{"title": "Engaging SEO-friendly title", "sections": [{{"heading": "Section heading", "points": ["key point", "key point"], "words": 300}}]}}"""
+        text = self._complete(prompt, max_tokens=800, temperature=0.7)
+        return parse_outline(text, topic)
+
+    def write_section(self, topic: str, outline: dict, index: int, style: str = "professional",
+                      keywords: str = "") -> str:
+        """Write one section of an outline, knowing the rest of the plan to avoid overlap."""
+        section = outline["sections"][index]
+        plan = "\n".join(f"{i + 1}. {s['heading']}" for i, s in enumerate(outline["sections"]))
+        points = "\n".join(f"- {point}" for point in section["points"]) or "- Use your judgement"
+        words = section["words"]
+        prompt = f"""You are writing one section of the blog post "{outline['title']}" on the topic: "{topic}"
+
+Full outline:
+{plan}
+
+Write only section {index + 1}, "{section['heading']}":
+{points}
+
+Requirements:
+- Length: about {words} words
+- Style: {style}
+- Keywords to include where natural: {keywords or 'None specified'}
+- Start with the heading "## {section['heading']}" and use proper markdown formatting
+- Do not repeat material that belongs to other sections of the outline
+
+Write the section:"""
+        return self._complete(prompt, max_tokens=min(4000, max(400, words * 2)))
+
+    def generate_sectioned(self, topic: str, length: str = "long", style: str = "professional",
+                           keywords: str = "") -> str:
+        """Outline, write every section concurrently, then assemble in outline order.
+
+        Wall-clock time is about the outline plus the slowest section, and no single
+        completion has to fit the whole post into its token limit.
+        """
+        outline = self.outline(topic, length, style, keywords)
+        count = len(outline["sections"])
+        with ThreadPoolExecutor(max_workers=max(1, min(self.section_workers, count))) as pool:
+            sections = list(pool.map(
+                lambda i: self.write_section(topic, outline, i, style, keywords), range(count)))
+        sections = [ensure_heading(text, s["heading"]) for text, s in zip(sections, outline["sections"])]
+        if self.coherence_pass and count > 1:
+            sections = self.smooth(outline, sections)
+        return f"# {outline['title']}\n\n" + "\n\n".join(sections)
+
+    def smooth(self, outline: dict, sections: List[str]) -> List[str]:
+        """Short coherence pass: one transition sentence at the start of each section after the first.
+
+        Only the sentences are generated, so the pass stays short however long the post is.
+        """
+        draft = "\n\n".join(sections)
+        prompt = f"""The blog post "{outline['title']}" below was written section by section.
+
+{draft}
+
+For each section after the first, write one sentence to open it that links it smoothly to the section before.
+Respond with JSON only: {{"transitions": ["sentence for section 2", "sentence for section 3"]}} ({len(sections) - 1} sentences)."""
+        try:
+            transitions = json.loads(extract_json(self._complete(prompt, max_tokens=60 * len(sections), temperature=0.5)))
+            transitions = transitions.get("transitions", [])
+        except (ValueError, AttributeError):
+            return sections
+        if not isinstance(transitions, list):
+            return sections
+        transitions = [t if isinstance(t, str) else "" for t in transitions]
+        smoothed = sections[:1]
+        for text, sentence in zip(sections[1:], transitions + [""] * len(sections)):
+            heading, _, body = text.partition("\n")
+            smoothed.append(f"{heading}\n\n{sentence.strip()} {body.strip()}" if sentence.strip() else text)
+        return smoothed
+
+
+def extract_json(text: str) -> str:
+    """The JSON object in a completion, without any code fence or surrounding prose."""
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if start != -1 and end > start else text
+
+
+def clean_section(section: dict) -> Optional[dict]:
+    """A section with a string heading, a list of string points and an integer word count.
+
+    The model does not always follow the requested shape ("points": "one point",
+    "words": "about 300"), so each field falls back to a sensible default.
+    """
+    heading = section.get("heading")
+    if not isinstance(heading, (str, int, float)) or not str(heading).strip():
+        return None
+    points = section.get("points")
+    if isinstance(points, str):
+        points = [points]
+    elif not isinstance(points, list):
+        points = []
+    words = section.get("words")
+    if isinstance(words, str):
+        match = re.search(r"\d+", words)
+        words = int(match.group()) if match else None
+    elif not isinstance(words, (int, float)) or isinstance(words, bool):
+        words = None
+    return {"heading": str(heading).strip(),
+            "points": [str(p).strip() for p in points if isinstance(p, (str, int, float)) and str(p).strip()],
+            "words": max(50, min(3000, int(words))) if words else 300}
+
+
+def parse_outline(text: str, topic: str) -> dict:
+    """Parse an outline completion, falling back to its markdown headings or numbered lines."""
+    try:
+        outline = json.loads(extract_json(text))
+        sections = outline.get("sections")
+        sections = [clean_section(s) for s in sections if isinstance(s, dict)] if isinstance(sections, list) else []
+        sections = [s for s in sections if s]
+        if sections:
+            title = outline.get("title")
+            return {"title": title.strip() if isinstance(title, str) and title.strip() else topic,
+                    "sections": sections}
+    except (ValueError, AttributeError):
+        pass
+    headings = [re.sub(r"^(#+|\d+[.)]|[-*])\s*", "", line).strip()
+                for line in text.splitlines() if re.match(r"^\s*(#{2,}|\d+[.)]|[-*])\s+\S", line)]
+    headings = [h for h in headings if h] or ["Introduction", topic, "Conclusion"]
+    return {"title": topic, "sections": [{"heading": h, "points": [], "words": 300} for h in headings]}
+
+
+def ensure_heading(text: str, heading: str) -> str:
+    """Make a section start with its own level-2 heading."""
+    first = text.lstrip().split("\n", 1)[0]
+    if first.startswith("#"):
+        rest = text.lstrip().split("\n", 1)[1] if "\n" in text.lstrip() else ""
+        return f"## {first.lstrip('#').strip()}\n{rest}"
+    return f"## {heading}\n\n{text}"
+
+
+TOPIC_FIELDS = ("topic", "length", "style", "keywords")
+
+
+def read_topics(path: str) -> List[dict]:
+    """Read topic rows (topic, length, style, keywords) from a CSV or JSONL file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if Path(path).suffix.lower() in (".jsonl", ".ndjson", ".json"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    return [{k: str(v).strip() for k, v in row.items() if k and v is not None}
+            for row in rows if str(row.get("topic") or "").strip()]
+
+
+def slugify(text: str, max_length: int = 80) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug[:max_length].rstrip("-") or "post"
+
+
+def output_paths(rows: List[dict], output_dir: str) -> List[Path]:
+    """One stable .md path per row, so reruns find earlier output.
+
+    A row's own "slug" is used as given; rows without one get the topic's slug,
+    with -2, -3, ... for repeats in row order, skipping names taken by explicit slugs.
+    """
+    taken = {slugify(row["slug"]) for row in rows if row.get("slug")}
+    paths, seen = [], {}
+    for row in rows:
+        if row.get("slug"):
+            name = slugify(row["slug"])
+        else:
+            slug = slugify(row["topic"])
+            name = slug
+            while name in taken:
+                seen[slug] = seen.get(slug, 1) + 1
+                name = f"{slug}-{seen[slug]}"
+            taken.add(name)
+        paths.append(Path(output_dir) / f"{name}.md")
+    return paths
+
+
+def generate_batch(generator: "BlogPostGenerator", rows: List[dict], output_dir: str, concurrency: int = 4,
+                   sectioned: Optional[bool] = None, failures_path: Optional[str] = None) -> dict:
+    """Generate a post per row, concurrency at a time, writing each as soon as it is done.
+
+    Rows whose output file already exists are skipped, so an interrupted run can be
+    resumed by running it again. Failed rows are written to failures_path (default
+    failures.jsonl in output_dir) with their error and resolved slug; the file is
+    itself a valid --topics-file for retrying just those, into the same paths.
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    failures_path = Path(failures_path or output / "failures.jsonl")
+    todo = [(row, path) for row, path in zip(rows, output_paths(rows, output_dir)) if not path.exists()]
+    summary = {"total": len(rows), "skipped": len(rows) - len(todo), "written": 0, "failed": 0}
+
+    def run(row: dict, path: Path) -> float:
+        start = time.perf_counter()
+        post = generator.generate(row["topic"], row.get("length") or "medium",
+                                  row.get("style") or "professional", row.get("keywords") or "",
+                                  sectioned=sectioned)
+        partial = path.with_name(path.name + ".part")
+        partial.write_text(post, encoding="utf-8")
+        partial.replace(path)
+        return time.perf_counter() - start
+
+    with open(failures_path, "w", encoding="utf-8") as failures, \
+            ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(run, row, path): (row, path) for row, path in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            row, path = futures[future]
+            try:
+                seconds = future.result()
+                summary["written"] += 1
+                print(f"✅ [{done}/{len(todo)}] {path.name} ({seconds:.1f}s)")
+            except Exception as e:
+                summary["failed"] += 1
+                failures.write(json.dumps(dict(row, slug=path.stem, error=str(e))) + "\n")
+                failures.flush()
+                print(f"❌ [{done}/{len(todo)}] {row['topic']}: {e}")
+    if not summary["failed"]:
+        failures_path.unlink(missing_ok=True)
+    return summary
+
+
+# Lengths generated in the background by the web app (BLOG_QUEUED_LENGTHS, default "long")
+QUEUED_LENGTHS = {length.strip() for length in os.getenv("BLOG_QUEUED_LENGTHS", "long").split(",")
+                  if length.strip()}
+
+
+def create_app():
+    """Build the web app; the generator is created on the first request.
+
+    Long posts go through a background job queue instead of holding the request open.
+    """
+    from flask import Flask, request, render_template_string, jsonify
+
+    app = Flask(__name__)
+    instrument_app(app, "blog_post_generator")
+    generator = LazyResource(BlogPostGenerator, "blog_post_generator")
+    jobs = JobQueue.from_env("blog_post_generator")
+    register_job_routes(app, jobs)
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Blog Post Generator</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 1000px; margin: 50px auto; padding: 20px; }
+            input, textarea, select { width: 100%; padding: 10px; margin: 5px 0; }
+            button { padding: 12px 24px; background: #28a745; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
+        </style>
+    </head>
+    <body>
+        <h1>✍️ Blog Post Generator</h1>
+        <form method="POST">
+            <input type="text" name="topic" placeholder="Blog post topic" required>
+            <select name="length">
+                <option value="short">Short (500-700 words)</option>
+                <option value="medium" selected>Medium (1000-1500 words)</option>
+                <option value="long">Long (2000+ words)</option>
+            </select>
+            <select name="style">
+                <option value="professional">Professional</option>
+                <option value="casual">Casual</option>
+                <option value="academic">Academic</option>
+                <option value="conversational">Conversational</option>
+            </select>
+            <input type="text" name="keywords" placeholder="SEO keywords (optional, comma-separated)">
+            <button type="submit">Generate Blog Post</button>
+        </form>
+        {% if post %}
+        <div class="result">{{ post }}</div>
+        {% endif %}
+        {% if pending %}{{ pending }}{% endif %}
+        {% if error %}
+        <div class="result"><strong>Error:</strong> {{ error }}</div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    def form_args():
+        data = request.get_json(silent=True) or request.form
+        return (data.get('topic', ''), data.get('length', 'medium'),
+                data.get('style', 'professional'), data.get('keywords', ''))
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            topic, length, style, keywords = form_args()
+            try:
+                if length in QUEUED_LENGTHS:
+                    job_id = jobs.submit(lambda: generator.get().generate(topic, length, style, keywords))
+                    return render_template_string(HTML_TEMPLATE, pending=pending_html(job_id))
+                post = generator.get().generate(topic, length, style, keywords)
+                return render_template_string(HTML_TEMPLATE, post=post)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    @app.route('/jobs', methods=['POST'])
+    def create_job():
+        topic, length, style, keywords = form_args()
+        if not topic:
+            return jsonify({'error': 'Topic is required'}), 400
+        return submit_response(jobs, lambda: generator.get().generate(topic, length, style, keywords))
+
+    return app
 
 
 def main():
@@ -58,74 +424,48 @@ def main():
                        help="Writing style")
     parser.add_argument("--keywords", "-k", type=str, default="", help="SEO keywords (comma-separated)")
     parser.add_argument("--output", "-o", type=str, help="Output file (optional)")
+    parser.add_argument("--mode", type=str, default="auto", choices=["auto", "single", "sectioned"],
+                       help="single completion, or outline then parallel sections (auto: sectioned for BLOG_SECTIONED_LENGTHS)")
+    parser.add_argument("--coherence", action="store_true", help="Add transitions between parallel sections")
+    parser.add_argument("--topics-file", type=str, help="CSV or JSONL of topics (topic, length, style, keywords) to generate in bulk")
+    parser.add_argument("--output-dir", type=str, default="posts", help="Directory for --topics-file posts (one .md each)")
+    parser.add_argument("--concurrency", "-c", type=int, default=4, help="Posts generated at once with --topics-file")
+    parser.add_argument("--rate-limit", type=float, default=float(os.getenv("BLOG_RATE_LIMIT", "60")),
+                       help="Max API calls per minute with --topics-file (0 for no limit)")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string
-        
-        app = Flask(__name__)
-        generator = BlogPostGenerator()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Blog Post Generator</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 1000px; margin: 50px auto; padding: 20px; }
-                input, textarea, select { width: 100%; padding: 10px; margin: 5px 0; }
-                button { padding: 12px 24px; background: #28a745; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
-            </style>
-        </head>
-        <body>
-            <h1>✍️ Blog Post Generator</h1>
-            <form method="POST">
-                <input type="text" name="topic" placeholder="Blog post topic" required>
-                <select name="length">
-                    <option value="short">Short (500-700 words)</option>
-                    <option value="medium" selected>Medium (1000-1500 words)</option>
-                    <option value="long">Long (2000+ words)</option>
-                </select>
-                <select name="style">
-                    <option value="professional">Professional</option>
-                    <option value="casual">Casual</option>
-                    <option value="academic">Academic</option>
-                    <option value="conversational">Conversational</option>
-                </select>
-                <input type="text" name="keywords" placeholder="SEO keywords (optional, comma-separated)">
-                <button type="submit">Generate Blog Post</button>
-            </form>
-            {% if post %}
-            <div class="result">{{ post }}</div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                topic = request.form.get('topic', '')
-                length = request.form.get('length', 'medium')
-                style = request.form.get('style', 'professional')
-                keywords = request.form.get('keywords', '')
-                try:
-                    post = generator.generate(topic, length, style, keywords)
-                    return render_template_string(HTML_TEMPLATE, post=post)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
+    elif args.topics_file:
+        try:
+            rows = read_topics(args.topics_file)
+            generator = BlogPostGenerator(coherence_pass=args.coherence or None,
+                                          rate_limiter=RateLimiter.per_minute(args.rate_limit))
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+        sectioned = None if args.mode == "auto" else args.mode == "sectioned"
+        summary = generate_batch(generator, rows, args.output_dir, args.concurrency, sectioned)
+        print(f"📚 {summary['written']} written, {summary['skipped']} already done, {summary['failed']} failed "
+              f"(of {summary['total']}) in {args.output_dir}")
+        if summary["failed"]:
+            print(f"   Failures recorded in {Path(args.output_dir) / 'failures.jsonl'}; rerun to retry them")
+            return 1
+    
     elif args.topic:
         try:
-            generator = BlogPostGenerator()
-            post = generator.generate(args.topic, args.length, args.style, args.keywords)
+            generator = BlogPostGenerator(coherence_pass=args.coherence or None)
+            sectioned = None if args.mode == "auto" else args.mode == "sectioned"
+            post = generator.generate(args.topic, args.length, args.style, args.keywords, sectioned=sectioned)
             
             if args.output:
                 with open(args.output, 'w', encoding='utf-8') as f:
@@ -24,3 +24,123 @@ def test_generate():
         result = generator.generate("Test Topic")
         assert len(result) > 0
 
+
+
+def completion(text):
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = text
+    response.usage = None
+    return response
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_generate_sectioned_writes_sections_in_parallel_and_in_order():
+    """Test the outline, concurrent sections and assembly in outline order."""
+    import json
+    import threading
+    import time
+    from common.llm_cache import CacheConfig, ResponseCache
+
+    outline = {"title": "Test Title", "sections": [
+        {"heading": "Introduction", "points": ["hook"], "words": 100},
+        {"heading": "Body", "points": ["detail"], "words": 200},
+        {"heading": "Conclusion", "points": ["wrap up"], "words": 100},
+    ]}
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def create(**params):
+        prompt = params["messages"][-1]["content"]
+        if prompt.startswith("Plan a blog post"):
+            return completion("```json\n" + json.dumps(outline) + "\n```")
+        if "transitions" in prompt:
+            return completion('{"transitions": ["Next, the body.", "Finally, wrapping up."]}')
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        heading = prompt.split('Write only section ')[1].split('"')[1]
+        return completion(f"## {heading}\n\nText for {heading}.")
+
+    generator = BlogPostGenerator(cache=ResponseCache(CacheConfig(enabled=False)), coherence_pass=True)
+    with patch.object(generator.client.chat.completions, 'create', side_effect=create):
+        post = generator.generate("Test Topic", length="long")
+
+    assert post.startswith("# Test Title")
+    assert post.index("## Introduction") < post.index("## Body") < post.index("## Conclusion")
+    assert "## Body\n\nNext, the body. Text for Body." in post
+    assert peak[0] > 1
+
+
+def test_parse_outline_falls_back_to_headings():
+    """Test that a non-JSON outline still yields sections."""
+    from app import parse_outline
+    outline = parse_outline("## Why it matters\n## How to start\nSome prose", "Topic")
+    assert outline["title"] == "Topic"
+    assert [s["heading"] for s in outline["sections"]] == ["Why it matters", "How to start"]
+
+    # Fields of the wrong type fall back to defaults instead of failing later
+    outline = parse_outline('{"title": 7, "sections": [{"heading": "Intro", "points": "one point", '
+                            '"words": "about 250"}, {"heading": "Body", "points": {"a": 1}, "words": "many"}, '
+                            '{"points": ["no heading"]}]}', "Topic")
+    assert outline == {"title": "Topic", "sections": [
+        {"heading": "Intro", "points": ["one point"], "words": 250},
+        {"heading": "Body", "points": [], "words": 300}]}
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_smooth_ignores_malformed_transitions():
+    """Test that a coherence pass returning the wrong shape leaves the sections as written."""
+    generator = BlogPostGenerator()
+    sections = ["## Intro\n\nHello.", "## Body\n\nMore."]
+    with patch.object(generator.client.chat.completions, 'create',
+                      return_value=completion('{"transitions": "Next up."}')):
+        assert generator.smooth({"title": "T"}, sections) == sections
+
+
+def test_generate_batch_writes_posts_records_failures_and_resumes(tmp_path):
+    """Test a topics file run: one file per post, failures recorded, reruns skip finished posts."""
+    from app import generate_batch, read_topics
+    topics = tmp_path / "topics.csv"
+    topics.write_text("topic,length,style,keywords\nAI in Healthcare,short,casual,\nBad Topic,long,,\nAI in Healthcare,medium,,\n")
+    rows = read_topics(str(topics))
+    assert rows[0] == {"topic": "AI in Healthcare", "length": "short", "style": "casual", "keywords": ""}
+
+    def generate(topic, *args, **kwargs):
+        if topic == "Bad Topic":
+            raise RuntimeError("upstream 500")
+        return f"# {topic}"
+
+    generator = Mock()
+    generator.generate.side_effect = generate
+    out = tmp_path / "posts"
+    summary = generate_batch(generator, rows, str(out), concurrency=3)
+    assert summary == {"total": 3, "skipped": 0, "written": 2, "failed": 1}
+    assert (out / "ai-in-healthcare.md").read_text() == "# AI in Healthcare"
+    assert (out / "ai-in-healthcare-2.md").exists()
+    failures = read_topics(str(out / "failures.jsonl"))
+    assert failures[0]["topic"] == "Bad Topic" and "upstream 500" in failures[0]["error"]
+
+    generator.generate.side_effect = lambda topic, *args, **kwargs: f"# {topic}"
+    summary = generate_batch(generator, rows, str(out))
+    assert summary == {"total": 3, "skipped": 2, "written": 1, "failed": 0}
+    assert not (out / "failures.jsonl").exists()
+
+    # A failed repeat of a topic is retried from failures.jsonl into its own -2 file
+    (out / "ai-in-healthcare-2.md").unlink()
+
+    def medium_times_out(topic, length, *args, **kwargs):
+        if length == "medium":
+            raise RuntimeError("timeout")
+        return f"# {topic}"
+
+    generator.generate.side_effect = medium_times_out
+    generate_batch(generator, rows, str(out))
+    failures = read_topics(str(out / "failures.jsonl"))
+    assert failures[0]["slug"] == "ai-in-healthcare-2"
+    generator.generate.side_effect = lambda topic, *args, **kwargs: f"# {topic}"
+    summary = generate_batch(generator, failures, str(out))
+    assert summary == {"total": 1, "skipped": 0, "written": 1, "failed": 0}
+    assert (out / "ai-in-healthcare-2.md").exists()
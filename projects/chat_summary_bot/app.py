@@ -4,17 +4,27 @@ Chat Summary Bot - Summarizes chat logs and transcripts using GPT
 """
 
 import os
+import sys
 import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.serving import add_serve_arguments, serve
+
 # Load environment variables
 load_dotenv()
 
 # Initialize OpenAI client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# Opt-in response cache (see LLM_CACHE_* in projects/common/README.md)
+cache = ResponseCache.from_env("chat_summary_bot")
+
 
 def read_chat_file(file_path: str) -> str:
     """Read chat content from a file."""
@@ -35,7 +45,8 @@ def summarize_chat(chat_content: str, model: str = "gpt-3.5-turbo") -> str:
     
     Summary:"""
     
-    response = client.chat.completions.create(
+    response = chat_completion(
+        client, cache, tool="chat_summary_bot",
         model=model,
         messages=[
             {"role": "system", "content": "You are a helpful assistant that summarizes conversations and transcripts."},
@@ -48,60 +59,71 @@ def summarize_chat(chat_content: str, model: str = "gpt-3.5-turbo") -> str:
     return response.choices[0].message.content.strip()
 
 
+def create_app(model: str = "gpt-3.5-turbo"):
+    """Build the web app."""
+    from flask import Flask, request, render_template_string, jsonify
+    app = Flask(__name__)
+    instrument_app(app, "chat_summary_bot")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Chat Summary Bot</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
+            textarea { width: 100%; height: 300px; margin: 10px 0; }
+            button { padding: 10px 20px; background: #007bff; color: white; border: none; cursor: pointer; }
+            button:hover { background: #0056b3; }
+            .summary { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; }
+        </style>
+    </head>
+    <body>
+        <h1>🧠 Chat Summary Bot</h1>
+        <form method="POST">
+            <textarea name="chat_content" placeholder="Paste your chat or transcript here..."></textarea>
+            <br>
+            <button type="submit">Generate Summary</button>
+        </form>
+        {% if summary %}
+        <div class="summary">
+            <h2>Summary:</h2>
+            <p>{{ summary }}</p>
+        </div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            chat_content = request.form.get('chat_content', '')
+            try:
+                summary = summarize_chat(chat_content, model)
+                return render_template_string(HTML_TEMPLATE, summary=summary)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    return app
+
+
 def main():
     parser = argparse.ArgumentParser(description="Summarize chat logs and transcripts using GPT")
     parser.add_argument("--input", "-i", type=str, help="Input chat file path")
     parser.add_argument("--output", "-o", type=str, help="Output summary file path (optional)")
     parser.add_argument("--model", "-m", type=str, default="gpt-3.5-turbo", help="OpenAI model to use")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(lambda: create_app(args.model), args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string, jsonify
-        app = Flask(__name__)
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Chat Summary Bot</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
-                textarea { width: 100%; height: 300px; margin: 10px 0; }
-                button { padding: 10px 20px; background: #007bff; color: white; border: none; cursor: pointer; }
-                button:hover { background: #0056b3; }
-                .summary { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; }
-            </style>
-        </head>
-        <body>
-            <h1>🧠 Chat Summary Bot</h1>
-            <form method="POST">
-                <textarea name="chat_content" placeholder="Paste your chat or transcript here..."></textarea>
-                <br>
-                <button type="submit">Generate Summary</button>
-            </form>
-            {% if summary %}
-            <div class="summary">
-                <h2>Summary:</h2>
-                <p>{{ summary }}</p>
-            </div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                chat_content = request.form.get('chat_content', '')
-                try:
-                    summary = summarize_chat(chat_content, args.model)
-                    return render_template_string(HTML_TEMPLATE, summary=summary)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app(args.model)
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
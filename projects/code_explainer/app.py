@@ -5,40 +5,147 @@ Code Explainer - Explains code in plain English
 
 import argparse
 import os
+import sys
+import textwrap
+from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.serving import add_serve_arguments, serve
+
 load_dotenv()
 
+# Low enough for the response cache's default policy (LLM_CACHE_MAX_TEMPERATURE=0.3):
+# an explanation should read the same every time the same code is explained
+TEMPERATURE = 0.3
+
+
+def normalize_code(code: str) -> str:
+    """Code with layout-only differences removed: line endings, trailing spaces, blank lines, common indent.
+
+    Everything else, operators and names included, is kept, since any of it can change
+    what the code does.
+    """
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+    return textwrap.dedent("\n".join(line for line in lines if line))
+
+
+def explain_messages(code: str, language: str) -> list:
+    """The chat messages asking for an explanation of code."""
+    prompt = f"""Explain the following code in plain English. Break down what it does step by step, explain the logic, and highlight any important patterns or concepts.
+
+Code:
+```{language}
+{code}
+```
+
+Provide a clear, comprehensive explanation:"""
+    return [
+        {"role": "system", "content": "You are an expert programming instructor. Explain code clearly and comprehensively."},
+        {"role": "user", "content": prompt}
+    ]
+
+
 class CodeExplainer:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None):
         """Initialize the code explainer."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else ResponseCache.from_env("code_explainer")
 
     def explain(self, code: str, language: str = "auto") -> str:
-        """Explain code in plain English."""
-        prompt = f"""Explain the following code in plain English. Break down what it does step by step, explain the logic, and highlight any important patterns or concepts.
+        """Explain code in plain English.
 
-Code:
-```{language}
-{code}
-```
+        With the response cache on, an explanation is reused for the same code up to
+        layout (see normalize_code). Matching is exact: code that differs in a single
+        operator is a different program, so similarity matching is never used here.
+        """
+        model = "gpt-3.5-turbo"
+        key = None
+        if self.cache.should_cache(TEMPERATURE):
+            # Keyed on every request parameter, with the code normalized
+            key = self.cache.key_for(model, explain_messages(normalize_code(code), language), TEMPERATURE, None)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached.content
 
-Provide a clear, comprehensive explanation:"""
-        
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert programming instructor. Explain code clearly and comprehensively."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
+        # No cache here: the explanation is stored under the normalized key below
+        response = chat_completion(
+            self.client, None, tool="code_explainer",
+            model=model,
+            messages=explain_messages(code, language),
+            temperature=TEMPERATURE
         )
         
-        return response.choices[0].message.content.strip()
+        explanation = response.choices[0].message.content.strip()
+        if key is not None:
+            self.cache.put(key, explanation, getattr(response, "usage", None))
+        return explanation
+
+
+def create_app():
+    """Build the web app; the explainer is created on the first request."""
+    from flask import Flask, request, render_template_string
+
+    app = Flask(__name__)
+    instrument_app(app, "code_explainer")
+    explainer = LazyResource(CodeExplainer, "code_explainer")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Code Explainer</title>
+        <style>
+            body { font-family: 'Courier New', monospace; max-width: 1000px; margin: 50px auto; padding: 20px; }
+            textarea { width: 100%; height: 300px; margin: 10px 0; font-family: monospace; }
+            select, button { padding: 10px; margin: 5px; }
+            button { background: #007bff; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
+        </style>
+    </head>
+    <body>
+        <h1>💻 Code Explainer</h1>
+        <form method="POST">
+            <textarea name="code" placeholder="Paste your code here..." required></textarea>
+            <select name="language">
+                <option value="auto">Auto-detect</option>
+                <option value="python">Python</option>
+                <option value="javascript">JavaScript</option>
+                <option value="java">Java</option>
+                <option value="cpp">C++</option>
+                <option value="go">Go</option>
+            </select>
+            <button type="submit">Explain Code</button>
+        </form>
+        {% if explanation %}
+        <div class="result">{{ explanation }}</div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            code = request.form.get('code', '')
+            language = request.form.get('language', 'auto')
+            try:
+                explanation = explainer.get().explain(code, language)
+                return render_template_string(HTML_TEMPLATE, explanation=explanation)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    return app
 
 
 def main():
@@ -47,61 +154,15 @@ def main():
     parser.add_argument("--code", "-c", type=str, help="Code string to explain")
     parser.add_argument("--language", "-l", type=str, default="auto", help="Programming language")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string
-        
-        app = Flask(__name__)
-        explainer = CodeExplainer()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Code Explainer</title>
-            <style>
-                body { font-family: 'Courier New', monospace; max-width: 1000px; margin: 50px auto; padding: 20px; }
-                textarea { width: 100%; height: 300px; margin: 10px 0; font-family: monospace; }
-                select, button { padding: 10px; margin: 5px; }
-                button { background: #007bff; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
-            </style>
-        </head>
-        <body>
-            <h1>💻 Code Explainer</h1>
-            <form method="POST">
-                <textarea name="code" placeholder="Paste your code here..." required></textarea>
-                <select name="language">
-                    <option value="auto">Auto-detect</option>
-                    <option value="python">Python</option>
-                    <option value="javascript">JavaScript</option>
-                    <option value="java">Java</option>
-                    <option value="cpp">C++</option>
-                    <option value="go">Go</option>
-                </select>
-                <button type="submit">Explain Code</button>
-            </form>
-            {% if explanation %}
-            <div class="result">{{ explanation }}</div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                code = request.form.get('code', '')
-                language = request.form.get('language', 'auto')
-                try:
-                    explanation = explainer.explain(code, language)
-                    return render_template_string(HTML_TEMPLATE, explanation=explanation)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
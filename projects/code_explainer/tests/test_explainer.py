@@ -24,3 +24,30 @@ def test_explain():
         result = explainer.explain("print('hello')")
         assert "hello" in result.lower()
 
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_explain_cache_is_exact():
+    """Test that reformatted code reuses an explanation but code with another operator does not."""
+    from common.llm_cache import CacheConfig, ResponseCache
+    explainer = CodeExplainer(cache=ResponseCache(CacheConfig(enabled=True, db_path=None)))
+    with patch.object(explainer.client.chat.completions, 'create') as mock_create:
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Adds two numbers"
+        mock_create.return_value = mock_response
+
+        explainer.explain("def add(a, b):\n    return a + b\n", "python")
+        assert explainer.explain("    def add(a, b):   \r\n\n        return a + b", "python") == "Adds two numbers"
+        assert mock_create.call_count == 1
+
+        mock_response.choices[0].message.content = "Multiplies two numbers"
+        assert explainer.explain("def add(a, b):\n    return a * b\n", "python") == "Multiplies two numbers"
+        assert mock_create.call_count == 2
+
+    # The cache's temperature policy applies: a stricter limit means no reuse
+    strict = CodeExplainer(cache=ResponseCache(CacheConfig(enabled=True, max_temperature=0.0, db_path=None)))
+    with patch.object(strict.client.chat.completions, 'create', return_value=mock_response) as mock_create:
+        strict.explain("x = 1", "python")
+        strict.explain("x = 1", "python")
+        assert mock_create.call_count == 2 and mock_create.call_args.kwargs["temperature"] == 0.3
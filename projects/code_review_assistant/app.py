@@ -4,23 +4,52 @@ Code Review Assistant - Provides AI-powered code reviews
 """
 
 import argparse
+import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.serving import add_serve_arguments, serve
+from common.tokens import chunk_by_tokens, count_message_tokens, count_tokens, prompt_budget
+from units import Unit, file_units, iter_source_files
+
 load_dotenv()
 
+SEVERITIES = ("high", "medium", "low", "note")
+# Tokens of a unit's heading and code fence in the batch prompt
+UNIT_HEADER_TOKENS = 40
+
 class CodeReviewAssistant:
-    def __init__(self):
-        """Initialize the code review assistant."""
+    def __init__(self, cache: Optional[ResponseCache] = None, workers: Optional[int] = None,
+                 batch_tokens: Optional[int] = None):
+        """Initialize the code review assistant.
+
+        Directory reviews pack code units into prompts of about batch_tokens
+        (REVIEW_BATCH_TOKENS) and run up to workers (REVIEW_WORKERS) prompts at once.
+        """
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else ResponseCache.from_env("code_review_assistant")
+        self.model = "gpt-3.5-turbo"
+        self.system_prompt = "You are an expert code reviewer. Provide constructive, detailed code reviews."
+        self.max_tokens = 1500
+        self.workers = workers or int(os.getenv("REVIEW_WORKERS", "4"))
+        self.batch_tokens = batch_tokens or int(os.getenv("REVIEW_BATCH_TOKENS", "3000"))
 
-    def review(self, code: str, language: str = "auto") -> str:
-        """Review code and provide suggestions."""
-        prompt = f"""Review the following {language} code and provide a comprehensive code review.
+    def _prompt(self, code: str, language: str, part: str = "") -> str:
+        """Build the review prompt for some code."""
+        return f"""Review the following {language} code{part} and provide a comprehensive code review.
 
 Code:
 ```{language}
@@ -36,81 +65,313 @@ Please provide:
 6. Best Practices Recommendations
 
 Format your review clearly with sections:"""
-        
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
+
+    def _review_prompt(self, prompt: str) -> str:
+        """Send one review prompt to the model."""
+        response = chat_completion(
+            self.client, self.cache, tool="code_review_assistant",
+            model=self.model,
             messages=[
-                {"role": "system", "content": "You are an expert code reviewer. Provide constructive, detailed code reviews."},
+                {"role": "system", "content": self.system_prompt},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7
+            temperature=0.7,
+            max_tokens=self.max_tokens
         )
         
         return response.choices[0].message.content.strip()
 
+    def review(self, code: str, language: str = "auto") -> str:
+        """Review code and provide suggestions.
+
+        Code too large for one prompt is split into token-budgeted parts that are
+        reviewed one after another.
+        """
+        overhead = count_message_tokens([
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self._prompt("", language, " (part 00 of 00)")},
+        ], self.model)
+        available = prompt_budget(self.model, self.max_tokens) - overhead
+        parts = chunk_by_tokens(code, available, self.model)
+        if len(parts) <= 1:
+            return self._review_prompt(self._prompt(code, language))
+        
+        reviews = []
+        for i, part in enumerate(parts, 1):
+            review = self._review_prompt(self._prompt(part, language, f" (part {i} of {len(parts)})"))
+            reviews.append(f"## Part {i} of {len(parts)}\n\n{review}")
+        return "\n\n".join(reviews)
+
+    def _batch_prompt(self, units: List[Unit]) -> str:
+        """Build the prompt reviewing several units, each under a path:lines heading with numbered lines."""
+        blocks = "\n\n".join(f"### {unit.anchor} ({unit.kind} {unit.name})\n```{unit.language}\n{unit.numbered()}\n```"
+                               for unit in units)
+        return f"""Review the code units below. Every line starts with its line number and "|".
+
+{blocks}
+
+Report only real problems: bugs, security issues, performance problems and significant maintainability or style issues.
+Respond with JSON only, an empty list if there are no problems:
+{{"findings": [{{"file": "path as in the heading", "line": 12, "severity": "high|medium|low", "category": "bug|security|performance|maintainability|style", "message": "what is wrong", "suggestion": "how to fix it"}}]}}"""
+
+    def unit_budget(self) -> int:
+        """Code tokens one unit may use so that a prompt holding it fits the model's budget."""
+        overhead = count_message_tokens([
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self._batch_prompt([])},
+        ], self.model) + UNIT_HEADER_TOKENS
+        return min(self.batch_tokens, prompt_budget(self.model, self.max_tokens) - overhead)
+
+    def review_units(self, units: List[Unit]) -> List[dict]:
+        """Review units in token-budgeted batches, up to self.workers at once; findings in batch order.
+
+        A batch whose review fails (an API error, a prompt too large) becomes a note on
+        its first unit, so the findings of every other batch are still reported.
+        """
+        batches = pack_units(units, self.unit_budget(), self.model)
+
+        def run(batch: List[Unit]) -> List[dict]:
+            try:
+                return review(batch)
+            except Exception as e:
+                names = ", ".join(unit.anchor for unit in batch)
+                return [note_finding(batch[0], f"Review failed for {names}: {e}", "error")]
+
+        def review(batch: List[Unit]) -> List[dict]:
+            response = chat_completion(
+                self.client, self.cache, tool="code_review_assistant",
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": self._batch_prompt(batch)}
+                ],
+                temperature=0,
+                max_tokens=self.max_tokens
+            )
+            return parse_findings(response.choices[0].message.content, batch)
+
+        findings = []
+        if len(batches) > 1 and self.workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+                for batch_findings in pool.map(run, batches):
+                    findings.extend(batch_findings)
+        else:
+            for batch in batches:
+                findings.extend(run(batch))
+        return findings
+
+    def review_directory(self, root: str, extensions: Optional[Sequence[str]] = None) -> str:
+        """Review every source file under root (or one file) and merge the findings into one report.
+
+        Python files are split into functions, classes and methods with ast; other
+        languages with a line-based splitter. Paths in the report are relative to root.
+        """
+        root_path = Path(root)
+        budget = self.unit_budget()
+        units, files = [], 0
+        for path in iter_source_files(root, extensions):
+            name = path.name if root_path.is_file() else path.relative_to(root_path).as_posix()
+            try:
+                source = path.read_text(encoding="utf-8")
+            except UnicodeDecodeError:
+                continue
+            found = file_units(name, source, budget, self.model)
+            if found:
+                files += 1
+                units.extend(found)
+        if not units:
+            raise ValueError(f"No source files to review in {root}")
+        return format_report(self.review_units(units), files, len(units))
+
+
+def pack_units(units: List[Unit], max_tokens: int, model: str = "gpt-3.5-turbo") -> List[List[Unit]]:
+    """Split units into consecutive batches whose numbered code totals at most max_tokens."""
+    batches, batch, tokens = [], [], 0
+    for unit in units:
+        size = count_tokens(unit.numbered(), model) + UNIT_HEADER_TOKENS
+        if batch and tokens + size > max_tokens:
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(unit)
+        tokens += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def extract_json(text: str) -> str:
+    """The JSON object in a completion, without any code fence or surrounding prose."""
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if start != -1 and end > start else text
+
+
+def note_finding(unit: Unit, message: str, category: str = "review") -> dict:
+    """A finding that is not about one line, placed at the start of unit."""
+    return {"file": unit.path, "line": unit.start, "severity": "note", "category": category,
+            "message": message, "suggestion": "", "unit": unit.name}
+
+
+def parse_findings(text: str, batch: List[Unit]) -> List[dict]:
+    """Findings from a batch review, anchored to a file and line of that batch.
+
+    A finding naming a file outside the batch (or no file, when the batch holds
+    several) is dropped, and one whose line lies
+    outside that file's units is moved to the start of its nearest unit. A reply that
+    is not JSON is kept whole, as a note on the batch's first unit.
+    """
+    try:
+        raw = json.loads(extract_json(text)).get("findings", [])
+        if not isinstance(raw, list):
+            raise ValueError("findings is not a list")
+    except (ValueError, AttributeError):
+        if not text.strip():
+            return []
+        return [note_finding(batch[0], text.strip())]
+
+    findings = []
+    for item in raw:
+        if not isinstance(item, dict) or not str(item.get("message", "")).strip():
+            continue
+        path = str(item.get("file", "")).strip()
+        if path:
+            units = [u for u in batch if u.path == path] or [u for u in batch if Path(u.path).name == Path(path).name]
+        else:
+            # Without a file, the finding can only be placed if the batch holds one file
+            units = batch if len({u.path for u in batch}) == 1 else []
+        if not units:
+            continue
+        try:
+            line = int(item.get("line"))
+        except (TypeError, ValueError):
+            line = units[0].start
+        unit = next((u for u in units if u.start <= line <= u.end), None)
+        if unit is None:
+            unit = min(units, key=lambda u: min(abs(line - u.start), abs(line - u.end)))
+            line = unit.start
+        severity = str(item.get("severity", "")).lower()
+        findings.append({
+            "file": unit.path, "line": line,
+            "severity": severity if severity in SEVERITIES else "medium",
+            "category": str(item.get("category", "")).lower() or "review",
+            "message": str(item["message"]).strip(),
+            "suggestion": str(item.get("suggestion") or "").strip(),
+            "unit": unit.name,
+        })
+    return findings
+
+
+def format_report(findings: List[dict], files: int, units: int) -> str:
+    """One Markdown report: a summary, then findings per file ordered by line, as path:line anchors."""
+    unique = {}
+    for finding in findings:
+        unique.setdefault((finding["file"], finding["line"], finding["message"]), finding)
+    ordered = sorted(unique.values(), key=lambda f: (f["file"], f["line"], SEVERITIES.index(f["severity"])))
+    counts = {severity: sum(f["severity"] == severity for f in ordered) for severity in SEVERITIES}
+    summary = ", ".join(f"{count} {severity}" for severity, count in counts.items() if count) or "no findings"
+    lines = ["# Code Review", "", f"Reviewed {units} units in {files} files: {summary}."]
+    current = None
+    for finding in ordered:
+        if finding["file"] != current:
+            current = finding["file"]
+            lines += ["", f"## {current}", ""]
+        lines.append(f"- **{finding['severity']}** `{finding['file']}:{finding['line']}` "
+                     f"({finding['category']}, in {finding['unit']}) {finding['message']}")
+        if finding["suggestion"]:
+            lines.append(f"  - Suggestion: {finding['suggestion']}")
+    return "\n".join(lines) + "\n"
+
+
+def create_app():
+    """Build the web app; the reviewer is created on the first request."""
+    from flask import Flask, request, render_template_string
+
+    app = Flask(__name__)
+    instrument_app(app, "code_review_assistant")
+    reviewer = LazyResource(CodeReviewAssistant, "code_review_assistant")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <head>
+        <title>Code Review Assistant</title>
+        <style>
+            body { font-family: 'Courier New', monospace; max-width: 1000px; margin: 50px auto; padding: 20px; }
+            textarea { width: 100%; height: 400px; margin: 10px 0; font-family: monospace; }
+            select, button { padding: 10px; margin: 5px; }
+            button { background: #007bff; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
+        </style>
+    </head>
+    <body>
+        <h1>🔍 Code Review Assistant</h1>
+        <form method="POST">
+            <textarea name="code" placeholder="Paste your code here..." required></textarea>
+            <select name="language">
+                <option value="auto">Auto-detect</option>
+                <option value="python">Python</option>
+                <option value="javascript">JavaScript</option>
+                <option value="java">Java</option>
+                <option value="cpp">C++</option>
+            </select>
+            <button type="submit">Review Code</button>
+        </form>
+        {% if review %}
+        <div class="result">{{ review }}</div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            code = request.form.get('code', '')
+            language = request.form.get('language', 'auto')
+            try:
+                review = reviewer.get().review(code, language)
+                return render_template_string(HTML_TEMPLATE, review=review)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    return app
+
 
 def main():
     parser = argparse.ArgumentParser(description="Review code with AI assistance")
     parser.add_argument("--file", "-f", type=str, help="Code file to review")
     parser.add_argument("--code", "-c", type=str, help="Code string to review")
     parser.add_argument("--language", "-l", type=str, default="auto", help="Programming language")
+    parser.add_argument("--dir", "-d", type=str, help="Review every source file in a directory (or one file) as units")
+    parser.add_argument("--extensions", type=str, help="File extensions for --dir, e.g. .py,.js (default: all known)")
+    parser.add_argument("--concurrency", type=int, help="Review prompts run at once for --dir (default: REVIEW_WORKERS or 4)")
+    parser.add_argument("--output", "-o", type=str, help="Write the --dir report to this file")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string
-        
-        app = Flask(__name__)
-        reviewer = CodeReviewAssistant()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <head>
-            <title>Code Review Assistant</title>
-            <style>
-                body { font-family: 'Courier New', monospace; max-width: 1000px; margin: 50px auto; padding: 20px; }
-                textarea { width: 100%; height: 400px; margin: 10px 0; font-family: monospace; }
-                select, button { padding: 10px; margin: 5px; }
-                button { background: #007bff; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
-            </style>
-        </head>
-        <body>
-            <h1>🔍 Code Review Assistant</h1>
-            <form method="POST">
-                <textarea name="code" placeholder="Paste your code here..." required></textarea>
-                <select name="language">
-                    <option value="auto">Auto-detect</option>
-                    <option value="python">Python</option>
-                    <option value="javascript">JavaScript</option>
-                    <option value="java">Java</option>
-                    <option value="cpp">C++</option>
-                </select>
-                <button type="submit">Review Code</button>
-            </form>
-            {% if review %}
-            <div class="result">{{ review }}</div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                code = request.form.get('code', '')
-                language = request.form.get('language', 'auto')
-                try:
-                    review = reviewer.review(code, language)
-                    return render_template_string(HTML_TEMPLATE, review=review)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
+    elif args.dir:
+        try:
+            reviewer = CodeReviewAssistant(workers=args.concurrency)
+            extensions = [e.strip() for e in args.extensions.split(",") if e.strip()] if args.extensions else None
+            report = reviewer.review_directory(args.dir, extensions)
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(report)
+                print(f"✅ Review written to {args.output}")
+            else:
+                print(report)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
     elif args.file:
         try:
             with open(args.file, 'r', encoding='utf-8') as f:
@@ -0,0 +1,113 @@
+"""Tests for unit splitting and directory reviews"""
+import json
+import re
+from unittest.mock import Mock, patch
+
+from app import CodeReviewAssistant
+from units import file_units
+
+PYTHON_SOURCE = '''"""Module docstring"""
+import os
+
+
+@decorator
+def load(path):
+    return open(path).read()
+
+
+class Store:
+    """A store."""
+
+    limit = 10
+
+    def get(self, key):
+        return self.items[key]
+
+    def put(self, key, value):
+        self.items[key] = value
+'''
+
+JS_SOURCE = '''import fs from "fs";
+
+function read(path) {
+  return fs.readFileSync(path);
+}
+class Cache {
+  get(key) { return this.map[key]; }
+}
+'''
+
+
+def test_file_units_split_by_definition():
+    """Test ast units (with decorators, classes split by method when too large) and the line-based fallback."""
+    units = file_units("store.py", PYTHON_SOURCE, 2000)
+    assert [(u.kind, u.name, u.start, u.end) for u in units] == [
+        ("module", "module code", 1, 2), ("function", "load", 5, 7), ("class", "Store", 10, 19)]
+
+    units = file_units("store.py", PYTHON_SOURCE, 40)
+    assert [(u.name, u.start, u.end) for u in units][2:] == [
+        ("Store", 10, 13), ("Store.get", 15, 16), ("Store.put", 18, 19)]
+    assert units[3].numbered().splitlines()[0] == "15 |     def get(self, key):"
+
+    units = file_units("cache.js", JS_SOURCE, 2000)
+    assert [(u.name, u.start, u.end) for u in units] == [("lines 1-1", 1, 1), ("read", 3, 5), ("Cache", 6, 8)]
+    # Python that does not parse falls back to the line splitter instead of failing
+    assert file_units("broken.py", "def f(:\n    pass\n", 2000)[0].kind == "block"
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_review_directory_merges_findings(tmp_path):
+    """Test that units are batched within the budget, reviewed concurrently and merged into one anchored report."""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "store.py").write_text(PYTHON_SOURCE * 3)
+    (tmp_path / "cache.js").write_text(JS_SOURCE)
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "dep.js").write_text(JS_SOURCE)
+
+    reviewer = CodeReviewAssistant(workers=4, batch_tokens=300)
+
+    def reply(**params):
+        prompt = params["messages"][1]["content"]
+        findings = [{"file": path, "line": int(start), "severity": "high", "category": "bug",
+                     "message": f"Problem in {name}", "suggestion": "Fix it"}
+                    for path, start, name in re.findall(r"### (\S+):(\d+)-\d+ \(\w+ ([^)]+)\)", prompt)]
+        findings.append({"file": "elsewhere.py", "line": 1, "message": "Not in this batch"})
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = "```json\n" + json.dumps({"findings": findings}) + "\n```"
+        return response
+
+    with patch.object(reviewer.client.chat.completions, 'create', side_effect=reply) as mock_create:
+        report = reviewer.review_directory(str(tmp_path))
+
+    assert mock_create.call_count > 1
+    assert "node_modules" not in report and "Not in this batch" not in report
+    assert report.startswith("# Code Review\n\nReviewed 12 units in 2 files: 12 high.")
+    assert "## cache.js" in report and "## pkg/store.py" in report
+    assert "- **high** `pkg/store.py:24` (bug, in load) Problem in load" in report
+    assert report.index("## cache.js") < report.index("## pkg/store.py")
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_failed_batch_becomes_a_note(tmp_path):
+    """Test that one failing batch is reported as a note while the other batches' findings are kept."""
+    (tmp_path / "store.py").write_text(PYTHON_SOURCE * 3)
+    reviewer = CodeReviewAssistant(workers=4, batch_tokens=300)
+
+    def reply(**params):
+        prompt = params["messages"][1]["content"]
+        if "store.py:1-" in prompt:
+            raise RuntimeError("Rate limit reached")
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = json.dumps({"findings": [
+            {"file": "store.py", "line": int(start), "severity": "low", "message": "Nit"}
+            for start in re.findall(r"### store\.py:(\d+)-", prompt)]})
+        return response
+
+    with patch.object(reviewer.client.chat.completions, 'create', side_effect=reply) as mock_create:
+        report = reviewer.review_directory(str(tmp_path))
+
+    assert mock_create.call_count > 1
+    assert "- **note** `store.py:1` (error, in module code) Review failed for store.py:1-2" in report
+    assert "Rate limit reached" in report and "**low**" in report
@@ -24,3 +24,19 @@ def test_review():
         result = reviewer.review("def test(): pass")
         assert len(result) > 0
 
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key', 'LLM_TOKEN_BUDGETS': 'gpt-3.5-turbo=300'})
+def test_review_large_code_in_parts():
+    """Test that code over the token budget is reviewed in parts."""
+    reviewer = CodeReviewAssistant()
+    code = "\n".join(f"def function_{i}(value):\n    return value * {i}\n" for i in range(60))
+    with patch.object(reviewer.client.chat.completions, 'create') as mock_create:
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Looks fine"
+        mock_create.return_value = mock_response
+        
+        result = reviewer.review(code, "python")
+        assert mock_create.call_count > 1
+        assert "## Part 1 of" in result
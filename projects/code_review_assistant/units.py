@@ -0,0 +1,202 @@
+"""
+Units - Split source files into function and class units that can be reviewed on their own
+"""
+
+import ast
+import os
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+from common.tokens import count_tokens, trim_to_tokens
+
+LANGUAGES = {
+    ".py": "python", ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript", ".java": "java", ".kt": "kotlin",
+    ".c": "c", ".h": "c", ".cpp": "cpp", ".cc": "cpp", ".hpp": "cpp", ".cs": "csharp",
+    ".go": "go", ".rs": "rust", ".rb": "ruby", ".php": "php", ".swift": "swift",
+    ".scala": "scala", ".sh": "bash",
+}
+SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv", "env",
+             "build", "dist", ".tox", ".mypy_cache", ".pytest_cache", ".idea", ".vscode"}
+# Larger files are almost always generated or vendored
+MAX_FILE_BYTES = 1024 * 1024
+
+# The first line of a definition in C-like and scripting languages
+DEFINITION = re.compile(
+    r"\b(?:function|class|def|func|fn|interface|struct|enum|impl|module|trait|type)\s+([A-Za-z_$][\w$]*)"
+    r"|^\s*(?:[\w<>\[\],*&]+\s+)+([A-Za-z_]\w*)\s*\([^;]*$")
+BLOCK_END = re.compile(r"^\s*(?:[}\])]+[;,)]*|end)\s*$")
+
+
+class Unit:
+    def __init__(self, path: str, name: str, kind: str, start: int, end: int, code: str, language: str):
+        """A piece of one file reviewed as a whole: lines start to end (1-based, inclusive)."""
+        self.path = path
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.code = code
+        self.language = language
+
+    @property
+    def anchor(self) -> str:
+        return f"{self.path}:{self.start}-{self.end}"
+
+    def numbered(self) -> str:
+        """The code with each line prefixed by its line number, so findings can point at lines."""
+        width = len(str(self.end))
+        return "\n".join(f"{number:>{width}} | {line}"
+                         for number, line in enumerate(self.code.split("\n"), self.start))
+
+    def __repr__(self) -> str:
+        return f"Unit({self.anchor} {self.kind} {self.name})"
+
+
+def detect_language(path: str) -> Optional[str]:
+    return LANGUAGES.get(Path(path).suffix.lower())
+
+
+def iter_source_files(root: str, extensions: Optional[Sequence[str]] = None) -> Iterator[Path]:
+    """Source files under root in a stable order, skipping VCS, virtualenv and build directories."""
+    root_path = Path(root)
+    if root_path.is_file():
+        yield root_path
+        return
+    wanted = {e.lower() if e.startswith(".") else f".{e.lower()}" for e in extensions} if extensions else set(LANGUAGES)
+    for directory, dirs, files in os.walk(root_path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith("."))
+        for name in sorted(files):
+            path = Path(directory) / name
+            if path.suffix.lower() in wanted and path.stat().st_size <= MAX_FILE_BYTES:
+                yield path
+
+
+def _span(node: ast.stmt) -> tuple:
+    """First and last line of a definition, decorators included."""
+    return min([node.lineno] + [d.lineno for d in node.decorator_list]), node.end_lineno
+
+
+def _partition(path: str, lines: List[str], definitions: list, other_name: str, other_kind: str,
+               offset: int = 0) -> List[Unit]:
+    """Units for each (name, kind, first, last) definition and for the lines between them.
+
+    Every non-blank line ends up in exactly one unit, so comments and module code
+    between definitions are reviewed too.
+    """
+    units: List[Unit] = []
+
+    def add(name: str, kind: str, first: int, last: int):
+        while first <= last and not lines[first - 1].strip():
+            first += 1
+        while last >= first and not lines[last - 1].strip():
+            last -= 1
+        if first <= last:
+            units.append(Unit(path, name, kind, offset + first, offset + last,
+                              "\n".join(lines[first - 1:last]), "python"))
+
+    cursor = 1
+    for name, kind, first, last in definitions:
+        if first > cursor:
+            add(other_name, other_kind, cursor, first - 1)
+        add(name, kind, first, last)
+        cursor = last + 1
+    if cursor <= len(lines):
+        add(other_name, other_kind, cursor, len(lines))
+    return units
+
+
+def python_units(path: str, source: str) -> List[Unit]:
+    """Top-level functions and classes, with decorators; the code between them forms module units.
+
+    Raises SyntaxError for files ast cannot parse.
+    """
+    definitions = [(node.name, "class" if isinstance(node, ast.ClassDef) else "function", *_span(node))
+                   for node in ast.parse(source).body
+                   if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+    return _partition(path, source.split("\n"), definitions, "module code", "module")
+
+
+def python_members(unit: Unit) -> List[Unit]:
+    """A class unit split into one unit per method, plus the class lines around them."""
+    node = ast.parse(unit.code).body[0]
+    definitions = [(f"{unit.name}.{child.name}", "method", *_span(child)) for child in node.body
+                   if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    return _partition(unit.path, unit.code.split("\n"), definitions, unit.name, "class body", unit.start - 1)
+
+
+def line_units(path: str, source: str, language: str) -> List[Unit]:
+    """Split on unindented lines that follow a blank line or a closing brace.
+
+    This finds top-level functions and classes in most brace- and end-delimited
+    languages without parsing them; a unit is named after the definition it starts with.
+    """
+    lines = source.split("\n")
+    starts = [0]
+    for number in range(1, len(lines)):
+        line, previous = lines[number], lines[number - 1]
+        if line.strip() and not line[0].isspace() and (not previous.strip() or BLOCK_END.match(previous)):
+            starts.append(number)
+    units = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else len(lines)
+        while end > start and not lines[end - 1].strip():
+            end -= 1
+        if end == start:
+            continue
+        code = "\n".join(lines[start:end])
+        match = next((m for m in map(DEFINITION.search, lines[start:end]) if m), None)
+        name = (match.group(1) or match.group(2)) if match else f"lines {start + 1}-{end}"
+        units.append(Unit(path, name, "block", start + 1, end, code, language))
+    return units
+
+
+def split_unit(unit: Unit, max_tokens: int, model: str = "gpt-3.5-turbo") -> List[Unit]:
+    """Units of at most max_tokens: classes by method, anything else by whole lines."""
+    if count_tokens(unit.numbered(), model) <= max_tokens:
+        return [unit]
+    if unit.language == "python" and unit.kind == "class":
+        members = python_members(unit)
+        if len(members) > 1:
+            return [piece for member in members for piece in split_unit(member, max_tokens, model)]
+
+    pieces, current, tokens = [], [], 0
+    start = unit.start
+    for number, line in enumerate(unit.code.split("\n"), unit.start):
+        # Numbered lines cost a few more tokens than the code alone
+        size = count_tokens(line, model) + 4
+        if size > max_tokens:
+            line, size = trim_to_tokens(line, max_tokens - 4, model), max_tokens
+        if current and tokens + size > max_tokens:
+            pieces.append((start, current))
+            start, current, tokens = number, [], 0
+        current.append(line)
+        tokens += size
+    if current:
+        pieces.append((start, current))
+    return [Unit(unit.path, f"{unit.name} (part {i} of {len(pieces)})", unit.kind, start, start + len(lines) - 1,
+                 "\n".join(lines), unit.language)
+            for i, (start, lines) in enumerate(pieces, 1)]
+
+
+def file_units(path: str, source: str, max_tokens: int, model: str = "gpt-3.5-turbo",
+               language: Optional[str] = None) -> List[Unit]:
+    """The review units of one file, each within max_tokens.
+
+    Python is split with ast; other languages, and Python that does not parse, with
+    line_units.
+    """
+    language = language or detect_language(path) or "text"
+    source = source.replace("\r\n", "\n")
+    if not source.strip():
+        return []
+    units = None
+    if language == "python":
+        try:
+            units = python_units(path, source)
+        except SyntaxError:
+            pass
+    if units is None:
+        units = line_units(path, source, language)
+    return [piece for unit in units for piece in split_unit(unit, max_tokens, model)]
@@ -0,0 +1,3 @@
+"""
+Common - Shared helpers for the Mini AI Labs tools
+"""
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Gateway - Serves every tool from one process, each under its own URL prefix
+"""
+
+import argparse
+import html
+import importlib.util
+import json
+import os
+import sys
+import threading
+import traceback
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import metrics
+from common.lazy import IdleReaper, resources
+from common.serving import add_serve_arguments, serve
+
+PROJECTS_DIR = Path(__file__).resolve().parent.parent
+
+# URL prefix -> project directory
+TOOLS = {
+    "/blog": "blog_post_generator",
+    "/caption": "image_captioner",
+    "/chat-summary": "chat_summary_bot",
+    "/code-explainer": "code_explainer",
+    "/code-review": "code_review_assistant",
+    "/email": "email_writer",
+    "/meeting-notes": "meeting_notes_gen",
+    "/password": "password_generator",
+    "/pdf-qa": "pdf_qa_bot",
+    "/recipe": "recipe_generator",
+    "/resume": "resume_optimizer",
+    "/sentiment": "sentiment_classifier",
+    "/translate": "language_translator",
+    "/tts": "text_to_speech",
+}
+
+
+# Tools import their own modules by bare name, so loading them must not interleave
+_load_lock = threading.Lock()
+
+
+def load_tool_app(tool: str):
+    """Import a tool's app.py as <tool>.app and build its web app.
+
+    app.py imports the tool's own modules by bare name (from langid import ...).
+    While it loads, the tool's directory is searched first, ahead of site-packages;
+    afterwards those modules are kept only as <tool>.<name>, so neither another
+    tool's module nor an installed package of the same name can take their place.
+    """
+    name = f"{tool}.app"
+    module = sys.modules.get(name)
+    if module is None:
+        tool_dir = PROJECTS_DIR / tool
+        package = importlib.import_module(tool)
+        local = {path.stem for path in tool_dir.glob("*.py")} - {"app"}
+        spec = importlib.util.spec_from_file_location(name, tool_dir / "app.py")
+        module = importlib.util.module_from_spec(spec)
+        with _load_lock:
+            displaced = {m: sys.modules.pop(m) for m in local if m in sys.modules}
+            sys.path.insert(0, str(tool_dir))
+            sys.modules[name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[name]
+                raise
+            finally:
+                sys.path.remove(str(tool_dir))
+                for m in local:
+                    loaded = sys.modules.pop(m, None)
+                    if loaded is not None:
+                        sys.modules[f"{tool}.{m}"] = loaded
+                        setattr(package, m, loaded)
+                sys.modules.update(displaced)
+            setattr(package, "app", module)
+    return module.create_app()
+
+
+class Mount:
+    def __init__(self, prefix: str, tool: str):
+        """One tool mounted under prefix; its module is imported on the first request."""
+        self.prefix = prefix
+        self.tool = tool
+        self.app = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def get_app(self):
+        if self.app is None:
+            with self._lock:
+                if self.app is None:
+                    self.app = load_tool_app(self.tool)
+        return self.app
+
+
+class Gateway:
+    def __init__(self, tools: Optional[dict] = None):
+        """WSGI app dispatching /<prefix>/... to the matching tool's Flask app."""
+        tools = TOOLS if tools is None else tools
+        self.mounts = {prefix: Mount(prefix, tool) for prefix, tool in tools.items()}
+
+    def status(self) -> dict:
+        loaded = {r.name: r.stats() for r in resources()}
+        return {
+            mount.tool: {
+                "prefix": mount.prefix,
+                "mounted": mount.app is not None,
+                "error": mount.error,
+                "resource": loaded.get(mount.tool),
+            }
+            for mount in self.mounts.values()
+        }
+
+    def _respond(self, start_response, status: str, body: str, content_type: str, headers=()):
+        data = body.encode("utf-8")
+        start_response(status, [("Content-Type", content_type), ("Content-Length", str(len(data))), *headers])
+        return [data]
+
+    def _index(self, environ, start_response):
+        script_name = environ.get("SCRIPT_NAME", "")
+        rows = "".join(
+            f'<li><a href="{html.escape(script_name + info["prefix"])}/">{html.escape(info["prefix"])}</a>'
+            f' - {html.escape(tool)}{" (loaded)" if info["resource"] and info["resource"]["loaded"] else ""}</li>'
+            for tool, info in self.status().items()
+        )
+        page = f"<!DOCTYPE html><html><head><title>Mini AI Labs</title></head><body><h1>🧪 Mini AI Labs</h1><ul>{rows}</ul></body></html>"
+        return self._respond(start_response, "200 OK", page, "text/html; charset=utf-8")
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "") or "/"
+        if path == "/":
+            return self._index(environ, start_response)
+        if path == "/healthz":
+            return self._respond(start_response, "200 OK", json.dumps(self.status()), "application/json")
+        if path == "/metrics" and metrics.ENABLED:
+            return self._respond(start_response, "200 OK", metrics.REGISTRY.expose(), metrics.CONTENT_TYPE)
+
+        prefix = max((p for p in self.mounts if path == p or path.startswith(p + "/")), key=len, default=None)
+        if prefix is None:
+            return self._respond(start_response, "404 NOT FOUND", "Unknown tool", "text/plain")
+        if path == prefix:
+            # Tool pages post their forms to relative URLs, so they need the trailing slash
+            location = environ.get("SCRIPT_NAME", "") + prefix + "/"
+            if environ.get("QUERY_STRING"):
+                location += "?" + environ["QUERY_STRING"]
+            return self._respond(start_response, "308 PERMANENT REDIRECT", "", "text/plain", [("Location", location)])
+
+        mount = self.mounts[prefix]
+        try:
+            app = mount.get_app()
+        except Exception as e:
+            mount.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+            return self._respond(start_response, "503 SERVICE UNAVAILABLE",
+                                 f"{mount.tool} could not be loaded: {mount.error}", "text/plain")
+        mount.error = None
+        environ = dict(environ, SCRIPT_NAME=environ.get("SCRIPT_NAME", "") + prefix, PATH_INFO=path[len(prefix):])
+        return app(environ, start_response)
+
+
+def create_app(tools: Optional[list] = None, idle_timeout: Optional[float] = None) -> Gateway:
+    """Build the gateway for the named tools (default: all) and start unloading idle models.
+
+    idle_timeout defaults to GATEWAY_IDLE_TIMEOUT (600 seconds); 0 keeps everything loaded.
+    """
+    selected = TOOLS if not tools else {p: t for p, t in TOOLS.items() if t in tools or p.strip("/") in tools}
+    if idle_timeout is None:
+        idle_timeout = float(os.getenv("GATEWAY_IDLE_TIMEOUT", "600"))
+    IdleReaper(idle_timeout).start()
+    return Gateway(selected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve all tools from one process under URL prefixes")
+    parser.add_argument("--tools", "-t", type=str, default="",
+                        help="Comma-separated tools or prefixes to mount (default: all)")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Seconds before an unused model or client is unloaded (0 = never)")
+    add_serve_arguments(parser)
+
+    args = parser.parse_args()
+
+    tools = [t.strip().strip("/") for t in args.tools.split(",") if t.strip()]
+    if args.serve:
+        return serve(lambda: create_app(tools, args.idle_timeout), args)
+
+    from werkzeug.serving import run_simple
+
+    gateway = create_app(tools, args.idle_timeout)
+    print(f"🌐 Gateway starting on http://localhost:{args.port}")
+    for mount in gateway.mounts.values():
+        print(f"   {mount.prefix:<16} {mount.tool}")
+    run_simple(args.host, args.port, gateway, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
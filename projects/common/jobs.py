@@ -0,0 +1,340 @@
+"""
+Jobs - Background job queue so long generations don't hold the HTTP request open
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from common.metrics import counter, gauge, histogram
+
+DEFAULT_DB_PATH = str(Path.home() / ".cache" / "mini-ai-labs" / "jobs.sqlite3")
+
+FINISHED = ("succeeded", "failed")
+
+JOBS_QUEUED = gauge("jobs_queued", "Jobs waiting for a worker", ("tool",))
+JOBS_RUNNING = gauge("jobs_running", "Jobs being processed", ("tool",))
+JOBS_TOTAL = counter("jobs_total", "Jobs by outcome", ("tool", "status"))
+JOB_WAIT = histogram("job_wait_seconds", "Time jobs spent queued", ("tool",))
+JOB_RUN = histogram("job_run_seconds", "Time jobs spent running", ("tool",))
+
+_owner = None
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted to a queue that is already at capacity."""
+
+
+def process_owner() -> str:
+    """Identifies this process in the jobs table, even if a restarted process reuses its pid."""
+    global _owner
+    if _owner is None or not _owner.startswith(f"{os.getpid()}:"):
+        # Forked workers get their own token
+        _owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    return _owner
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    if owner == process_owner():
+        return True
+    pid = int((owner or "0").split(":")[0] or 0)
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass
+    return True
+
+
+class JobStore:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """SQLite table of jobs and their results, shared by every process using the same file."""
+        self.db_path = db_path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Open the database on first use."""
+        if self._db is None:
+            if self.db_path != ":memory:":
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, tool TEXT NOT NULL, status TEXT NOT NULL, owner TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL, result TEXT, error TEXT)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            db = self._connection()
+            rows = db.execute(sql, params).fetchall()
+            db.commit()
+            return rows
+
+    def create(self, job_id: str, tool: str):
+        self._execute("INSERT INTO jobs (id, tool, status, owner, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                      (job_id, tool, process_owner(), time.time()))
+
+    def start(self, job_id: str):
+        self._execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def succeed(self, job_id: str, result):
+        self._execute("UPDATE jobs SET status = 'succeeded', finished_at = ?, result = ? WHERE id = ?",
+                      (time.time(), json.dumps(result), job_id))
+
+    def fail(self, job_id: str, error: str):
+        self._execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                      (time.time(), error, job_id))
+
+    def abandon_unfinished(self, tool: str) -> int:
+        """Mark jobs left queued or running by processes that no longer exist as failed."""
+        owners = [owner for (owner,) in self._execute(
+            "SELECT DISTINCT owner FROM jobs WHERE tool = ? AND status IN ('queued', 'running')", (tool,))]
+        dead = [owner for owner in owners if not _owner_alive(owner)]
+        for owner in dead:
+            self._execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Interrupted by a restart' "
+                          "WHERE tool = ? AND owner IS ? AND status IN ('queued', 'running')", (time.time(), tool, owner))
+        return len(dead)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._execute(
+            "SELECT id, tool, status, created_at, started_at, finished_at, result, error FROM jobs WHERE id = ?",
+            (job_id,))
+        if not rows:
+            return None
+        job_id, tool, status, created_at, started_at, finished_at, result, error = rows[0]
+        return {
+            "id": job_id,
+            "tool": tool,
+            "status": status,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "result": json.loads(result) if result is not None else None,
+            "error": error,
+        }
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs older than older_than seconds."""
+        with self._lock:
+            db = self._connection()
+            cursor = db.execute("DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                                (time.time() - older_than,))
+            db.commit()
+            return cursor.rowcount
+
+
+class JobQueue:
+    def __init__(self, tool: str, store: Optional[JobStore] = None, workers: int = 2, max_queued: int = 100,
+                 retention: float = 7 * 24 * 3600):
+        """Run submitted jobs on a bounded pool of worker threads, recording them in store.
+
+        At most max_queued jobs wait for a worker; further submissions raise QueueFullError.
+        """
+        self.tool = tool
+        self.store = store or JobStore()
+        self.workers = workers
+        self.max_queued = max_queued
+        self.queued = 0
+        self.running = 0
+        self.counts = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0}
+        self.wait_seconds = deque(maxlen=1000)
+        self.run_seconds = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{tool}-jobs")
+        self.store.abandon_unfinished(tool)
+        self.store.purge(retention)
+        JOBS_QUEUED.set_function(lambda: self.queued, tool=tool)
+        JOBS_RUNNING.set_function(lambda: self.running, tool=tool)
+
+    @classmethod
+    def from_env(cls, tool: str) -> "JobQueue":
+        """Build a queue configured by JOBS_WORKERS, JOBS_MAX_QUEUED, JOBS_RETENTION and JOBS_DB."""
+        return cls(
+            tool,
+            JobStore(os.getenv("JOBS_DB", DEFAULT_DB_PATH)),
+            workers=int(os.getenv("JOBS_WORKERS", "2")),
+            max_queued=int(os.getenv("JOBS_MAX_QUEUED", "100")),
+            retention=float(os.getenv("JOBS_RETENTION", str(7 * 24 * 3600))),
+        )
+
+    def submit(self, fn: Callable, *args, **kwargs) -> str:
+        """Queue fn(*args, **kwargs) and return the job id straight away."""
+        with self._lock:
+            if self.queued >= self.max_queued:
+                self.counts["rejected"] += 1
+                JOBS_TOTAL.labels(self.tool, "rejected").inc()
+                raise QueueFullError(f"{self.tool} job queue is full ({self.max_queued} waiting)")
+            self.queued += 1
+            self.counts["submitted"] += 1
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.create(job_id, self.tool)
+            self._executor.submit(self._run, job_id, time.monotonic(), fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id: str, submitted: float, fn: Callable, args: tuple, kwargs: dict):
+        started = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.wait_seconds.append(started - submitted)
+        JOB_WAIT.labels(self.tool).observe(started - submitted)
+        status = "failed"
+        try:
+            self.store.start(job_id)
+            result = fn(*args, **kwargs)
+            self.store.succeed(job_id, result)
+            status = "succeeded"
+        except Exception as e:
+            self.store.fail(job_id, str(e))
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.running -= 1
+                self.counts[status] += 1
+                self.run_seconds.append(elapsed)
+            JOBS_TOTAL.labels(self.tool, status).inc()
+            JOB_RUN.labels(self.tool).observe(elapsed)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.store.get(job_id)
+
+    def wait(self, job_id: str, timeout: float, poll: float = 0.25) -> Optional[dict]:
+        """Return the job once it finishes or timeout seconds pass, whichever is first."""
+        deadline = time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and job["status"] not in FINISHED and time.monotonic() < deadline:
+            time.sleep(min(poll, max(0.0, deadline - time.monotonic())))
+            job = self.get(job_id)
+        return job
+
+    def stats(self) -> dict:
+        """Queue depth, worker usage, outcome counts and wait/run time summaries."""
+        def summary(values):
+            values = list(values)
+            return {
+                "count": len(values),
+                "avg": sum(values) / len(values) if values else 0.0,
+                "max": max(values) if values else 0.0,
+            }
+
+        with self._lock:
+            return {
+                "tool": self.tool,
+                "queued": self.queued,
+                "running": self.running,
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                **self.counts,
+                "wait_seconds": summary(self.wait_seconds),
+                "run_seconds": summary(self.run_seconds),
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def register_job_routes(app, queue: JobQueue):
+    """Add GET /jobs (queue metrics), GET /jobs/<id> and GET /jobs/<id>/events to a Flask app.
+
+    /jobs/<id>?wait=30 long-polls until the job finishes; /jobs/<id>/events streams
+    status changes as server-sent events.
+    """
+    from flask import Response, jsonify, request
+
+    @app.route('/jobs', methods=['GET'])
+    def job_stats():
+        return jsonify(queue.stats())
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    def job_status(job_id):
+        wait = min(float(request.args.get('wait', 0) or 0), 60.0)
+        job = queue.wait(job_id, wait) if wait > 0 else queue.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job'}), 404
+        return jsonify(job)
+
+    @app.route('/jobs/<job_id>/events', methods=['GET'])
+    def job_events(job_id):
+        if queue.get(job_id) is None:
+            return jsonify({'error': 'Unknown job'}), 404
+
+        def events():
+            last_status, last_sent = None, time.monotonic()
+            while True:
+                job = queue.get(job_id)
+                if job is None:
+                    # Purged or expired while we were watching it
+                    yield f"event: gone\ndata: {json.dumps({'id': job_id, 'error': 'Unknown job'})}\n\n"
+                    return
+                if job["status"] != last_status:
+                    last_status, last_sent = job["status"], time.monotonic()
+                    yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                if job["status"] in FINISHED:
+                    return
+                if time.monotonic() - last_sent > 15:
+                    # Comment lines keep proxies from closing an idle stream
+                    last_sent = time.monotonic()
+                    yield ": keep-alive\n\n"
+                time.sleep(0.5)
+
+        return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def submit_response(queue: JobQueue, fn: Callable, *args, **kwargs):
+    """Queue a job from a Flask view: 202 with the job id, or 503 when the queue is full."""
+    from flask import jsonify, url_for
+
+    try:
+        job_id = queue.submit(fn, *args, **kwargs)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '30'}
+    status_url = url_for('job_status', job_id=job_id)
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url,
+                    'events_url': url_for('job_events', job_id=job_id)}), 202, {'Location': status_url}
+
+
+PENDING_TEMPLATE = """
+<div class="result" id="job-{{ job_id }}" style="white-space: pre-wrap;">⏳ Working on it... (job {{ job_id }})</div>
+<script>
+(async function poll() {
+    const el = document.getElementById("job-{{ job_id }}");
+    try {
+        const job = await (await fetch("{{ status_url }}?wait=25")).json();
+        if (job.status === "succeeded") { el.textContent = job.result; return; }
+        if (job.status === "failed") { el.textContent = "Error: " + job.error; return; }
+    } catch (e) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+    poll();
+})();
+</script>
+"""
+
+
+def pending_html(job_id: str):
+    """HTML fragment that long-polls a job and shows its result in place, for the tools' web pages."""
+    from flask import render_template_string, url_for
+    from markupsafe import Markup
+
+    return Markup(render_template_string(PENDING_TEMPLATE, job_id=job_id,
+                                         status_url=url_for('job_status', job_id=job_id)))
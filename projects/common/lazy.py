@@ -0,0 +1,107 @@
+"""
+Lazy - Load heavy resources on first use and drop them again when idle
+"""
+
+import gc
+import threading
+import time
+import weakref
+from typing import Callable, Optional
+
+from common.metrics import MODEL_LOAD, gauge
+
+_registry = weakref.WeakSet()
+_registry_lock = threading.Lock()
+
+LOADED = gauge("lazy_resource_loaded", "1 while a lazily loaded model or client is in memory", ("resource",))
+
+
+class LazyResource:
+    def __init__(self, factory: Callable, name: str = ""):
+        """Hold a resource (model, client, tool object) that is built by factory on first use."""
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "resource")
+        self.loads = 0
+        self.last_used = 0.0
+        self._value = None
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.add(self)
+        ref = weakref.ref(self)
+        LOADED.set_function(lambda: ref() is not None and ref().loaded, resource=self.name)
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def get(self):
+        """Return the resource, building it if it is not loaded."""
+        self.last_used = time.monotonic()
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    with MODEL_LOAD.time(resource=self.name):
+                        self._value = self.factory()
+                    self.loads += 1
+                value = self._value
+        return value
+
+    def unload(self) -> bool:
+        """Drop the resource; requests still using it keep their own reference."""
+        with self._lock:
+            if self._value is None:
+                return False
+            self._value = None
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        return True
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "loads": self.loads,
+            "idle_seconds": round(self.idle_seconds(), 1) if self.loads else None,
+        }
+
+
+def resources() -> list:
+    """Every live LazyResource in the process."""
+    with _registry_lock:
+        return list(_registry)
+
+
+def unload_idle(max_idle: float) -> list:
+    """Unload every resource unused for max_idle seconds; returns the names unloaded."""
+    return [r.name for r in resources() if r.loaded and r.idle_seconds() >= max_idle and r.unload()]
+
+
+class IdleReaper:
+    def __init__(self, max_idle: float, interval: Optional[float] = None):
+        """Background thread that periodically unloads idle resources."""
+        self.max_idle = max_idle
+        self.interval = interval or max(1.0, min(60.0, max_idle / 4))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "IdleReaper":
+        if self.max_idle > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="idle-reaper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for name in unload_idle(self.max_idle):
+                print(f"💤 Unloaded idle resource: {name}")
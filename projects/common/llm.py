@@ -0,0 +1,84 @@
+"""
+LLM - Single entry point the tools use to call chat completions
+"""
+
+import json
+import threading
+from typing import Optional
+
+from common.llm_cache import ResponseCache, _token_count
+from common.metrics import OPENAI_ERRORS, OPENAI_LATENCY
+from common.singleflight import SingleFlight, singleflight_from_env
+from common.tokens import PromptTooLargeError, count_message_tokens, prompt_budget, usage
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer() -> Optional[SingleFlight]:
+    """Return the process-wide request coalescer (configured by LLM_COALESCE)."""
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = singleflight_from_env() or False
+    return _coalescer or None
+
+
+def request_key(params: dict) -> str:
+    """Canonical form of a request, used to spot identical in-flight calls."""
+    return json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _create(client, params: dict, tool: str, estimated_prompt_tokens: int):
+    """Call the API, sharing the call with identical requests already in flight."""
+    def call():
+        try:
+            with OPENAI_LATENCY.time(tool=tool, model=params.get("model")):
+                response = client.chat.completions.create(**params)
+        except Exception as e:
+            OPENAI_ERRORS.labels(tool, params.get("model"), type(e).__name__).inc()
+            raise
+        if not params.get("stream"):
+            reported = getattr(response, "usage", None)
+            usage.record(
+                tool, params.get("model"),
+                _token_count(reported, "prompt_tokens") or estimated_prompt_tokens,
+                _token_count(reported, "completion_tokens"),
+                estimated_prompt_tokens,
+            )
+        return response
+
+    coalescer = get_coalescer()
+    if coalescer is None or params.get("stream"):
+        return call()
+    return coalescer.do(request_key(params), call)
+
+
+def chat_completion(client, cache: Optional[ResponseCache] = None, tool: str = "default", **params):
+    """Call client.chat.completions.create, serving deterministic requests from cache.
+
+    params are passed straight through to the OpenAI client, so the return value
+    is the usual completion object (or a look-alike on a cache hit). The prompt
+    is measured first and PromptTooLargeError is raised if it cannot fit the
+    model's budget; token usage is recorded per tool in common.tokens.usage.
+    """
+    model = params.get("model")
+    prompt_tokens = count_message_tokens(params.get("messages", []), model)
+    budget = prompt_budget(model, params.get("max_tokens"))
+    if prompt_tokens > budget:
+        raise PromptTooLargeError(f"Prompt is {prompt_tokens} tokens; the {model} budget is {budget}")
+
+    if cache is None or params.get("stream") or not cache.should_cache(params.get("temperature")):
+        return _create(client, params, tool, prompt_tokens)
+
+    extra = {name: value for name, value in params.items()
+             if name not in ("model", "messages", "temperature", "max_tokens")}
+    key = cache.key_for(model, params.get("messages"), params.get("temperature"), params.get("max_tokens"), **extra)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached.as_response()
+
+    response = _create(client, params, tool, prompt_tokens)
+    cache.put(key, response.choices[0].message.content, getattr(response, "usage", None))
+    return response
@@ -0,0 +1,229 @@
+"""
+LLM Cache - Exact-match response cache for deterministic chat completions
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+DEFAULT_DB_PATH = str(Path.home() / ".cache" / "mini-ai-labs" / "llm_cache.sqlite3")
+
+
+def _env_flag(name: str, default: Optional[bool] = None) -> Optional[bool]:
+    """Read a boolean environment variable (1/true/yes/on)."""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _token_count(usage, field: str) -> int:
+    """Read a token count from an OpenAI usage object (or dict), ignoring anything non-numeric."""
+    if isinstance(usage, dict):
+        value = usage.get(field, 0)
+    else:
+        value = getattr(usage, field, 0) if usage is not None else 0
+    return value if isinstance(value, int) else 0
+
+
+class CacheConfig:
+    def __init__(self, enabled: bool = False, max_temperature: float = 0.3,
+                 ttl: float = 24 * 3600, max_entries: int = 1024,
+                 db_path: Optional[str] = DEFAULT_DB_PATH):
+        """Settings for a ResponseCache. Set db_path to None for memory only."""
+        self.enabled = enabled
+        self.max_temperature = max_temperature
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+
+    @classmethod
+    def from_env(cls, tool: str) -> "CacheConfig":
+        """Build the config for a tool from LLM_CACHE_* environment variables.
+
+        LLM_CACHE_TOOLS is a comma-separated list of tool names (or "all") that
+        have the cache switched on; LLM_CACHE_<TOOL>=0/1 overrides it per tool.
+        """
+        tools = [t.strip() for t in os.getenv("LLM_CACHE_TOOLS", "").split(",") if t.strip()]
+        enabled = "all" in tools or tool in tools
+        enabled = _env_flag(f"LLM_CACHE_{tool.upper()}", enabled)
+        db_path = os.getenv("LLM_CACHE_DB", DEFAULT_DB_PATH)
+        return cls(
+            enabled=enabled,
+            max_temperature=float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", str(24 * 3600))),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            db_path=db_path if db_path.lower() != "none" else None,
+        )
+
+
+class CachedResponse:
+    def __init__(self, content: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+                 created_at: Optional[float] = None):
+        """A stored completion plus the tokens it originally cost."""
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def as_response(self):
+        """Shape the entry like a chat completion so callers can read choices[0].message.content."""
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.content), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+            cached=True,
+        )
+
+
+class ResponseCache:
+    def __init__(self, config: Optional[CacheConfig] = None):
+        """Initialize the in-process LRU tier and (lazily) the SQLite tier."""
+        self.config = config or CacheConfig(enabled=True)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_prompt_tokens = 0
+        self.saved_completion_tokens = 0
+
+    @classmethod
+    def from_env(cls, tool: str) -> "ResponseCache":
+        """Create the cache for a tool using CacheConfig.from_env."""
+        return cls(CacheConfig.from_env(tool))
+
+    @staticmethod
+    def key_for(model: str, messages: list, temperature: float = 1.0,
+                max_tokens: Optional[int] = None, **params) -> str:
+        """Hash every request field that can change the completion.
+
+        Any other parameters (response_format, top_p, stop, seed, ...) are part of the
+        key too, so requests differing only in them never share an entry.
+        """
+        fields = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        extra = {name: value for name, value in params.items() if value is not None}
+        if extra:
+            fields["params"] = extra
+        payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def should_cache(self, temperature: Optional[float]) -> bool:
+        """Only cache when enabled and the request is close enough to deterministic."""
+        if not self.config.enabled:
+            return False
+        # OpenAI samples at temperature 1.0 when none is given
+        return (1.0 if temperature is None else temperature) <= self.config.max_temperature
+
+    def _connection(self):
+        """Open the SQLite tier on first use."""
+        if self._db is None and self.config.db_path:
+            Path(self.config.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.config.db_path, check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, prompt_tokens INTEGER, "
+                "completion_tokens INTEGER, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _expired(self, entry: CachedResponse) -> bool:
+        return self.config.ttl > 0 and time.time() - entry.created_at > self.config.ttl
+
+    def _remember(self, key: str, entry: CachedResponse):
+        """Insert into the LRU tier, evicting the least recently used entry."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.config.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Look a key up in memory, then on disk. Returns None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry):
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                entry = self._get_from_disk(key)
+                if entry is not None:
+                    self.disk_hits += 1
+                    self._remember(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_prompt_tokens += entry.prompt_tokens
+            self.saved_completion_tokens += entry.completion_tokens
+            return entry
+
+    def _get_from_disk(self, key: str) -> Optional[CachedResponse]:
+        db = self._connection()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT content, prompt_tokens, completion_tokens, created_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        entry = CachedResponse(*row)
+        if self._expired(entry):
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            db.commit()
+            return None
+        return entry
+
+    def put(self, key: str, content: str, usage=None):
+        """Store a completion along with the usage reported by the API.
+
+        Empty completions (e.g. a tool call or a content-filtered reply) are not stored.
+        """
+        if not content:
+            return
+        entry = CachedResponse(content, _token_count(usage, "prompt_tokens"),
+                               _token_count(usage, "completion_tokens"))
+        with self._lock:
+            self._remember(key, entry)
+            db = self._connection()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, entry.content, entry.prompt_tokens, entry.completion_tokens, entry.created_at),
+                )
+                db.commit()
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and the tokens saved by serving from cache."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.config.enabled,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+            "saved_prompt_tokens": self.saved_prompt_tokens,
+            "saved_completion_tokens": self.saved_completion_tokens,
+        }
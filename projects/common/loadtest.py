@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Load Test - Benchmarks each tool's web endpoint against the mock OpenAI API
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.jobs import FINISHED
+from common.mock_openai import MockConfig, create_app
+
+PROJECTS_DIR = Path(__file__).resolve().parent.parent
+
+SAMPLE_CODE = "def fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\n"
+SAMPLE_TRANSCRIPT = "Alice: Let's ship on Friday.\nBob: I'll finish the tests by Thursday.\nAlice: Great, decided."
+
+
+def make_pdf(text: str) -> bytes:
+    """Build a minimal one-page PDF containing text, for the upload endpoints."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+
+SAMPLE_PDF = make_pdf("Acme Corp annual report. Revenue grew 12 percent. Jane Doe, Senior Engineer, Python.")
+
+# How to start each tool and what to send to it
+TOOLS = {
+    "chat_summary_bot": {"form": {"chat_content": SAMPLE_TRANSCRIPT}},
+    "language_translator": {"form": {"text": "Good morning, how are you?", "from_lang": "en", "to_lang": "es"}},
+    "code_explainer": {"form": {"code": SAMPLE_CODE, "language": "python"}},
+    "code_review_assistant": {"form": {"code": SAMPLE_CODE, "language": "python"}},
+    "email_writer": {"form": {"purpose": "meeting request", "recipient": "client", "tone": "professional",
+                              "context": "Quarterly review", "length": "short"}},
+    "recipe_generator": {"form": {"ingredients": "chicken, tomatoes, basil", "cuisine": "italian",
+                                  "dietary": "", "servings": "2"}},
+    "meeting_notes_gen": {"form": {"transcript": SAMPLE_TRANSCRIPT}},
+    "blog_post_generator": {"form": {"topic": "AI in Healthcare", "length": "short",
+                                     "style": "professional", "keywords": "ai, health"}},
+    "text_to_speech": {"form": {"text": "Hello from the load test.", "voice": "alloy"}},
+    "pdf_qa_bot": {"form": {"question": "How much did revenue grow?"},
+                   "files": {"pdf": ("report.pdf", SAMPLE_PDF, "application/pdf")}},
+    "resume_optimizer": {"form": {"job_role": "Software Engineer", "job_description": ""},
+                         "files": {"resume": ("resume.pdf", SAMPLE_PDF, "application/pdf")}},
+    "password_generator": {"form": {"length": "16", "uppercase": "on", "lowercase": "on", "numbers": "on",
+                                     "symbols": "on"}},
+    "travel_itinerary_gen": {"command": ["node", "app.js", "--web"], "port": 3000, "path": "/api/generate",
+                             "json": {"destination": "Paris, France", "startDate": "2024-06-01",
+                                      "endDate": "2024-06-03", "interests": ["food"], "budget": "moderate",
+                                      "travelers": 2}},
+}
+
+
+# Tools that run generation as a background job (pdf_qa_bot, resume_optimizer, blog_post_generator)
+# answer with a page that polls the job; its status URL, from common.jobs.PENDING_TEMPLATE
+PENDING_JOB = re.compile(rb'fetch\("([^"?]+)\?wait=')
+
+
+def encode_multipart(form: dict, files: dict):
+    """Encode form fields and files as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in form.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def build_request(url: str, spec: dict) -> urllib.request.Request:
+    """Turn a tool spec into a POST request."""
+    if "json" in spec:
+        body, content_type = json.dumps(spec["json"]).encode(), "application/json"
+    elif "files" in spec:
+        body, content_type = encode_multipart(spec.get("form", {}), spec["files"])
+    else:
+        body = urllib.parse.urlencode(spec.get("form", {})).encode()
+        content_type = "application/x-www-form-urlencoded"
+    return urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": content_type})
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def wait_for_port(port: int, timeout: float) -> bool:
+    """Wait until something accepts connections on localhost:port."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return True
+        time.sleep(0.2)
+    return False
+
+
+def wait_for_job(status_url: str, deadline: float) -> int:
+    """Long-poll a background job until it finishes: 200 if it succeeded, 500 if it failed, 0 on timeout."""
+    while time.perf_counter() < deadline:
+        wait = max(1, min(30, int(deadline - time.perf_counter())))
+        with urllib.request.urlopen(f"{status_url}?wait={wait}", timeout=wait + 10) as response:
+            job = json.loads(response.read())
+        if job["status"] in FINISHED:
+            return 200 if job["status"] == "succeeded" else 500
+    return 0
+
+
+def run_load(url: str, spec: dict, requests: int, concurrency: int, timeout: float) -> dict:
+    """Fire requests at one endpoint and summarise latency and throughput.
+
+    A response that hands the work to a background job is followed until the job
+    finishes, so latency covers the generation and not just the enqueue.
+    """
+    def one(_):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(build_request(url, spec), timeout=timeout) as response:
+                body = response.read()
+                status = response.status
+            job = PENDING_JOB.search(body) if status == 200 else None
+            if job:
+                status = wait_for_job(urllib.parse.urljoin(url, job.group(1).decode()), start + timeout)
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = 0
+        return status, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for status, latency in results if status == 200)
+    return {
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": requests - len(latencies),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def benchmark_tool(name: str, mock_url: str, requests: int, concurrency: int,
+                   startup_timeout: float, request_timeout: float, mode: str = "web",
+                   workers: int = 2, threads: int = 8) -> dict:
+    """Start one tool against the mock API, load it, then shut it down.
+
+    mode "web" runs the Flask dev server (--web); "serve" runs the production server (--serve).
+    """
+    spec = TOOLS[name]
+    port = spec.get("port", 5000)
+    command = spec.get("command", [sys.executable, "app.py", "--web"])
+    if mode == "serve":
+        if "command" in spec:
+            return {"error": "no --serve mode"}
+        command = [sys.executable, "app.py", "--serve", "--port", str(port),
+                   "--workers", str(workers), "--threads", str(threads)]
+    env = dict(os.environ, OPENAI_BASE_URL=mock_url, OPENAI_API_KEY="mock-key", PORT=str(port))
+    process = subprocess.Popen(command, cwd=PROJECTS_DIR / name, env=env, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(port, startup_timeout):
+            return {"error": "tool did not start"}
+        url = f"http://127.0.0.1:{port}{spec.get('path', '/')}"
+        run_load(url, spec, 1, 1, request_timeout)  # warm-up
+        return run_load(url, spec, requests, concurrency, request_timeout)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+        # Give the OS a moment to release the port for the next tool
+        time.sleep(0.5)
+
+
+def start_mock(port: int, config: MockConfig) -> str:
+    """Run the mock OpenAI API in a background thread and return its base URL."""
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", port, create_app(config), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the tools' web endpoints against a mock OpenAI API")
+    parser.add_argument("--tools", "-t", type=str, default=",".join(TOOLS),
+                        help="Comma-separated tools to benchmark (default: all)")
+    parser.add_argument("--requests", "-n", type=int, default=200, help="Requests per tool")
+    parser.add_argument("--concurrency", "-c", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--mock-port", type=int, default=8000, help="Port for the mock OpenAI API")
+    parser.add_argument("--latency", type=str, default="fixed:0.05", help="Mock latency distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Mock generation speed")
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="Mock 429 rate")
+    parser.add_argument("--error-500-rate", type=float, default=0.0, help="Mock 500 rate")
+    parser.add_argument("--startup-timeout", type=float, default=60.0, help="Seconds to wait for a tool to start")
+    parser.add_argument("--request-timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--modes", type=str, default="web",
+                        help="Comma-separated server modes to compare: web (dev server), serve (gunicorn)")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes in serve mode")
+    parser.add_argument("--threads", type=int, default=8, help="Threads per worker in serve mode")
+    parser.add_argument("--output", "-o", type=str, help="Write results as JSON to this file")
+
+    args = parser.parse_args()
+
+    mock_url = start_mock(args.mock_port, MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_429_rate=args.error_429_rate,
+        error_500_rate=args.error_500_rate,
+    ))
+    print(f"🧪 Mock OpenAI API on {mock_url}")
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    results = {}
+    print(f"\n{'Tool':<24}{'Mode':<7}{'OK':>6}{'Err':>6}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}")
+    print("=" * 79)
+    for name in [t.strip() for t in args.tools.split(",") if t.strip()]:
+        if name not in TOOLS:
+            print(f"❌ Unknown tool: {name}")
+            return 1
+        for mode in modes:
+            result = benchmark_tool(name, mock_url, args.requests, args.concurrency,
+                                    args.startup_timeout, args.request_timeout,
+                                    mode, args.workers, args.threads)
+            results.setdefault(name, {})[mode] = result
+            if "error" in result:
+                print(f"{name:<24}{mode:<7}  ❌ {result['error']}")
+            else:
+                print(f"{name:<24}{mode:<7}{result['ok']:>6}{result['errors']:>6}{result['throughput_rps']:>9.1f}"
+                      f"{result['p50_ms']:>9.0f}{result['p90_ms']:>9.0f}{result['p99_ms']:>9.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
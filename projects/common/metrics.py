@@ -0,0 +1,300 @@
+"""
+Metrics - Prometheus-style counters, gauges and histograms with a /metrics endpoint
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Set METRICS_ENABLED=0 to turn every metric into a no-op
+ENABLED = os.getenv("METRICS_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+
+# Seconds; spans fast model forwards to slow LLM generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _NoOp:
+    """Stands in for a metric child (and its timer) when metrics are disabled."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount: float = 1.0):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP = _NoOp()
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """Return the child for one combination of label values."""
+        if not ENABLED:
+            return NOOP
+        if kwargs:
+            values = tuple(kwargs.get(name, "") for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child holding the value for one combination of label values."""
+
+    @abstractmethod
+    def samples(self):
+        """(name, labels, value) triples for every child, in exposition order."""
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, key), child.value
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._callbacks: Dict[Tuple, Callable[[], float]] = {}
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """Read the gauge from fn() at scrape time, e.g. a queue's current depth."""
+        if ENABLED:
+            with self._lock:
+                self._callbacks[tuple(str(labels.get(name, "")) for name in self.labelnames)] = fn
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, key), child.value
+        for key, fn in list(self._callbacks.items()):
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def time(self, **labels):
+        """Context manager observing how long its body takes, in seconds."""
+        return self.labels(**labels).time() if ENABLED else NOOP
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, le), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), cumulative
+
+
+class Registry:
+    def __init__(self):
+        """Every metric in the process, by name."""
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def expose(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.expose() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+# Metrics shared by every tool
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests handled", ("tool", "route", "method", "status"))
+HTTP_LATENCY = histogram("http_request_duration_seconds", "HTTP request latency", ("tool", "route", "method"))
+OPENAI_LATENCY = histogram("openai_request_duration_seconds", "OpenAI API call latency", ("tool", "model"))
+OPENAI_ERRORS = counter("openai_errors_total", "Failed OpenAI API calls", ("tool", "model", "error"))
+OPENAI_TOKENS = counter("openai_tokens_total", "Tokens sent to and received from OpenAI", ("tool", "model", "kind"))
+MODEL_LOAD = histogram("model_load_seconds", "Time to build a lazily loaded model or client", ("resource",))
+MODEL_FORWARD = histogram("model_forward_seconds", "Local model inference time", ("tool", "stage"),
+                          buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def instrument_app(app, tool: str, endpoint: Optional[str] = "/metrics"):
+    """Time every request of a Flask app per route and serve the registry at endpoint."""
+    if not ENABLED:
+        return app
+    from flask import Response, request
+
+    @app.before_request
+    def _start_timer():
+        request.environ["metrics.start"] = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = request.environ.get("metrics.start")
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_LATENCY.labels(tool, route, request.method).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(tool, route, request.method, response.status_code).inc()
+        return response
+
+    if endpoint:
+        @app.route(endpoint, methods=['GET'])
+        def metrics():
+            return Response(REGISTRY.expose(), mimetype=CONTENT_TYPE)
+
+    return app
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI - Local stand-in for the OpenAI API for offline load testing
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz), repeated to build audio
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+LOREM = ("Lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua").split()
+
+
+class LatencyModel:
+    def __init__(self, spec: str = "fixed:0.05", seed: int = None):
+        """Parse a latency distribution such as fixed:0.2, uniform:0.1,0.5,
+        normal:0.3,0.05 or lognormal:-1.5,0.5 (all in seconds)."""
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        self.rng = random.Random(seed)
+
+    def sample(self) -> float:
+        """Draw one delay in seconds."""
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.args)
+        if self.kind == "normal":
+            return max(0.0, self.rng.gauss(*self.args))
+        if self.kind == "lognormal":
+            return self.rng.lognormvariate(*self.args)
+        return self.args[0] if self.args else 0.0
+
+
+class MockConfig:
+    def __init__(self, latency: str = "fixed:0.05", tokens_per_second: float = 200.0,
+                 completion_tokens: int = 64, audio_bytes_per_second: float = 64_000,
+                 error_429_rate: float = 0.0, error_500_rate: float = 0.0,
+                 timeout_rate: float = 0.0, timeout_seconds: float = 30.0, seed: int = None):
+        """Behaviour of the mock: time to first token, generation speed and injected failures."""
+        self.latency = LatencyModel(latency, seed)
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.audio_bytes_per_second = audio_bytes_per_second
+        self.error_429_rate = error_429_rate
+        self.error_500_rate = error_500_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.rng = random.Random(seed)
+
+
+def _prompt_tokens(messages: list) -> int:
+    return sum(len(str(m.get("content", "")).split()) for m in messages) + 3 * len(messages) + 3
+
+
+def _completion_words(messages: list, count: int) -> list:
+    """Deterministic filler text derived from the prompt, so identical prompts get identical answers."""
+    seed = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).digest()
+    rng = random.Random(seed)
+    return [rng.choice(LOREM) for _ in range(count)]
+
+
+def _error(status: int, message: str, error_type: str):
+    return jsonify({"error": {"message": message, "type": error_type, "code": None}}), status
+
+
+def create_app(config: MockConfig = None) -> Flask:
+    """Build the mock API application."""
+    config = config or MockConfig()
+    app = Flask(__name__)
+    stats = {"requests": 0, "errors": 0}
+
+    @app.before_request
+    def inject_faults():
+        if not request.path.startswith("/v1/"):
+            return None
+        stats["requests"] += 1
+        roll = config.rng.random()
+        if roll < config.error_429_rate:
+            stats["errors"] += 1
+            return _error(429, "Rate limit reached (mock)", "rate_limit_exceeded")
+        roll -= config.error_429_rate
+        if roll < config.error_500_rate:
+            stats["errors"] += 1
+            return _error(500, "The server had an error (mock)", "server_error")
+        roll -= config.error_500_rate
+        if roll < config.timeout_rate:
+            stats["errors"] += 1
+            time.sleep(config.timeout_seconds)
+            return _error(504, "Gateway timeout (mock)", "timeout")
+        time.sleep(config.latency.sample())
+        return None
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json(force=True)
+        messages = body.get("messages", [])
+        model = body.get("model", "gpt-3.5-turbo")
+        count = min(config.completion_tokens, body.get("max_tokens") or config.completion_tokens)
+        words = _completion_words(messages, count)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_tokens = _prompt_tokens(messages)
+        delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        if not body.get("stream"):
+            time.sleep(delay * count)
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop" if count == config.completion_tokens else "length",
+                }],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": count,
+                          "total_tokens": prompt_tokens + count},
+            })
+
+        def events():
+            def chunk(delta, finish_reason=None):
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                           "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                return f"data: {json.dumps(payload)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                time.sleep(delay)
+                yield chunk({"content": word if i == 0 else f" {word}"})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return Response(events(), mimetype="text/event-stream")
+
+    @app.route('/v1/audio/speech', methods=['POST'])
+    def audio_speech():
+        body = request.get_json(force=True)
+        text = body.get("input", "")
+        # Roughly 15 characters of text per second of speech, ~38 frames per second
+        frames = max(1, int(len(text) / 15 * 38))
+        frame_delay = len(SILENT_MP3_FRAME) / config.audio_bytes_per_second
+
+        def audio():
+            for _ in range(frames):
+                time.sleep(frame_delay)
+                yield SILENT_MP3_FRAME
+
+        mimetype = {"opus": "audio/ogg", "aac": "audio/aac", "flac": "audio/flac",
+                    "wav": "audio/wav", "pcm": "audio/pcm"}.get(body.get("response_format"), "audio/mpeg")
+        return Response(audio(), mimetype=mimetype)
+
+    @app.route('/v1/embeddings', methods=['POST'])
+    def embeddings():
+        body = request.get_json(force=True)
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or 1536
+        data = []
+        for i, text in enumerate(inputs):
+            digest = hashlib.sha256(str(text).encode("utf-8")).digest()
+            rng = random.Random(digest)
+            vector = [rng.uniform(-1, 1) for _ in range(dimensions)]
+            norm = sum(v * v for v in vector) ** 0.5
+            data.append({"object": "embedding", "index": i, "embedding": [v / norm for v in vector]})
+        tokens = sum(len(str(t).split()) for t in inputs)
+        return jsonify({"object": "list", "data": data, "model": body.get("model", "text-embedding-3-small"),
+                        "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    @app.route('/v1/models', methods=['GET'])
+    def models():
+        return jsonify({"object": "list", "data": [
+            {"id": name, "object": "model", "created": 0, "owned_by": "mock"}
+            for name in ("gpt-3.5-turbo", "gpt-4o-mini", "tts-1", "text-embedding-3-small")
+        ]})
+
+    @app.route('/mock/stats', methods=['GET'])
+    def mock_stats():
+        return jsonify(stats)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the OpenAI API")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind")
+    parser.add_argument("--port", "-p", type=int, default=8000, help="Port to bind")
+    parser.add_argument("--latency", type=str, default="fixed:0.05",
+                        help="Time to first token: fixed:S, uniform:A,B, normal:MU,SIGMA or lognormal:MU,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Completion generation speed")
+    parser.add_argument("--completion-tokens", type=int, default=64, help="Tokens per completion")
+    parser.add_argument("--audio-bytes-per-second", type=float, default=64_000, help="Speech streaming speed")
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-500-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="How long hanging requests hang")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        audio_bytes_per_second=args.audio_bytes_per_second,
+        error_429_rate=args.error_429_rate,
+        error_500_rate=args.error_500_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        seed=args.seed,
+    )
+    print(f"🧪 Mock OpenAI API on http://{args.host}:{args.port}/v1")
+    print(f"   export OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    create_app(config).run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
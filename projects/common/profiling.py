@@ -0,0 +1,267 @@
+"""
+Profiling - Opt-in per-request profiles (speedscope, cProfile and torch.profiler traces)
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_DIR = str(Path.home() / ".cache" / "mini-ai-labs" / "profiles")
+
+EXTENSIONS = (".speedscope.json", ".pstats", ".torch.json")
+
+# cProfile (sys.monitoring on Python 3.12+) and torch.profiler are process-wide, so only one
+# request is profiled at a time
+_active = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Another request is being profiled in this process."""
+
+
+class ProfilingConfig:
+    def __init__(self, enabled: bool = False, token: str = "", directory: str = DEFAULT_DIR,
+                 interval: float = 0.001, keep: int = 50):
+        """When and where request profiles are captured."""
+        self.enabled = enabled
+        self.token = token
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+
+    @classmethod
+    def from_env(cls) -> "ProfilingConfig":
+        """Read PROFILING_ENABLED, PROFILING_TOKEN, PROFILING_DIR, PROFILING_INTERVAL and PROFILING_KEEP."""
+        return cls(
+            enabled=os.getenv("PROFILING_ENABLED", "").strip().lower() in ("1", "true", "yes", "on"),
+            token=os.getenv("PROFILING_TOKEN", ""),
+            directory=os.getenv("PROFILING_DIR", DEFAULT_DIR),
+            interval=float(os.getenv("PROFILING_INTERVAL", "0.001")),
+            keep=int(os.getenv("PROFILING_KEEP", "50")),
+        )
+
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        """Sample one thread's Python stack every interval seconds from a background thread."""
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = []
+        self.frame_index = {}
+        self.samples = []
+        self.weights = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_filename, code.co_name, code.co_firstlineno)
+        index = self.frame_index.get(key)
+        if index is None:
+            index = self.frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def to_speedscope(self, name: str) -> dict:
+        """The samples in speedscope's file format (https://www.speedscope.app)."""
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+            "name": name,
+            "exporter": "mini-ai-labs",
+        }
+
+
+class RequestProfile:
+    def __init__(self, config: ProfilingConfig, tool: str, mode: str):
+        """Everything captured for one request: a stack sampler or cProfile, plus torch ops if torch is loaded."""
+        self.config = config
+        self.id = f"{tool}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self.sampler = None
+        self.cprofile = None
+        self.torch_profile = None
+        self.files = []
+        self._started = False
+
+    def start(self):
+        """Start capturing; raises ProfilerBusyError while another request is profiled."""
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusyError("Another request is being profiled; retry when it has finished")
+        self._started = True
+        try:
+            self._start()
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self):
+        if self._started:
+            self._started = False
+            _active.release()
+
+    def _start(self):
+        torch = sys.modules.get("torch")
+        if torch is not None and hasattr(torch, "profiler"):
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self.torch_profile = torch.profiler.profile(activities=activities, record_shapes=True)
+            self.torch_profile.__enter__()
+        if self.mode == "cprofile":
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        else:
+            self.sampler = StackSampler(threading.get_ident(), self.config.interval).start()
+
+    def stop(self) -> list:
+        """Stop profiling and write the trace files; returns their names."""
+        try:
+            if self.cprofile is not None:
+                self.cprofile.disable()
+            if self.sampler is not None:
+                self.sampler.stop()
+            if self.torch_profile is not None:
+                self.torch_profile.__exit__(None, None, None)
+        finally:
+            self._release()
+
+        directory = Path(self.config.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if self.sampler is not None:
+            path = directory / f"{self.id}.speedscope.json"
+            path.write_text(json.dumps(self.sampler.to_speedscope(self.id)), encoding="utf-8")
+            self.files.append(path.name)
+        if self.cprofile is not None:
+            path = directory / f"{self.id}.pstats"
+            self.cprofile.dump_stats(str(path))
+            self.files.append(path.name)
+        if self.torch_profile is not None:
+            path = directory / f"{self.id}.torch.json"
+            self.torch_profile.export_chrome_trace(str(path))
+            self.files.append(path.name)
+        prune(directory, self.config.keep)
+        return self.files
+
+
+def prune(directory: Path, keep: int):
+    """Keep only the newest keep profiles (counting each request's files once)."""
+    ids = {}
+    for path in directory.iterdir():
+        for ext in EXTENSIONS:
+            if path.name.endswith(ext):
+                profile_id = path.name[:-len(ext)]
+                ids[profile_id] = max(ids.get(profile_id, 0), path.stat().st_mtime)
+    for profile_id in sorted(ids, key=ids.get)[:max(0, len(ids) - keep)]:
+        for ext in EXTENSIONS:
+            (directory / f"{profile_id}{ext}").unlink(missing_ok=True)
+
+
+def instrument_profiling(app, tool: str, config: Optional[ProfilingConfig] = None):
+    """Let a Flask app profile individual requests on demand.
+
+    Nothing is registered unless profiling is enabled (PROFILING_ENABLED=1), so
+    there is no per-request cost when it is off. When on, a request asking for
+    a profile with ?profile=1 (or ?profile=cprofile) or an X-Profile header is
+    profiled on its own; if PROFILING_TOKEN is set the request must also carry
+    it in X-Profile-Token (or ?token=). The response's X-Profile-Files header names the traces, downloadable
+    from /profiles/<file>. One request is profiled at a time; asking for a profile while
+    another is running gets 409.
+    """
+    config = config or ProfilingConfig.from_env()
+    if not config.enabled:
+        return app
+    from flask import abort, g, jsonify, request, send_from_directory, url_for
+
+    def authorised() -> bool:
+        return not config.token or request.headers.get("X-Profile-Token") == config.token \
+            or request.args.get("token") == config.token
+
+    def requested_mode() -> Optional[str]:
+        value = request.headers.get("X-Profile") or request.args.get("profile")
+        if not value or value in ("0", "false") or not authorised():
+            return None
+        return "cprofile" if value == "cprofile" else "sample"
+
+    @app.before_request
+    def _start_profile():
+        if request.endpoint in ("profile_list", "profile_download"):
+            return
+        mode = requested_mode()
+        if mode is not None:
+            profile = RequestProfile(config, tool, mode)
+            try:
+                profile.start()
+            except ProfilerBusyError as e:
+                return jsonify({"error": str(e)}), 409, {"Retry-After": "1"}
+            g.request_profile = profile
+
+    @app.after_request
+    def _stop_profile(response):
+        profile = g.pop("request_profile", None)
+        if profile is not None:
+            files = profile.stop()
+            response.headers["X-Profile-Files"] = ",".join(
+                url_for("profile_download", filename=name) for name in files)
+        return response
+
+    @app.teardown_request
+    def _abandon_profile(exc):
+        profile = g.pop("request_profile", None)
+        if profile is not None:
+            profile.stop()
+
+    @app.route('/profiles', methods=['GET'])
+    def profile_list():
+        if not authorised():
+            abort(403)
+        directory = Path(config.directory)
+        names = sorted((p.name for p in directory.iterdir() if p.name.startswith(f"{tool}-")), reverse=True) \
+            if directory.exists() else []
+        return jsonify([{"file": name, "url": url_for("profile_download", filename=name)} for name in names])
+
+    @app.route('/profiles/<path:filename>', methods=['GET'])
+    def profile_download(filename):
+        if not authorised() or not filename.startswith(f"{tool}-"):
+            abort(403)
+        return send_from_directory(config.directory, filename, as_attachment=True)
+
+    return app
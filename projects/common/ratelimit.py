@@ -0,0 +1,44 @@
+"""
+Rate Limit - Token bucket shared by the threads of a batch run
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    def __init__(self, rate: float, per: float = 60.0, burst: Optional[int] = None):
+        """Allow rate calls per per seconds (e.g. 60 per minute), with bursts of up to burst calls.
+
+        A rate of 0 or less disables limiting.
+        """
+        self.rate = rate / per if rate > 0 else 0.0
+        self.capacity = float(burst) if burst is not None else 1.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    @classmethod
+    def per_minute(cls, rpm: float, burst: Optional[int] = None) -> "RateLimiter":
+        return cls(rpm, 60.0, burst)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until tokens calls are allowed; returns the seconds waited.
+
+        Callers reserve their slot under the lock and sleep outside it, so waiting
+        threads are released in arrival order at exactly the configured rate.
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+        if wait:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,188 @@
+"""
+Semantic Cache - Returns stored answers for paraphrased questions
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+STOPWORDS = frozenset(
+    "a an the is are was were be been do does did of to in on for with at by from "
+    "and or what whats which who how why when where this that these those it its "
+    "i me my we our you your can could would should please tell explain about".split()
+)
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 256):
+        """Offline embedder: hashes words and character trigrams into a fixed-size vector."""
+        self.dim = dim
+
+    def _features(self, text: str):
+        words = [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS]
+        for word in words:
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+        for first, second in zip(words, words[1:]):
+            yield f"{first} {second}", 0.5
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return an L2-normalised float32 vector for the text."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        """Local embedding model; needs the optional sentence-transformers package."""
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return an L2-normalised float32 vector for the text."""
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+class LSHIndex:
+    def __init__(self, dim: int, capacity: int = 100_000, num_tables: int = 16,
+                 num_bits: int = 12, seed: int = 0):
+        """Fixed-capacity nearest-neighbour index using random-hyperplane LSH.
+
+        Vectors are stored int8-quantised in a ring buffer, so memory is bounded by
+        capacity * (dim + 8 * num_tables) bytes no matter how many entries are added.
+        Search only re-ranks entries that share a bucket with the query in some table.
+        """
+        self.dim = dim
+        self.capacity = capacity
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((num_tables * num_bits, dim)).astype(np.float32)
+        self.powers = (1 << np.arange(num_bits)).astype(np.int64)
+        self.vectors = np.zeros((capacity, dim), dtype=np.int8)
+        self.codes = np.zeros((capacity, num_tables), dtype=np.int32)
+        self.buckets = [dict() for _ in range(num_tables)]
+        self.size = 0
+        self.next_slot = 0
+
+    def _codes(self, vector: np.ndarray) -> np.ndarray:
+        bits = (self.planes @ vector > 0).reshape(self.num_tables, self.num_bits)
+        return bits.astype(np.int64) @ self.powers
+
+    def add(self, vector: np.ndarray) -> int:
+        """Insert a normalised vector, overwriting the oldest entry when full. Returns its slot."""
+        slot = self.next_slot
+        if self.size == self.capacity:
+            for table, code in enumerate(self.codes[slot]):
+                self.buckets[table][int(code)].remove(slot)
+        else:
+            self.size += 1
+        codes = self._codes(vector)
+        for table, code in enumerate(codes):
+            self.buckets[table].setdefault(int(code), array("I")).append(slot)
+        self.codes[slot] = codes
+        self.vectors[slot] = np.clip(np.round(vector * 127), -127, 127).astype(np.int8)
+        self.next_slot = (slot + 1) % self.capacity
+        return slot
+
+    def search(self, vector: np.ndarray, k: int = 1) -> List[Tuple[int, float]]:
+        """Return up to k (slot, cosine similarity) pairs, best first."""
+        found = [self.buckets[table].get(int(code)) for table, code in enumerate(self._codes(vector))]
+        found = [np.frombuffer(bucket, dtype=np.uint32) for bucket in found if bucket]
+        if not found:
+            return []
+        candidates = np.unique(np.concatenate(found))
+        scores = self.vectors[candidates].astype(np.float32) @ vector / 127.0
+        order = np.argsort(-scores)[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+
+class SemanticCache:
+    def __init__(self, embedder=None, threshold: float = 0.8, capacity: int = 100_000,
+                 ttl: float = 7 * 24 * 3600, candidates: int = 8):
+        """Cache answers by question similarity within a context (document, model, ...)."""
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.candidates = candidates
+        self.index = LSHIndex(self.embedder.dim, capacity)
+        self.answers = [None] * capacity
+        self.contexts = np.zeros(capacity, dtype=np.uint64)
+        self.created = np.zeros(capacity, dtype=np.float64)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, tool: str) -> Optional["SemanticCache"]:
+        """Build the cache for a tool from SEMANTIC_CACHE_* variables, or None when it is off."""
+        tools = [t.strip() for t in os.getenv("SEMANTIC_CACHE_TOOLS", "").split(",") if t.strip()]
+        if "all" not in tools and tool not in tools:
+            return None
+        embedder = None
+        if os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing") == "sentence-transformers":
+            embedder = SentenceTransformerEmbedder(os.getenv(
+                "SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+        return cls(
+            embedder=embedder,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8")),
+            capacity=int(os.getenv("SEMANTIC_CACHE_CAPACITY", "100000")),
+            ttl=float(os.getenv("SEMANTIC_CACHE_TTL", str(7 * 24 * 3600))),
+        )
+
+    @staticmethod
+    def context_id(context: str) -> int:
+        """Hash the context so answers are only reused for the same document/settings."""
+        return int.from_bytes(hashlib.blake2b(context.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def get(self, question: str, context: str = "") -> Optional[str]:
+        """Return the stored answer for the most similar question, if it clears the threshold."""
+        vector = self.embedder.embed(question)
+        context_id = self.context_id(context)
+        now = time.time()
+        with self._lock:
+            for slot, score in self.index.search(vector, self.candidates):
+                if score < self.threshold:
+                    break
+                if self.contexts[slot] != context_id:
+                    continue
+                if self.ttl > 0 and now - self.created[slot] > self.ttl:
+                    continue
+                self.hits += 1
+                return self.answers[slot]
+            self.misses += 1
+            return None
+
+    def put(self, question: str, answer: str, context: str = ""):
+        """Remember the answer given for a question."""
+        vector = self.embedder.embed(question)
+        with self._lock:
+            slot = self.index.add(vector)
+            self.answers[slot] = answer
+            self.contexts[slot] = self.context_id(context)
+            self.created[slot] = time.time()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.index.size,
+            "capacity": self.index.capacity,
+        }
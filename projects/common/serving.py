@@ -0,0 +1,75 @@
+"""
+Serving - Production serving mode (gunicorn workers) shared by every tool's --serve option
+"""
+
+import argparse
+import os
+from typing import Callable
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+
+def add_serve_arguments(parser: argparse.ArgumentParser):
+    """Add --serve and its tuning options to a tool's argument parser.
+
+    Defaults come from WEB_HOST, PORT, WEB_WORKERS, WEB_THREADS, WEB_KEEPALIVE and WEB_TIMEOUT.
+    """
+    parser.add_argument("--serve", action="store_true", help="Run with a production server (gunicorn)")
+    parser.add_argument("--host", type=str, default=os.getenv("WEB_HOST", "0.0.0.0"), help="Host to bind")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "5000")), help="Port to bind")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", "2")),
+                        help="Worker processes; each loads its own copy of any model")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("WEB_THREADS", "8")),
+                        help="Threads per worker; OpenAI-backed tools spend most time waiting on the API")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("WEB_KEEPALIVE", "5")),
+                        help="Seconds to hold idle keep-alive connections open")
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("WEB_TIMEOUT", "120")),
+                        help="Seconds before a stuck worker is restarted")
+
+
+if BaseApplication is not None:
+    class GunicornApplication(BaseApplication):
+        def __init__(self, app_factory: Callable, options: dict):
+            """Run app_factory() inside each worker after it forks."""
+            self.app_factory = app_factory
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.app_factory()
+
+
+def gunicorn_options(args: argparse.Namespace) -> dict:
+    """Translate the --serve arguments into gunicorn settings."""
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread" if args.threads > 1 else "sync",
+        "keepalive": args.keep_alive,
+        "timeout": args.timeout,
+        "accesslog": os.getenv("WEB_ACCESS_LOG") or None,
+        # Each worker builds its own app, so lazily loaded models are never shared across forks
+        "preload_app": False,
+    }
+
+
+def serve(app_factory: Callable, args: argparse.Namespace) -> int:
+    """Serve the app built by app_factory with gunicorn, or a threaded server where gunicorn is unavailable."""
+    print(f"🚀 Serving on http://{args.host}:{args.port} "
+          f"({args.workers} workers x {args.threads} threads, keep-alive {args.keep_alive}s)")
+    if BaseApplication is not None:
+        GunicornApplication(app_factory, gunicorn_options(args)).run()
+        return 0
+
+    from werkzeug.serving import run_simple
+    print("⚠️ gunicorn is not installed (or not supported here); falling back to a single-process threaded server")
+    run_simple(args.host, args.port, app_factory(), threaded=True)
+    return 0
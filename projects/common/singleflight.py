@@ -0,0 +1,186 @@
+"""
+Single Flight - Shares one upstream call between concurrent identical requests
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+DEFAULT_LOCK_DIR = str(Path.home() / ".cache" / "mini-ai-labs" / "singleflight")
+# Keys share this many lock files (named by hash prefix), so the lock directory stays bounded
+LOCK_BUCKETS = 4096
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        """Coalesce concurrent calls with the same key inside one process."""
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable):
+        """Run fn once for all callers currently waiting on key and give each the result.
+
+        Exceptions raised by fn are re-raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> dict:
+        """Upstream executions versus calls that piggybacked on one."""
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class FileSingleFlight(SingleFlight):
+    def __init__(self, lock_dir: str = DEFAULT_LOCK_DIR, result_ttl: float = 2.0):
+        """Coalesce identical calls across processes on one host.
+
+        Threads are first coalesced in-process; the leader then takes an flock on
+        one of LOCK_BUCKETS lock files picked by the key's hash. Processes that
+        find the lock held wait for it and pick up the leader's result from a
+        SQLite table if it finished within result_ttl seconds, otherwise they make
+        the call themselves. Results are stored as JSON: dicts, lists and scalars
+        come back as they were, completion objects (anything with model_dump) as
+        attribute-style look-alikes; anything else is not shared.
+        Needs fcntl, so it is not available on Windows.
+        """
+        import fcntl
+
+        super().__init__()
+        self._fcntl = fcntl
+        self.lock_dir = Path(lock_dir)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.result_ttl = result_ttl
+        self.shared = 0
+        self._db = sqlite3.connect(str(self.lock_dir / "results.sqlite3"), check_same_thread=False, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, finished_at REAL)")
+        self._db.commit()
+        self._db_lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable):
+        """Run fn once per key across threads and processes."""
+        return super().do(key, lambda: self._do_locked(key, fn))
+
+    def _do_locked(self, key: str, fn: Callable):
+        fcntl = self._fcntl
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        bucket = int(name, 16) % LOCK_BUCKETS
+        with open(self.lock_dir / f"{bucket:03x}.lock", "a+") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is making this call: wait for it, then reuse its result
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                result = self._recent_result(name)
+                if result is not None:
+                    self.shared += 1
+                    return result
+            try:
+                result = fn()
+                self._store_result(name, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _recent_result(self, name: str):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value FROM results WHERE key = ? AND finished_at >= ?",
+                (name, time.time() - self.result_ttl),
+            ).fetchone()
+        return _decode(row[0]) if row else None
+
+    def _store_result(self, name: str, result):
+        value = _encode(result)
+        if value is None:
+            return
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (name, value, time.time()))
+            self._db.execute("DELETE FROM results WHERE finished_at < ?", (time.time() - 60 * self.result_ttl,))
+            self._db.commit()
+
+    def stats(self) -> dict:
+        """In-process counters plus results shared from other processes."""
+        stats = super().stats()
+        stats["shared_across_processes"] = self.shared
+        return stats
+
+
+def _encode(result) -> Optional[str]:
+    """JSON text for a result, or None if it cannot be shared."""
+    if hasattr(result, "model_dump"):
+        payload = {"object": result.model_dump(mode="json")}
+    else:
+        payload = {"value": result}
+    try:
+        return json.dumps(payload)
+    except (TypeError, ValueError):
+        return None
+
+
+def _namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+def _decode(text: str):
+    payload = json.loads(text)
+    if "object" in payload:
+        return _namespace(payload["object"])
+    return payload["value"]
+
+
+def singleflight_from_env() -> Optional[SingleFlight]:
+    """Pick the coalescer from LLM_COALESCE: off, process (default) or file."""
+    mode = os.getenv("LLM_COALESCE", "process").strip().lower()
+    if mode in ("off", "0", "false", "none"):
+        return None
+    if mode == "file":
+        return FileSingleFlight(
+            lock_dir=os.getenv("LLM_COALESCE_DIR", DEFAULT_LOCK_DIR),
+            result_ttl=float(os.getenv("LLM_COALESCE_RESULT_TTL", "2.0")),
+        )
+    return SingleFlight()
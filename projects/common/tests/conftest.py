@@ -0,0 +1,5 @@
+"""Make the `common` package importable when running pytest from projects/common"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
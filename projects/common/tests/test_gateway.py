@@ -0,0 +1,51 @@
+"""Tests for the multi-tool gateway and lazy resources"""
+import json
+import sys
+import time
+from werkzeug.test import Client
+from common.gateway import Gateway
+from common.lazy import LazyResource, unload_idle
+
+
+def test_lazy_resource_loads_on_first_use_and_unloads_when_idle():
+    """Test that a resource is built once and dropped after being idle."""
+    built = []
+    resource = LazyResource(lambda: built.append(1) or object(), "test_model")
+    assert not resource.loaded
+
+    first = resource.get()
+    assert resource.get() is first
+    assert built == [1]
+
+    assert unload_idle(60) == []
+    assert resource.loaded
+    resource.last_used = time.monotonic() - 120
+    assert "test_model" in unload_idle(60)
+    assert not resource.loaded
+
+    resource.get()
+    assert resource.loads == 2
+
+
+def test_gateway_mounts_tools_under_prefixes():
+    """Test that a tool is imported on first request and served under its prefix."""
+    gateway = Gateway({"/password": "password_generator"})
+    client = Client(gateway)
+    assert json.loads(client.get("/healthz").get_data())["password_generator"]["mounted"] is False
+
+    redirect = client.get("/password")
+    assert redirect.status_code == 308
+    assert redirect.headers["Location"].endswith("/password/")
+
+    page = client.get("/password/")
+    assert page.status_code == 200
+    assert b'action="/password/analyze"' in page.get_data()
+    assert client.post("/password/analyze", data={"password": "Tr0ub4dor&3"}).status_code == 200
+
+    status = json.loads(client.get("/healthz").get_data())["password_generator"]
+    assert status["mounted"] and status["resource"]["loaded"]
+    assert client.get("/nope/").status_code == 404
+
+    # Tool-local modules are kept under the tool's name, not as shared top-level modules
+    assert "password_generator.estimator" in sys.modules and "estimator" not in sys.modules
+    assert not any(path.endswith("password_generator") for path in sys.path)
@@ -0,0 +1,76 @@
+"""Tests for the background job queue"""
+import threading
+import pytest
+from common.jobs import JobQueue, JobStore, QueueFullError
+
+
+def test_jobs_run_in_background_and_persist(tmp_path):
+    """Test that submit returns at once and results and failures are stored."""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    queue = JobQueue("test_tool", store, workers=1)
+    release = threading.Event()
+
+    job_id = queue.submit(lambda: release.wait(5) and "done")
+    assert queue.get(job_id)["status"] in ("queued", "running")
+    release.set()
+    job = queue.wait(job_id, 5)
+    assert job["status"] == "succeeded"
+    assert job["result"] == "done"
+
+    failing = queue.submit(lambda: 1 / 0)
+    assert queue.wait(failing, 5)["status"] == "failed"
+    assert "division" in queue.get(failing)["error"]
+
+    # A second store on the same file sees the same results
+    assert JobStore(str(tmp_path / "jobs.sqlite3")).get(job_id)["result"] == "done"
+    stats = queue.stats()
+    assert stats["succeeded"] == 1 and stats["failed"] == 1
+    assert stats["run_seconds"]["count"] == 2
+    queue.shutdown()
+
+
+def test_queue_is_bounded_and_restarts_abandon_unfinished_jobs(tmp_path):
+    """Test that a full queue rejects jobs and jobs of dead processes are failed."""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    queue = JobQueue("test_tool", store, workers=1, max_queued=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    running = queue.submit(lambda: started.set() or release.wait(5))
+    started.wait(5)
+    waiting = queue.submit(lambda: "next")
+    with pytest.raises(QueueFullError):
+        queue.submit(lambda: "too many")
+    assert queue.stats()["rejected"] == 1
+    assert queue.stats()["queued"] == 1
+
+    # A job left behind by a process that no longer exists
+    store.create("orphan", "test_tool")
+    store._execute("UPDATE jobs SET owner = '999999999:dead' WHERE id = 'orphan'")
+    JobQueue("test_tool", store)
+    assert store.get("orphan")["status"] == "failed"
+    assert store.get(running)["status"] == "running"
+
+    release.set()
+    assert queue.wait(waiting, 5)["result"] == "next"
+    queue.shutdown()
+
+
+def test_event_stream_ends_when_the_job_is_purged(tmp_path):
+    """Test that /jobs/<id>/events sends a final event instead of failing once the job is gone."""
+    from flask import Flask
+    from common.jobs import register_job_routes
+
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    queue = JobQueue("test_tool", store, workers=1)
+    release = threading.Event()
+    job_id = queue.submit(lambda: release.wait(5))
+    app = Flask(__name__)
+    register_job_routes(app, queue)
+
+    chunks = app.test_client().get(f"/jobs/{job_id}/events").response
+    assert next(chunks).decode().startswith("event: ")
+    store._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+    assert [chunk.decode().split("\n")[0] for chunk in chunks][-1] == "event: gone"
+    release.set()
+    queue.shutdown()
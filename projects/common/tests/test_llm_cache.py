@@ -0,0 +1,74 @@
+"""Tests for the LLM response cache"""
+import pytest
+from unittest.mock import Mock, patch
+from common.llm import chat_completion
+from common.llm_cache import CacheConfig, ResponseCache
+
+
+def make_client(content="Hola"):
+    """Create a mock OpenAI client returning a fixed completion."""
+    client = Mock()
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = content
+    response.usage.prompt_tokens = 20
+    response.usage.completion_tokens = 5
+    client.chat.completions.create.return_value = response
+    return client
+
+
+def test_cache_hit_skips_upstream(tmp_path):
+    """Test that a repeated deterministic request is served from cache."""
+    cache = ResponseCache(CacheConfig(enabled=True, db_path=str(tmp_path / "cache.db")))
+    client = make_client()
+    params = dict(model="gpt-3.5-turbo", messages=[{"role": "user", "content": "Hello"}], temperature=0.2)
+
+    first = chat_completion(client, cache, **params)
+    second = chat_completion(client, cache, **params)
+
+    assert first.choices[0].message.content == "Hola"
+    assert second.choices[0].message.content == "Hola"
+    assert client.chat.completions.create.call_count == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["saved_prompt_tokens"] == 20
+
+
+def test_disk_tier_survives_new_process(tmp_path):
+    """Test that entries are reloaded from SQLite by a fresh cache."""
+    db_path = str(tmp_path / "cache.db")
+    key = ResponseCache.key_for("gpt-3.5-turbo", [{"role": "user", "content": "Hi"}], 0.0)
+    ResponseCache(CacheConfig(enabled=True, db_path=db_path)).put(key, "cached")
+
+    fresh = ResponseCache(CacheConfig(enabled=True, db_path=db_path))
+    assert fresh.get(key).content == "cached"
+    assert fresh.stats()["disk_hits"] == 1
+
+    # Other request parameters are part of the key; empty completions are not stored
+    json_key = ResponseCache.key_for("gpt-3.5-turbo", [{"role": "user", "content": "Hi"}], 0.0,
+                                     response_format={"type": "json_object"})
+    assert json_key != key
+    fresh.put(json_key, None)
+    assert fresh.get(json_key) is None
+
+
+def test_ttl_and_temperature_policy(tmp_path):
+    """Test expiry and that sampled requests bypass the cache."""
+    cache = ResponseCache(CacheConfig(enabled=True, ttl=10, max_temperature=0.3, db_path=None))
+    with patch("common.llm_cache.time.time", return_value=1000.0):
+        cache.put("k", "old")
+    with patch("common.llm_cache.time.time", return_value=1011.0):
+        assert cache.get("k") is None
+
+    client = make_client()
+    for _ in range(2):
+        chat_completion(client, cache, model="gpt-3.5-turbo", messages=[], temperature=0.7)
+    assert client.chat.completions.create.call_count == 2
+
+
+@patch.dict('os.environ', {'LLM_CACHE_TOOLS': 'language_translator', 'LLM_CACHE_CODE_EXPLAINER': '1'})
+def test_config_from_env():
+    """Test the per-tool enable switch."""
+    assert CacheConfig.from_env("language_translator").enabled
+    assert CacheConfig.from_env("code_explainer").enabled
+    assert not CacheConfig.from_env("email_writer").enabled
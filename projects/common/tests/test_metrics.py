@@ -0,0 +1,55 @@
+"""Tests for the metrics registry and Flask instrumentation"""
+from flask import Flask
+from common import metrics
+from common.metrics import Registry, instrument_app
+
+
+def test_registry_exposition_format(monkeypatch):
+    """Test counters, callback gauges and histograms in the Prometheus text format."""
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("tool",))
+    depth = registry.gauge("queue_depth", "Queue depth", ("tool",))
+    latency = registry.histogram("latency_seconds", "Latency", ("tool",), buckets=(0.1, 1.0))
+
+    requests.labels("pdf_qa_bot").inc()
+    requests.labels(tool="pdf_qa_bot").inc(2)
+    depth.set_function(lambda: 7, tool="pdf_qa_bot")
+    latency.labels("pdf_qa_bot").observe(0.05)
+    latency.labels("pdf_qa_bot").observe(0.5)
+    latency.labels("pdf_qa_bot").observe(5)
+
+    text = registry.expose()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{tool="pdf_qa_bot"} 3' in text
+    assert 'queue_depth{tool="pdf_qa_bot"} 7' in text
+    assert 'latency_seconds_bucket{tool="pdf_qa_bot",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{tool="pdf_qa_bot",le="1"} 2' in text
+    assert 'latency_seconds_bucket{tool="pdf_qa_bot",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{tool="pdf_qa_bot"} 3' in text
+
+
+def test_instrumented_app_serves_metrics_and_disabled_metrics_are_noops(monkeypatch):
+    """Test per-route request timing, and that disabled metrics record nothing."""
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    app = Flask(__name__)
+    instrument_app(app, "test_tool")
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id):
+        return str(item_id)
+
+    client = app.test_client()
+    client.get('/items/1')
+    client.get('/items/2')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'http_requests_total{tool="test_tool",route="/items/<int:item_id>",method="GET",status="200"} 2' in text
+    assert 'http_request_duration_seconds_count{tool="test_tool",route="/items/<int:item_id>",method="GET"} 2' in text
+
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    histogram = Registry().histogram("disabled_seconds", "Disabled")
+    assert histogram.time(tool="x") is metrics.NOOP
+    with histogram.time():
+        pass
+    assert histogram.labels("x") is metrics.NOOP
+    assert "disabled_seconds_count" not in histogram.expose()
@@ -0,0 +1,83 @@
+"""Tests for the mock OpenAI server"""
+import json
+import pytest
+from common.loadtest import make_pdf, percentile, run_load
+from common.mock_openai import MockConfig, create_app
+
+
+def make_client(**config):
+    """Create a Flask test client for the mock with no added latency."""
+    return create_app(MockConfig(latency="fixed:0", tokens_per_second=0, seed=1, **config)).test_client()
+
+
+def test_chat_completion_shapes():
+    """Test non-streaming and streaming chat completions."""
+    client = make_client(completion_tokens=8)
+    body = {"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": "Hello"}]}
+
+    data = client.post("/v1/chat/completions", json=body).get_json()
+    assert data["object"] == "chat.completion"
+    assert len(data["choices"][0]["message"]["content"].split()) == 8
+    assert data["usage"]["completion_tokens"] == 8
+
+    stream = client.post("/v1/chat/completions", json=dict(body, stream=True)).get_data(as_text=True)
+    events = [line[6:] for line in stream.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    text = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+    assert text == data["choices"][0]["message"]["content"]
+
+
+def test_speech_and_embeddings():
+    """Test the audio and embeddings endpoints."""
+    client = make_client()
+    audio = client.post("/v1/audio/speech", json={"model": "tts-1", "voice": "alloy", "input": "Hello world"})
+    assert audio.mimetype == "audio/mpeg" and audio.data.startswith(b"\xff\xfb")
+
+    data = client.post("/v1/embeddings", json={"input": ["a", "b"], "dimensions": 8}).get_json()
+    assert len(data["data"]) == 2 and len(data["data"][0]["embedding"]) == 8
+
+
+def test_error_injection():
+    """Test that 429s are injected at the configured rate."""
+    client = make_client(error_429_rate=1.0)
+    response = client.post("/v1/chat/completions", json={"messages": []})
+    assert response.status_code == 429
+
+
+def test_loadtest_helpers():
+    """Test the harness's PDF builder and percentile helper."""
+    assert make_pdf("Hello").startswith(b"%PDF-1.4")
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 99) == 4
+
+
+def test_run_load_times_background_jobs_to_completion(tmp_path):
+    """Test that a tool answering with a job-pending page is timed until its job finishes, not at enqueue."""
+    import threading
+    import time
+    from flask import Flask
+    from werkzeug.serving import make_server
+    from common.jobs import JobQueue, JobStore, pending_html, register_job_routes
+
+    app = Flask(__name__)
+    queue = JobQueue("loadtest", JobStore(str(tmp_path / "jobs.db")), workers=2)
+    register_job_routes(app, queue)
+
+    @app.route('/', methods=['POST'])
+    def index():
+        return str(pending_html(queue.submit(lambda: time.sleep(0.3) or "done")))
+
+    @app.route('/fail', methods=['POST'])
+    def fail():
+        return str(pending_html(queue.submit(lambda: 1 / 0)))
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base = f"http://127.0.0.1:{server.server_port}"
+        result = run_load(f"{base}/", {"form": {}}, 2, 2, 10)
+        assert result["ok"] == 2 and result["p50_ms"] >= 300
+        assert run_load(f"{base}/fail", {"form": {}}, 1, 1, 10)["errors"] == 1
+    finally:
+        server.shutdown()
+        queue.shutdown()
@@ -0,0 +1,69 @@
+"""Tests for per-request profiling"""
+import json
+import time
+from flask import Flask
+from common.profiling import ProfilingConfig, RequestProfile, instrument_profiling
+
+
+def busy_work():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(100))
+    return "done"
+
+
+def make_app(config):
+    app = Flask(__name__)
+    instrument_profiling(app, "test_tool", config)
+    app.route('/work')(busy_work)
+    return app
+
+
+def test_flagged_requests_write_downloadable_traces(tmp_path):
+    """Test speedscope and cProfile traces for flagged requests only, and their download."""
+    client = make_app(ProfilingConfig(enabled=True, directory=str(tmp_path), keep=2)).test_client()
+
+    assert "X-Profile-Files" not in client.get('/work').headers
+    assert list(tmp_path.iterdir()) == []
+
+    response = client.get('/work?profile=1')
+    [url] = response.headers["X-Profile-Files"].split(",")
+    assert url.endswith(".speedscope.json")
+    trace = json.loads(client.get(url).data)
+    profile = trace["profiles"][0]
+    assert profile["type"] == "sampled" and profile["samples"]
+    names = {frame["name"] for frame in trace["shared"]["frames"]}
+    assert "busy_work" in names
+
+    response = client.get('/work', headers={"X-Profile": "cprofile"})
+    assert response.headers["X-Profile-Files"].endswith(".pstats")
+    assert len(client.get('/profiles').get_json()) == 2
+
+    # Only the newest keep requests are retained
+    client.get('/work?profile=1')
+    assert len(list(tmp_path.iterdir())) == 2
+
+    # Profilers are process-wide, so a second concurrent profile is refused rather than corrupted
+    running = RequestProfile(ProfilingConfig(directory=str(tmp_path)), "test_tool", "cprofile")
+    running.start()
+    try:
+        response = client.get('/work?profile=1')
+        assert response.status_code == 409 and "Another request" in response.get_json()["error"]
+        assert client.get('/work').status_code == 200
+    finally:
+        running.stop()
+    assert client.get('/work?profile=1').headers["X-Profile-Files"]
+
+
+def test_disabled_or_unauthorised_profiling_does_nothing(tmp_path):
+    """Test that disabled profiling registers no hooks and the token is enforced."""
+    app = make_app(ProfilingConfig(enabled=False, directory=str(tmp_path)))
+    assert not app.before_request_funcs and not app.after_request_funcs
+    assert app.test_client().get('/profiles').status_code == 404
+
+    client = make_app(ProfilingConfig(enabled=True, token="secret", directory=str(tmp_path))).test_client()
+    assert "X-Profile-Files" not in client.get('/work?profile=1').headers
+    assert client.get('/profiles').status_code == 403
+    response = client.get('/work?profile=1', headers={"X-Profile-Token": "secret"})
+    assert response.headers["X-Profile-Files"]
+    assert client.get('/profiles?token=secret').status_code == 200
@@ -0,0 +1,35 @@
+"""Tests for the token bucket rate limiter"""
+import threading
+import time
+from common.ratelimit import RateLimiter
+
+
+def test_rate_is_enforced_across_threads():
+    """Test that concurrent callers are spaced out to the configured rate."""
+    limiter = RateLimiter(20, per=1.0)
+    calls = []
+
+    def worker():
+        for _ in range(3):
+            limiter.acquire()
+            calls.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 12 calls at 20/s with a burst of 1: the first is free, the rest take 11/20 s
+    assert len(calls) == 12
+    assert time.monotonic() - start >= 0.5
+    assert limiter.waited > 0
+
+
+def test_burst_and_disabled_limiter():
+    """Test that a burst passes immediately and a zero rate never waits."""
+    limiter = RateLimiter(1, per=60.0, burst=5)
+    assert sum(limiter.acquire() for _ in range(5)) == 0
+    assert RateLimiter(0).acquire() == 0
+    assert RateLimiter.per_minute(0).acquire() == 0
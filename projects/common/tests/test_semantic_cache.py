@@ -0,0 +1,30 @@
+"""Tests for the semantic cache"""
+import pytest
+import numpy as np
+from common.semantic_cache import HashingEmbedder, LSHIndex, SemanticCache
+
+
+def test_paraphrase_hit_and_unrelated_miss():
+    """Test that paraphrased questions reuse answers and unrelated ones do not."""
+    cache = SemanticCache(capacity=100)
+    cache.put("What are the payment terms in the contract?", "Net 30", context="doc-1")
+
+    assert cache.get("Tell me the contract payment terms", context="doc-1") == "Net 30"
+    assert cache.get("Who signed the contract?", context="doc-1") is None
+    assert cache.get("Tell me the contract payment terms", context="doc-2") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_index_is_bounded():
+    """Test that the index overwrites the oldest entries once full."""
+    embedder = HashingEmbedder(dim=64)
+    index = LSHIndex(dim=64, capacity=3)
+    vectors = [embedder.embed(f"question number {word}") for word in ["one", "two", "three", "four"]]
+    slots = [index.add(v) for v in vectors]
+
+    assert slots == [0, 1, 2, 0]
+    assert index.size == 3
+    best_slot, score = index.search(vectors[3])[0]
+    assert best_slot == 0 and score > 0.98
+    for table in index.buckets:
+        assert sum(len(bucket) for bucket in table.values()) == 3
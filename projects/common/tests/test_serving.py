@@ -0,0 +1,31 @@
+"""Tests for the production serving options"""
+import argparse
+from common.serving import add_serve_arguments, gunicorn_options
+
+
+def test_serve_arguments_default_from_environment(monkeypatch):
+    """Test that worker, thread and keep-alive defaults come from the environment."""
+    monkeypatch.setenv("WEB_WORKERS", "3")
+    monkeypatch.setenv("WEB_THREADS", "16")
+    monkeypatch.setenv("PORT", "8080")
+    parser = argparse.ArgumentParser()
+    add_serve_arguments(parser)
+
+    args = parser.parse_args(["--serve", "--keep-alive", "10"])
+    assert args.serve
+    assert (args.workers, args.threads, args.port, args.keep_alive) == (3, 16, 8080, 10)
+
+
+def test_gunicorn_options():
+    """Test the translation of serve arguments into gunicorn settings."""
+    parser = argparse.ArgumentParser()
+    add_serve_arguments(parser)
+
+    options = gunicorn_options(parser.parse_args(["--port", "5001", "--workers", "4", "--threads", "8"]))
+    assert options["bind"] == "0.0.0.0:5001"
+    assert options["workers"] == 4
+    assert options["worker_class"] == "gthread"
+    assert options["preload_app"] is False
+
+    options = gunicorn_options(parser.parse_args(["--threads", "1"]))
+    assert options["worker_class"] == "sync"
@@ -0,0 +1,79 @@
+"""Tests for request coalescing"""
+import hashlib
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from common import llm
+from common.singleflight import FileSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Test that identical concurrent calls run the function once."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+    for t in followers:
+        t.start()
+    while flight.stats()["coalesced"] < 5:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader] + followers:
+        t.join()
+
+    assert results == ["result"] * 6
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 5, "in_flight": 0}
+
+
+def test_errors_propagate_to_all_callers():
+    """Test that the leader's exception is raised and the key is released."""
+    flight = SingleFlight()
+    with pytest.raises(RuntimeError):
+        flight.do("k", Mock(side_effect=RuntimeError("429")))
+    assert flight.do("k", lambda: "retry") == "retry"
+
+
+def test_file_singleflight_reuses_recent_result(tmp_path):
+    """Test that a waiter picks up the result stored by the lock holder."""
+    flight = FileSingleFlight(lock_dir=str(tmp_path), result_ttl=5.0)
+    assert flight.do("k", lambda: {"content": "Hola"}) == {"content": "Hola"}
+    name = hashlib.sha256(b"k").hexdigest()
+    assert flight._recent_result(name) == {"content": "Hola"}
+
+    # Completion objects come back as attribute-style look-alikes; results JSON cannot hold are not shared
+    completion = Mock()
+    completion.model_dump.return_value = {"choices": [{"message": {"content": "Hallo"}}]}
+    flight.do("completion", lambda: completion)
+    shared = flight._recent_result(hashlib.sha256(b"completion").hexdigest())
+    assert shared.choices[0].message.content == "Hallo"
+    flight.do("object", object)
+    assert flight._recent_result(hashlib.sha256(b"object").hexdigest()) is None
+    # Distinct keys share a bounded set of lock files
+    flight = FileSingleFlight(lock_dir=str(tmp_path / "bucketed"))
+    with patch("common.singleflight.LOCK_BUCKETS", 4):
+        for key in range(20):
+            flight.do(f"request {key}", lambda: key)
+    assert len(list((tmp_path / "bucketed").glob("*.lock"))) <= 4
+
+
+@patch.object(llm, "_coalescer", SingleFlight())
+def test_chat_completion_uses_coalescer():
+    """Test that chat_completion routes upstream calls through the coalescer."""
+    client = Mock()
+    client.chat.completions.create.return_value = "response"
+    assert llm.chat_completion(client, model="gpt-3.5-turbo", messages=[]) == "response"
+    assert llm.get_coalescer().stats()["executed"] == 1
@@ -0,0 +1,57 @@
+"""Tests for token counting and budgets"""
+import time
+import pytest
+from unittest.mock import Mock, patch
+from common import tokens
+from common.llm import chat_completion
+from common.tokens import (ApproxEncoding, PromptTooLargeError, chunk_by_tokens, count_message_tokens,
+                           prompt_budget, trim_to_tokens)
+
+
+def test_approx_encoding_round_trips():
+    """Test that the offline encoder reproduces the original text."""
+    text = "def hello(name):\n    return f'Hello, {name}!'\n"
+    encoding = ApproxEncoding()
+    assert encoding.decode(encoding.encode(text)) == text
+
+
+def test_trim_and_chunk_respect_limits():
+    """Test trimming and chunking to a token limit."""
+    text = "\n".join(f"line number {i} with some words" for i in range(200))
+    trimmed = trim_to_tokens(text, 50)
+    assert trimmed.endswith("... [truncated]")
+    assert tokens.count_tokens(trimmed) <= 50
+
+    chunks = chunk_by_tokens(text, 100)
+    assert "".join(chunks) == text
+    assert all(tokens.count_tokens(chunk) <= 100 for chunk in chunks)
+
+
+@patch.dict('os.environ', {'LLM_TOKEN_BUDGETS': 'gpt-3.5-turbo=20'})
+def test_budget_enforced_before_call():
+    """Test that oversized prompts are rejected without calling the API."""
+    assert prompt_budget("gpt-3.5-turbo") == 20
+    client = Mock()
+    with pytest.raises(PromptTooLargeError):
+        chat_completion(client, model="gpt-3.5-turbo", messages=[{"role": "user", "content": "word " * 100}])
+    assert not client.chat.completions.create.called
+
+
+def test_usage_recorded_per_tool():
+    """Test that prompt/completion tokens are recorded for each request."""
+    client = Mock()
+    client.chat.completions.create.return_value.usage.prompt_tokens = 12
+    client.chat.completions.create.return_value.usage.completion_tokens = 4
+    chat_completion(client, tool="test_tool", model="gpt-3.5-turbo", messages=[{"role": "user", "content": "Hi"}])
+    assert tokens.usage.stats()["test_tool/gpt-3.5-turbo"]["prompt_tokens"] >= 12
+
+
+def test_counting_template_is_fast():
+    """Test that counting a repeated template message stays well under a millisecond."""
+    messages = [{"role": "system", "content": "You are a professional translator. " * 20},
+                {"role": "user", "content": "Translate to es: Hello"}]
+    count_message_tokens(messages)
+    start = time.perf_counter()
+    for _ in range(1000):
+        count_message_tokens(messages)
+    assert (time.perf_counter() - start) / 1000 < 0.001
@@ -0,0 +1,193 @@
+"""
+Tokens - Token counting, prompt budgets and usage accounting
+"""
+
+import os
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import List, Optional
+
+from common.metrics import OPENAI_TOKENS
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Context window per model; the prompt budget is this minus the completion allowance
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+DEFAULT_COMPLETION_TOKENS = 1024
+
+# Overheads from OpenAI's chat format: each message is wrapped in a few special tokens
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt cannot fit the model's token budget."""
+
+
+class ApproxEncoding:
+    """Offline stand-in for tiktoken: roughly one token per 4 characters of a word.
+
+    Tokens keep their leading whitespace, so decode(encode(text)) == text.
+    """
+    name = "approx"
+    _pattern = re.compile(r"\s*\w{1,4}|\s*[^\w\s]|\s+")
+
+    def encode(self, text: str) -> List[str]:
+        return self._pattern.findall(text)
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """Return the (cached) tokenizer for a model, falling back to ApproxEncoding offline."""
+    if tiktoken is not None:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            try:
+                return tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                pass
+        except Exception:
+            # tiktoken downloads its BPE files on first use; offline we approximate
+            pass
+    return ApproxEncoding()
+
+
+# Only short strings (system prompts, templates, form fields) are worth memoising
+MEMOISE_MAX_CHARS = 2000
+
+
+@lru_cache(maxsize=4096)
+def _cached_count(model: str, text: str) -> int:
+    return len(get_encoding(model).encode(text))
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Count the tokens in a piece of text.
+
+    Counts for short strings are memoised, so unchanged system prompts and
+    templates are only tokenized once per process.
+    """
+    if len(text) <= MEMOISE_MAX_CHARS:
+        return _cached_count(model, text)
+    return len(get_encoding(model).encode(text))
+
+
+def count_message_tokens(messages: list, model: str = "gpt-3.5-turbo") -> int:
+    """Count the prompt tokens a list of chat messages will use."""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        for value in message.values():
+            if isinstance(value, str):
+                total += count_tokens(value, model)
+    return total
+
+
+def prompt_budget(model: str, max_tokens: Optional[int] = None) -> int:
+    """Tokens available for the prompt once the completion allowance is reserved.
+
+    LLM_TOKEN_BUDGETS overrides the prompt budget per model, e.g.
+    "gpt-3.5-turbo=6000,gpt-4=4000".
+    """
+    for item in os.getenv("LLM_TOKEN_BUDGETS", "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() == model and value.strip():
+            return int(value)
+    window = CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    return window - (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def trim_to_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo",
+                   marker: str = "... [truncated]") -> str:
+    """Cut text down to at most max_tokens tokens, appending marker if anything was cut."""
+    encoding = get_encoding(model)
+    # Tokens are far shorter than 16 characters, so only the head of a long text needs encoding
+    head = text[:max_tokens * 16]
+    tokens = encoding.encode(head)
+    if len(tokens) <= max_tokens and len(head) == len(text):
+        return text
+    keep = max(0, max_tokens - len(encoding.encode(marker)))
+    return encoding.decode(tokens[:keep]) + marker
+
+
+def chunk_by_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> List[str]:
+    """Split text into pieces of at most max_tokens tokens, breaking between lines where possible."""
+    chunks, current, current_tokens = [], [], 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = count_tokens(line, model)
+        if line_tokens > max_tokens:
+            # A single oversized line is split on token boundaries
+            encoding = get_encoding(model)
+            tokens = encoding.encode(line)
+            pieces = [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+        else:
+            pieces = [line]
+        for piece in pieces:
+            piece_tokens = line_tokens if len(pieces) == 1 else count_tokens(piece, model)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def fit_to_budget(text: str, template_messages: list, model: str = "gpt-3.5-turbo",
+                  max_tokens: Optional[int] = None) -> str:
+    """Trim text so it fits the prompt budget alongside the fixed template messages."""
+    available = prompt_budget(model, max_tokens) - count_message_tokens(template_messages, model)
+    if available <= 0:
+        raise PromptTooLargeError(f"Prompt template alone exceeds the {model} token budget")
+    return trim_to_tokens(text, available, model)
+
+
+class UsageRecorder:
+    def __init__(self, history: int = 1000):
+        """Keep running token totals per tool and model plus the most recent requests."""
+        self.totals = {}
+        self.recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def record(self, tool: str, model: str, prompt_tokens: int, completion_tokens: int,
+               estimated_prompt_tokens: Optional[int] = None):
+        """Add one request's usage."""
+        OPENAI_TOKENS.labels(tool, model, "prompt").inc(prompt_tokens)
+        OPENAI_TOKENS.labels(tool, model, "completion").inc(completion_tokens)
+        with self._lock:
+            totals = self.totals.setdefault((tool, model), {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            totals["requests"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            self.recent.append({
+                "tool": tool,
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "estimated_prompt_tokens": estimated_prompt_tokens,
+            })
+
+    def stats(self) -> dict:
+        """Totals keyed by "tool/model"."""
+        with self._lock:
+            return {f"{tool}/{model}": dict(totals) for (tool, model), totals in self.totals.items()}
+
+
+usage = UsageRecorder()
@@ -4,35 +4,58 @@ Email Writer - Generates professional emails using AI
 """
 
 import argparse
+import csv
+import json
 import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.ratelimit import RateLimiter
+from common.serving import add_serve_arguments, serve
+from common.tokens import count_tokens
+
 load_dotenv()
 
+SYSTEM_PROMPT = "You are an expert email writer. Write clear, professional emails."
+
 class EmailWriter:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None):
         """Initialize the email writer."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else ResponseCache.from_env("email_writer")
 
     def write(self, purpose: str, recipient: str = "", tone: str = "professional", 
-              context: str = "", length: str = "medium") -> str:
-        """Generate an email."""
+              context: str = "", length: str = "medium", guidance: str = "") -> str:
+        """Generate an email; guidance (e.g. a mail-merge template) is added to the instructions."""
+        guidance = f"\nFollow this guidance:\n{guidance.strip()}\n" if guidance.strip() else ""
         prompt = f"""Write a {tone} email with the following details:
 - Purpose: {purpose}
 - Recipient: {recipient or 'General recipient'}
 - Context: {context or 'No specific context'}
 - Length: {length}
-
+{guidance}
 Generate a complete email with subject line and body. Make it professional and appropriate."""
         
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client, self.cache, tool="email_writer",
             model="gpt-3.5-turbo",
             messages=[
-                {"role": "system", "content": "You are an expert email writer. Write clear, professional emails."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7
@@ -40,6 +63,238 @@ Generate a complete email with subject line and body. Make it professional and a
         
         return response.choices[0].message.content.strip()
 
+# Rough completion size of one email, used to size multi-email prompts
+EMAIL_TOKENS = {"short": 150, "medium": 300, "long": 600}
+MAX_GROUP_COMPLETION_TOKENS = 3500
+# Recipients with more context than this get a prompt of their own
+SOLO_CONTEXT_TOKENS = 300
+
+MERGE_FIELDS = ("id", "recipient", "purpose", "context", "tone", "length")
+# Added to each input row; named so they never collide with an input "email" address column
+OUTPUT_FIELDS = ("generated_email", "error")
+EMAIL_MARKER = re.compile(r"^=+\s*EMAIL\s+(\S+?)\s*=+\s*$", re.MULTILINE)
+
+
+def read_recipients(path: str) -> List[dict]:
+    """Read mail-merge rows (recipient, purpose, context, tone, length) from a CSV or JSONL file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if Path(path).suffix.lower() in (".jsonl", ".ndjson", ".json"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    rows = [{k: str(v).strip() for k, v in row.items() if k and v is not None} for row in rows]
+    for index, row in enumerate(rows, 1):
+        row["id"] = row.get("id") or str(index)
+    return rows
+
+
+def output_columns(rows: List[dict]) -> List[str]:
+    """Every input column in first-seen order, followed by the generated ones."""
+    columns = {}
+    for row in rows:
+        columns.update(dict.fromkeys(k for k in row if k not in OUTPUT_FIELDS))
+    return list(columns) + list(OUTPUT_FIELDS)
+
+
+class ResultWriter:
+    def __init__(self, path: str, columns: Optional[List[str]] = None):
+        """Append merged emails to a JSONL or CSV file as they arrive (thread-safe).
+
+        CSV output has the given columns (see output_columns), so input columns are
+        carried through next to the generated email.
+        """
+        self.path = path
+        self.csv = Path(path).suffix.lower() == ".csv"
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, columns or list(MERGE_FIELDS + OUTPUT_FIELDS),
+                                      extrasaction="ignore") if self.csv else None
+        if self._writer:
+            self._writer.writeheader()
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        with self._lock:
+            if self._writer:
+                self._writer.writerow(record)
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class MailMerge:
+    def __init__(self, writer: EmailWriter, template: str = "", group_size: int = 1,
+                 concurrency: int = 4, rate_limiter: Optional[RateLimiter] = None):
+        """Generate personalised emails for many recipients.
+
+        Each recipient gets a prompt of its own by default. With group_size > 1 the
+        shared instructions (tone, length and the optional template) are rendered once
+        per tone and length and sent once per prompt for up to group_size recipients,
+        instead of once per email; their contexts then share one prompt, so only opt
+        in when recipients may see material meant for each other's emails.
+        """
+        self.writer = writer
+        self.template = template.strip()
+        self.group_size = max(1, group_size)
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self._headers: Dict[tuple, str] = {}
+
+    def header(self, tone: str, length: str) -> str:
+        """The shared part of every prompt for one tone and length, rendered once."""
+        key = (tone, length)
+        if key not in self._headers:
+            guidance = f"\nShared guidance for every email:\n{self.template}\n" if self.template else ""
+            self._headers[key] = f"""Write one separate {tone} email for each recipient listed below.
+- Length of each email: {length}
+- Each email has a subject line and body, and is written only for its own recipient
+{guidance}
+Start each email with a line "=== EMAIL <id> ===" using the recipient's id, then the email. Write nothing else.
+
+Recipients:"""
+        return self._headers[key]
+
+    def plan(self, rows: List[dict]) -> List[List[dict]]:
+        """Group rows that share tone and length into prompts; long-context rows go alone."""
+        groups, open_groups = [], {}
+        for row in rows:
+            tone, length = row.get("tone") or "professional", row.get("length") or "medium"
+            if self.group_size == 1 or count_tokens(row.get("context", "")) > SOLO_CONTEXT_TOKENS:
+                groups.append([row])
+                continue
+            limit = min(self.group_size, max(1, MAX_GROUP_COMPLETION_TOKENS // EMAIL_TOKENS.get(length, 300)))
+            group = open_groups.setdefault((tone, length), [])
+            group.append(row)
+            if len(group) >= limit:
+                groups.append(open_groups.pop((tone, length)))
+        groups.extend(open_groups.values())
+        return groups
+
+    def write_group(self, group: List[dict]) -> List[dict]:
+        """Write every email of a group in one completion; rows it misses are retried alone."""
+        if len(group) == 1:
+            return [self.write_one(group[0])]
+        tone, length = group[0].get("tone") or "professional", group[0].get("length") or "medium"
+        lines = [f"- id {row['id']}: recipient: {row.get('recipient') or 'General recipient'}; "
+                 f"purpose: {row.get('purpose', '')}; context: {row.get('context') or 'No specific context'}"
+                 for row in group]
+        self.rate_limiter.acquire()
+        response = chat_completion(
+            self.writer.client, self.writer.cache, tool="email_writer",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": self.header(tone, length) + "\n" + "\n".join(lines)}
+            ],
+            temperature=0.7,
+            max_tokens=min(4000, EMAIL_TOKENS.get(length, 300) * len(group) + 100)
+        )
+        emails = split_emails(response.choices[0].message.content)
+        return [dict(row, generated_email=emails[row["id"]]) if emails.get(row["id"]) else self.write_one(row)
+                for row in group]
+
+    def write_one(self, row: dict) -> dict:
+        self.rate_limiter.acquire()
+        try:
+            email = self.writer.write(row.get("purpose", ""), row.get("recipient", ""),
+                                      row.get("tone") or "professional", row.get("context", ""),
+                                      row.get("length") or "medium", self.template)
+            return dict(row, generated_email=email)
+        except Exception as e:
+            return dict(row, error=str(e))
+
+    def run(self, rows: List[dict], on_result: Callable[[dict], None]) -> dict:
+        """Write every row's email concurrently, passing each result to on_result as it completes."""
+        start = time.perf_counter()
+        summary = {"emails": 0, "failed": 0, "prompts": 0}
+        groups = self.plan(rows)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self.write_group, group): group for group in groups}
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = [dict(row, error=str(e)) for row in futures[future]]
+                for record in results:
+                    summary["failed" if record.get("error") else "emails"] += 1
+                    on_result(record)
+        summary["prompts"] = len(groups)
+        summary["seconds"] = time.perf_counter() - start
+        summary["emails_per_second"] = len(rows) / summary["seconds"] if summary["seconds"] else 0.0
+        return summary
+
+
+def split_emails(text: str) -> Dict[str, str]:
+    """Split a multi-email completion on its "=== EMAIL <id> ===" markers."""
+    parts = EMAIL_MARKER.split(text)
+    return {parts[i].strip("<>"): parts[i + 1].strip() for i in range(1, len(parts) - 1, 2)}
+
+
+def create_app():
+    """Build the web app; the writer is created on the first request."""
+    from flask import Flask, request, render_template_string
+
+    app = Flask(__name__)
+    instrument_app(app, "email_writer")
+    writer = LazyResource(EmailWriter, "email_writer")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Email Writer</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
+            input, textarea, select { width: 100%; padding: 10px; margin: 5px 0; }
+            button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
+        </style>
+    </head>
+    <body>
+        <h1>📧 Email Writer</h1>
+        <form method="POST">
+            <input type="text" name="purpose" placeholder="Email purpose (e.g., meeting request)" required>
+            <input type="text" name="recipient" placeholder="Recipient (optional)">
+            <textarea name="context" placeholder="Additional context (optional)" rows="3"></textarea>
+            <select name="tone">
+                <option value="professional">Professional</option>
+                <option value="casual">Casual</option>
+                <option value="formal">Formal</option>
+                <option value="friendly">Friendly</option>
+            </select>
+            <select name="length">
+                <option value="short">Short</option>
+                <option value="medium" selected>Medium</option>
+                <option value="long">Long</option>
+            </select>
+            <button type="submit">Generate Email</button>
+        </form>
+        {% if email %}
+        <div class="result">{{ email }}</div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            purpose = request.form.get('purpose', '')
+            recipient = request.form.get('recipient', '')
+            tone = request.form.get('tone', 'professional')
+            context = request.form.get('context', '')
+            length = request.form.get('length', 'medium')
+            try:
+                email = writer.get().write(purpose, recipient, tone, context, length)
+                return render_template_string(HTML_TEMPLATE, email=email)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    return app
+
 
 def main():
     parser = argparse.ArgumentParser(description="Generate professional emails")
@@ -48,72 +303,47 @@ def main():
     parser.add_argument("--tone", "-t", type=str, default="professional", help="Email tone")
     parser.add_argument("--context", "-c", type=str, default="", help="Additional context")
     parser.add_argument("--length", "-l", type=str, default="medium", help="Email length (short/medium/long)")
+    parser.add_argument("--recipients-file", type=str, help="CSV or JSONL of recipients (recipient, purpose, context, tone) to mail-merge")
+    parser.add_argument("--output", "-o", type=str, default="emails.jsonl", help="Mail-merge output (.jsonl or .csv)")
+    parser.add_argument("--template", type=str, help="File with guidance shared by every mail-merge email")
+    parser.add_argument("--group-size", type=int, default=1,
+                       help="Recipients per prompt in mail-merge mode (default 1; larger groups share one prompt)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Prompts in flight at once in mail-merge mode")
+    parser.add_argument("--rate-limit", type=float, default=float(os.getenv("EMAIL_RATE_LIMIT", "60")),
+                       help="Max API calls per minute in mail-merge mode (0 for no limit)")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string
-        
-        app = Flask(__name__)
-        writer = EmailWriter()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Email Writer</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
-                input, textarea, select { width: 100%; padding: 10px; margin: 5px 0; }
-                button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
-            </style>
-        </head>
-        <body>
-            <h1>📧 Email Writer</h1>
-            <form method="POST">
-                <input type="text" name="purpose" placeholder="Email purpose (e.g., meeting request)" required>
-                <input type="text" name="recipient" placeholder="Recipient (optional)">
-                <textarea name="context" placeholder="Additional context (optional)" rows="3"></textarea>
-                <select name="tone">
-                    <option value="professional">Professional</option>
-                    <option value="casual">Casual</option>
-                    <option value="formal">Formal</option>
-                    <option value="friendly">Friendly</option>
-                </select>
-                <select name="length">
-                    <option value="short">Short</option>
-                    <option value="medium" selected>Medium</option>
-                    <option value="long">Long</option>
-                </select>
-                <button type="submit">Generate Email</button>
-            </form>
-            {% if email %}
-            <div class="result">{{ email }}</div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                purpose = request.form.get('purpose', '')
-                recipient = request.form.get('recipient', '')
-                tone = request.form.get('tone', 'professional')
-                context = request.form.get('context', '')
-                length = request.form.get('length', 'medium')
-                try:
-                    email = writer.write(purpose, recipient, tone, context, length)
-                    return render_template_string(HTML_TEMPLATE, email=email)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
+    elif args.recipients_file:
+        try:
+            rows = read_recipients(args.recipients_file)
+            template = Path(args.template).read_text(encoding="utf-8") if args.template else ""
+            merge = MailMerge(EmailWriter(), template, args.group_size, args.concurrency,
+                              RateLimiter.per_minute(args.rate_limit))
+            output = ResultWriter(args.output, output_columns(rows))
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+        try:
+            summary = merge.run(rows, output.write)
+        finally:
+            output.close()
+        print(f"📬 {summary['emails']} emails written to {args.output} from {summary['prompts']} prompts "
+              f"in {summary['seconds']:.1f}s ({summary['emails_per_second']:.1f} emails/s)")
+        if summary["failed"]:
+            print(f"   {summary['failed']} failed; see the error column")
+            return 1
+    
     elif args.purpose:
         try:
             writer = EmailWriter()
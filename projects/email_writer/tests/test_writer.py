@@ -24,3 +24,80 @@ def test_write():
         result = writer.write("test", "client", "professional")
         assert len(result) > 0
 
+
+
+def completion(text):
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = text
+    response.usage = None
+    return response
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_mail_merge_groups_recipients_and_retries_missing_emails(tmp_path):
+    """Test opt-in multi-email prompts, the per-recipient fallback and JSONL and CSV streaming."""
+    import csv
+    import json
+    from app import MailMerge, ResultWriter, output_columns, read_recipients
+    from common.llm_cache import CacheConfig, ResponseCache
+
+    recipients = tmp_path / "recipients.csv"
+    recipients.write_text("recipient,email,purpose,context,tone,plan\n"
+                          "Ann,ann@example.com,renewal,,friendly,pro\nBob,bob@example.com,renewal,,friendly,pro\n"
+                          "Cid,cid@example.com,renewal,,friendly,free\nDee,dee@example.com,invoice,,formal,pro\n")
+    rows = read_recipients(str(recipients))
+    assert [row["id"] for row in rows] == ["1", "2", "3", "4"]
+
+    def create(**params):
+        prompt = params["messages"][-1]["content"]
+        if "Write one separate" in prompt:
+            # The model forgets recipient 3
+            return completion("=== EMAIL 1 ===\nSubject: Hi Ann\n\nBody\n=== EMAIL 2 ===\nSubject: Hi Bob\n\nBody")
+        return completion("Subject: Single\n\nBody")
+
+    writer = EmailWriter(cache=ResponseCache(CacheConfig(enabled=False)))
+    merge = MailMerge(writer, template="Sign off as the Acme team.", group_size=3)
+    output = ResultWriter(str(tmp_path / "emails.jsonl"))
+    table = ResultWriter(str(tmp_path / "emails.csv"), output_columns(rows))
+    with patch.object(writer.client.chat.completions, 'create', side_effect=create) as mock_create:
+        summary = merge.run(rows, lambda record: (output.write(record), table.write(record)))
+    output.close()
+    table.close()
+
+    assert summary["emails"] == 4 and summary["failed"] == 0
+    # One prompt for the three friendly recipients, one for Dee, one retry for Cid
+    assert summary["prompts"] == 2 and mock_create.call_count == 3
+    grouped = [c for c in mock_create.call_args_list if "Write one separate" in c.kwargs["messages"][-1]["content"]]
+    assert grouped[0].kwargs["messages"][-1]["content"].count("Sign off as the Acme team.") == 1
+    records = {r["id"]: r for r in map(json.loads, (tmp_path / "emails.jsonl").read_text().splitlines())}
+    assert records["1"]["generated_email"].startswith("Subject: Hi Ann")
+    assert records["1"]["email"] == "ann@example.com"
+    assert records["3"]["generated_email"] == "Subject: Single\n\nBody"
+    # CSV output keeps every input column next to the generated ones
+    with open(tmp_path / "emails.csv", newline="") as f:
+        table_rows = list(csv.DictReader(f))
+    assert list(table_rows[0]) == ["recipient", "email", "purpose", "context", "tone", "plan", "id",
+                                   "generated_email", "error"]
+    assert {row["plan"] for row in table_rows} == {"pro", "free"}
+    # Recipients are only grouped on request, and the template reaches every single-email prompt too
+    assert all(len(group) == 1 for group in MailMerge(writer).plan(rows))
+    assert all("Sign off as the Acme team." in c.kwargs["messages"][-1]["content"]
+               for c in mock_create.call_args_list)
+    with patch.object(writer.client.chat.completions, 'create', side_effect=create) as mock_create:
+        MailMerge(writer, template="Sign off as the Acme team.").run(rows, lambda record: None)
+    assert mock_create.call_count == 4
+    assert all("Sign off as the Acme team." in c.kwargs["messages"][-1]["content"]
+               for c in mock_create.call_args_list)
+
+
+def test_split_emails_and_plan_limits():
+    """Test marker parsing and that long contexts and group sizes are respected."""
+    from app import MailMerge, split_emails
+    assert split_emails("=== EMAIL a1 ===\nOne\n\n=== EMAIL <b2> ===\nTwo") == {"a1": "One", "b2": "Two"}
+    merge = MailMerge(Mock(), group_size=2)
+    rows = [{"id": str(i), "purpose": "p", "tone": "casual"} for i in range(5)]
+    rows.append({"id": "long", "purpose": "p", "tone": "casual", "context": "detail " * 1000})
+    groups = merge.plan(rows)
+    assert sorted(len(g) for g in groups) == [1, 1, 2, 2]
+    assert [g for g in groups if g[0]["id"] == "long"] == [[rows[-1]]]
@@ -4,11 +4,19 @@ Image Captioner - Generates human-like captions for images using BLIP
 """
 
 import argparse
+import sys
+from pathlib import Path
 import torch
 from PIL import Image
 from transformers import BlipProcessor, BlipForConditionalGeneration
 import os
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.metrics import MODEL_FORWARD, instrument_app
+from common.profiling import instrument_profiling
+from common.serving import add_serve_arguments, serve
+
 
 class ImageCaptioner:
     def __init__(self, model_name: str = "Salesforce/blip-image-captioning-base"):
@@ -24,13 +32,16 @@ class ImageCaptioner:
         """Generate a caption for the given image."""
         try:
             # Load and process image
-            image = Image.open(image_path).convert('RGB')
+            with MODEL_FORWARD.time(tool="image_captioner", stage="decode_image"):
+                image = Image.open(image_path).convert('RGB')
             
             # Process image and generate caption
-            inputs = self.processor(image, return_tensors="pt").to(self.device)
+            with MODEL_FORWARD.time(tool="image_captioner", stage="preprocess"):
+                inputs = self.processor(image, return_tensors="pt").to(self.device)
             
             # Generate caption
-            out = self.model.generate(**inputs, max_length=50)
+            with MODEL_FORWARD.time(tool="image_captioner", stage="generate"):
+                out = self.model.generate(**inputs, max_length=50)
             caption = self.processor.decode(out[0], skip_special_tokens=True)
             
             return caption
@@ -38,87 +49,99 @@ class ImageCaptioner:
             raise Exception(f"Error processing image: {e}")
 
 
+def create_app(model_name: str = "Salesforce/blip-image-captioning-base"):
+    """Build the web app; the BLIP model is loaded on the first request."""
+    from flask import Flask, request, render_template_string, jsonify, send_from_directory
+    import werkzeug
+
+    app = Flask(__name__)
+    instrument_app(app, "image_captioner")
+    instrument_profiling(app, "image_captioner")
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+
+    captioner = LazyResource(lambda: ImageCaptioner(model_name), "image_captioner")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Image Captioner</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
+            input[type="file"] { margin: 20px 0; }
+            button { padding: 10px 20px; background: #007bff; color: white; border: none; cursor: pointer; }
+            button:hover { background: #0056b3; }
+            .caption { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; }
+            img { max-width: 100%; height: auto; margin: 20px 0; border-radius: 5px; }
+        </style>
+    </head>
+    <body>
+        <h1>🖼️ Image Captioner</h1>
+        <form method="POST" enctype="multipart/form-data">
+            <input type="file" name="image" accept="image/*" required>
+            <br>
+            <button type="submit">Generate Caption</button>
+        </form>
+        {% if caption %}
+        <div class="caption">
+            <h2>Caption:</h2>
+            <p>{{ caption }}</p>
+        </div>
+        {% endif %}
+        {% if error %}
+        <div class="caption" style="background: #f8d7da; color: #721c24;">
+            <strong>Error:</strong> {{ error }}
+        </div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            if 'image' not in request.files:
+                return render_template_string(HTML_TEMPLATE, error="No image file provided")
+
+            file = request.files['image']
+            if file.filename == '':
+                return render_template_string(HTML_TEMPLATE, error="No file selected")
+
+            try:
+                # Save uploaded file temporarily
+                temp_path = f"/tmp/{file.filename}"
+                file.save(temp_path)
+
+                # Generate caption
+                caption = captioner.get().caption_image(temp_path)
+
+                # Clean up
+                os.remove(temp_path)
+
+                return render_template_string(HTML_TEMPLATE, caption=caption)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+
+        return render_template_string(HTML_TEMPLATE)
+
+    return app
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate captions for images using BLIP")
     parser.add_argument("--image", "-i", type=str, help="Path to input image")
     parser.add_argument("--model", "-m", type=str, default="Salesforce/blip-image-captioning-base", 
                        help="BLIP model to use")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(lambda: create_app(args.model), args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string, jsonify, send_from_directory
-        import werkzeug
-        
-        app = Flask(__name__)
-        app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-        
-        captioner = ImageCaptioner(args.model)
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Image Captioner</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
-                input[type="file"] { margin: 20px 0; }
-                button { padding: 10px 20px; background: #007bff; color: white; border: none; cursor: pointer; }
-                button:hover { background: #0056b3; }
-                .caption { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; }
-                img { max-width: 100%; height: auto; margin: 20px 0; border-radius: 5px; }
-            </style>
-        </head>
-        <body>
-            <h1>🖼️ Image Captioner</h1>
-            <form method="POST" enctype="multipart/form-data">
-                <input type="file" name="image" accept="image/*" required>
-                <br>
-                <button type="submit">Generate Caption</button>
-            </form>
-            {% if caption %}
-            <div class="caption">
-                <h2>Caption:</h2>
-                <p>{{ caption }}</p>
-            </div>
-            {% endif %}
-            {% if error %}
-            <div class="caption" style="background: #f8d7da; color: #721c24;">
-                <strong>Error:</strong> {{ error }}
-            </div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                if 'image' not in request.files:
-                    return render_template_string(HTML_TEMPLATE, error="No image file provided")
-                
-                file = request.files['image']
-                if file.filename == '':
-                    return render_template_string(HTML_TEMPLATE, error="No file selected")
-                
-                try:
-                    # Save uploaded file temporarily
-                    temp_path = f"/tmp/{file.filename}"
-                    file.save(temp_path)
-                    
-                    # Generate caption
-                    caption = captioner.caption_image(temp_path)
-                    
-                    # Clean up
-                    os.remove(temp_path)
-                    
-                    return render_template_string(HTML_TEMPLATE, caption=caption)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app(args.model)
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
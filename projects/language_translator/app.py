@@ -4,28 +4,92 @@ Language Translator - Translates text between multiple languages
 """
 
 import argparse
+import json
 import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.serving import add_serve_arguments, serve
+from common.tokens import count_tokens
+from backends import LocalSeq2SeqBackend
+from documents import FORMATS, detect_format, translate_document
+from langid import get_identifier, normalize_lang
+from translation_memory import TranslationMemory
+
 load_dotenv()
 
+SYSTEM_PROMPT = "You are a professional translator. Translate accurately and naturally."
+
+# Source tokens and segments packed into one translate_batch prompt
+BATCH_TOKENS = 1500
+BATCH_SEGMENTS = 60
+
+SEGMENT_TAG = re.compile(r'<seg id="(\d+)">(.*?)</seg>', re.DOTALL)
+
 class LanguageTranslator:
-    def __init__(self):
-        """Initialize the translator."""
+    def __init__(self, cache: Optional[ResponseCache] = None, memory: Optional[TranslationMemory] = None,
+                 workers: Optional[int] = None, local: Optional[LocalSeq2SeqBackend] = None):
+        """Initialize the translator.
+
+        memory backs translate_batch, which runs up to workers prompts at once; language
+        pairs handled by local (TRANSLATOR_LOCAL_PAIRS) are translated on this machine.
+        """
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else ResponseCache.from_env("language_translator")
+        self.memory = memory if memory is not None else TranslationMemory.from_env()
+        self.workers = workers or int(os.getenv("TRANSLATOR_WORKERS", "4"))
+        self.local = local if local is not None else LocalSeq2SeqBackend.from_env()
+
+    def is_local(self, from_lang: str, to_lang: str) -> bool:
+        return self.local is not None and self.local.handles(from_lang, to_lang)
+
+    def resolve_source(self, texts: List[str], from_lang: str, to_lang: str) -> List[str]:
+        """The source language of each text: from_lang if given, else the detected language
+        when detection is confident, else "auto".
+
+        Text is only reported as already in to_lang when it is also clear of every
+        language without a profile, since that answer skips the translation.
+        """
+        if normalize_lang(from_lang) != "auto":
+            return [normalize_lang(from_lang)] * len(texts)
+        identifier = get_identifier()
+        target = normalize_lang(to_lang)
+        return [lang if identifier.is_confident(text, confidence)
+                and (lang != target or identifier.is_clear_of_others(text)) else "auto"
+                for text, (lang, confidence) in zip(texts, identifier.detect_many(texts))]
 
     def translate(self, text: str, from_lang: str = "auto", to_lang: str = "en") -> str:
-        """Translate text from one language to another."""
+        """Translate text from one language to another.
+
+        With from_lang="auto" the language is detected locally first: text already in
+        to_lang is returned as-is, and a confident detection picks the backend.
+        """
+        if from_lang == "auto":
+            from_lang = self.resolve_source([text], from_lang, to_lang)[0]
+            if from_lang == normalize_lang(to_lang):
+                return text
+        if self.is_local(from_lang, to_lang):
+            return self.local.translate_many([text], from_lang, to_lang)[0]
         prompt = f"Translate the following text from {from_lang} to {to_lang}. Only return the translation, no explanations:\n\n{text}"
         
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client, self.cache, tool="language_translator",
             model="gpt-3.5-turbo",
             messages=[
-                {"role": "system", "content": "You are a professional translator. Translate accurately and naturally."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3
@@ -33,83 +97,261 @@ class LanguageTranslator:
         
         return response.choices[0].message.content.strip()
 
+    def translate_batch(self, segments: List[str], to_lang: str = "en", from_lang: str = "auto") -> List[str]:
+        """Translate many short segments, returning translations in the same order.
+
+        With from_lang="auto" each segment's language is detected locally; segments
+        already in to_lang are returned unchanged. Segments already in the translation
+        memory for their source language never reach the API. Local pairs go to the local model in
+        length-sorted batches. Otherwise the rest are
+        de-duplicated and packed into as few prompts as fit BATCH_TOKENS, each segment
+        wrapped in a numbered <seg> tag, with similar earlier translations offered as
+        references; up to self.workers prompts run at once. Segments missing from a
+        reply are translated one by one.
+        """
+        unique = list(dict.fromkeys(s for s in segments if s.strip()))
+        # Route each source language separately; text already in to_lang is left as-is
+        groups = {}
+        for segment, lang in zip(unique, self.resolve_source(unique, from_lang, to_lang)):
+            groups.setdefault(lang, []).append(segment)
+        translations = {}
+        for lang, group in groups.items():
+            if lang == normalize_lang(to_lang):
+                translations.update((segment, segment) for segment in group)
+                continue
+            known = self.memory.lookup(group, to_lang, lang)
+            translations.update(known)
+            pending = [segment for segment in group if segment not in known]
+            translations.update(zip(pending, self._translate_pending(pending, to_lang, lang)))
+        return [translations.get(s, s) for s in segments]
+
+    def _translate_pending(self, pending: List[str], to_lang: str, from_lang: str) -> List[str]:
+        """Translate de-duplicated segments missing from the memory, and remember them."""
+        translations = {}
+        if pending and self.is_local(from_lang, to_lang):
+            translated = dict(zip(pending, self.local.translate_many(pending, from_lang, to_lang)))
+            self.memory.add(translated.items(), to_lang, from_lang)
+            translations.update(translated)
+            return [translations[s] for s in pending]
+        batches = pack_segments(pending)
+
+        def run(batch: List[str]) -> Dict[str, str]:
+            translated = self._translate_packed(batch, from_lang, to_lang)
+            for segment in batch:
+                if segment not in translated:
+                    translated[segment] = self.translate(segment, from_lang, to_lang)
+            self.memory.add(translated.items(), to_lang, from_lang)
+            return translated
+
+        if len(batches) > 1 and self.workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+                for translated in pool.map(run, batches):
+                    translations.update(translated)
+        else:
+            for batch in batches:
+                translations.update(run(batch))
+        return [translations[s] for s in pending]
+
+    def translate_file(self, path: str, to_lang: str = "en", from_lang: str = "auto",
+                       fmt: Optional[str] = None) -> str:
+        """Translate a Markdown, HTML, SRT or text file, keeping its structure, code and markup intact."""
+        text = Path(path).read_text(encoding="utf-8")
+        return translate_document(text, fmt or detect_format(path),
+                                  lambda segments: self.translate_batch(segments, to_lang, from_lang))
+
+    def _translate_packed(self, batch: List[str], from_lang: str, to_lang: str) -> Dict[str, str]:
+        references = {}
+        for segment in batch:
+            for source, target, _ in self.memory.fuzzy(segment, to_lang, from_lang, limit=1):
+                references[source] = target
+        prompt = f"""Translate each segment below from {from_lang} to {to_lang}.
+Return every segment in the same <seg id="N">...</seg> tags with the same ids, containing only its translation.
+Keep placeholders such as {{name}}, %s, HTML tags, `inline code`, URLs and line breaks unchanged."""
+        if references:
+            prompt += "\n\nEarlier translations to stay consistent with:\n" + "\n".join(
+                f"- {source} => {target}" for source, target in list(references.items())[:20])
+        prompt += "\n\n" + "\n".join(f'<seg id="{i}">{segment}</seg>' for i, segment in enumerate(batch, 1))
+
+        response = chat_completion(
+            self.client, self.cache, tool="language_translator",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=min(4000, 2 * sum(count_tokens(s) for s in batch) + 12 * len(batch) + 100)
+        )
+        translated = {}
+        for number, text in SEGMENT_TAG.findall(response.choices[0].message.content):
+            index = int(number) - 1
+            if 0 <= index < len(batch) and text.strip():
+                translated[batch[index]] = text.strip()
+        return translated
+
+
+def pack_segments(segments: List[str], max_tokens: int = BATCH_TOKENS,
+                  max_segments: int = BATCH_SEGMENTS) -> List[List[str]]:
+    """Split segments into consecutive batches of at most max_tokens and max_segments."""
+    batches, batch, tokens = [], [], 0
+    for segment in segments:
+        size = count_tokens(segment) + 8
+        if batch and (tokens + size > max_tokens or len(batch) >= max_segments):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(segment)
+        tokens += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def create_app():
+    """Build the web app; the translator is created on the first request."""
+    from flask import Flask, request, render_template_string, jsonify
+
+    app = Flask(__name__)
+    instrument_app(app, "language_translator")
+    translator = LazyResource(LanguageTranslator, "language_translator")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Language Translator</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
+            textarea { width: 100%; height: 150px; margin: 10px 0; }
+            select, button { padding: 10px; margin: 5px; }
+            button { background: #007bff; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; }
+        </style>
+    </head>
+    <body>
+        <h1>🌐 Language Translator</h1>
+        <form method="POST">
+            <textarea name="text" placeholder="Enter text to translate..." required></textarea>
+            <select name="from_lang">
+                <option value="auto">Auto-detect</option>
+                <option value="en">English</option>
+                <option value="es">Spanish</option>
+                <option value="fr">French</option>
+                <option value="de">German</option>
+                <option value="zh">Chinese</option>
+                <option value="ja">Japanese</option>
+            </select>
+            <select name="to_lang">
+                <option value="en">English</option>
+                <option value="es">Spanish</option>
+                <option value="fr">French</option>
+                <option value="de">German</option>
+                <option value="zh">Chinese</option>
+                <option value="ja">Japanese</option>
+            </select>
+            <button type="submit">Translate</button>
+        </form>
+        {% if translation %}
+        <div class="result">
+            <strong>Translation:</strong><br>{{ translation }}
+        </div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            text = request.form.get('text', '')
+            from_lang = request.form.get('from_lang', 'auto')
+            to_lang = request.form.get('to_lang', 'en')
+            try:
+                translation = translator.get().translate(text, from_lang, to_lang)
+                return render_template_string(HTML_TEMPLATE, translation=translation)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    @app.route('/api/translate-batch', methods=['POST'])
+    def translate_batch():
+        data = request.get_json(silent=True) or {}
+        segments = data.get('segments')
+        if not isinstance(segments, list) or not all(isinstance(s, str) for s in segments):
+            return jsonify({'error': 'segments must be a list of strings'}), 400
+        try:
+            translations = translator.get().translate_batch(
+                segments, data.get('to_lang', 'en'), data.get('from_lang', 'auto'))
+            return jsonify({'translations': translations})
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    return app
+
 
 def main():
     parser = argparse.ArgumentParser(description="Translate text between languages")
     parser.add_argument("--text", "-t", type=str, help="Text to translate")
     parser.add_argument("--from", "-f", dest="from_lang", type=str, default="auto", help="Source language (auto-detect if 'auto')")
     parser.add_argument("--to", "-o", dest="to_lang", type=str, default="en", help="Target language")
+    parser.add_argument("--segments-file", type=str,
+                        help="Strings to translate in one batch: a JSON list, a JSON object of key: string, or one per line")
+    parser.add_argument("--file", type=str, help="Markdown, HTML, SRT or text document to translate")
+    parser.add_argument("--format", type=str, choices=sorted(set(FORMATS.values()) | {"text"}),
+                        help="Document format (default: from the --file extension)")
+    parser.add_argument("--concurrency", type=int, help="Prompts translated at once (default: TRANSLATOR_WORKERS or 4)")
+    parser.add_argument("--output-file", type=str, help="Where to write the translated file (default: print)")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string
-        
-        app = Flask(__name__)
-        translator = LanguageTranslator()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Language Translator</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
-                textarea { width: 100%; height: 150px; margin: 10px 0; }
-                select, button { padding: 10px; margin: 5px; }
-                button { background: #007bff; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; }
-            </style>
-        </head>
-        <body>
-            <h1>🌐 Language Translator</h1>
-            <form method="POST">
-                <textarea name="text" placeholder="Enter text to translate..." required></textarea>
-                <select name="from_lang">
-                    <option value="auto">Auto-detect</option>
-                    <option value="en">English</option>
-                    <option value="es">Spanish</option>
-                    <option value="fr">French</option>
-                    <option value="de">German</option>
-                    <option value="zh">Chinese</option>
-                    <option value="ja">Japanese</option>
-                </select>
-                <select name="to_lang">
-                    <option value="en">English</option>
-                    <option value="es">Spanish</option>
-                    <option value="fr">French</option>
-                    <option value="de">German</option>
-                    <option value="zh">Chinese</option>
-                    <option value="ja">Japanese</option>
-                </select>
-                <button type="submit">Translate</button>
-            </form>
-            {% if translation %}
-            <div class="result">
-                <strong>Translation:</strong><br>{{ translation }}
-            </div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                text = request.form.get('text', '')
-                from_lang = request.form.get('from_lang', 'auto')
-                to_lang = request.form.get('to_lang', 'en')
-                try:
-                    translation = translator.translate(text, from_lang, to_lang)
-                    return render_template_string(HTML_TEMPLATE, translation=translation)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
+    elif args.file:
+        try:
+            translator = LanguageTranslator(workers=args.concurrency)
+            output = translator.translate_file(args.file, args.to_lang, args.from_lang, args.format)
+            if args.output_file:
+                Path(args.output_file).write_text(output, encoding="utf-8")
+                print(f"✅ Translated document saved to {args.output_file}")
+            else:
+                print(output, end="")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+    
+    elif args.segments_file:
+        try:
+            translator = LanguageTranslator(workers=args.concurrency)
+            raw = Path(args.segments_file).read_text(encoding="utf-8")
+            if args.segments_file.endswith(".json"):
+                data = json.loads(raw)
+                keys = list(data) if isinstance(data, dict) else None
+                segments = [data[k] for k in keys] if keys is not None else data
+                translations = translator.translate_batch(segments, args.to_lang, args.from_lang)
+                result = dict(zip(keys, translations)) if keys is not None else translations
+                output = json.dumps(result, ensure_ascii=False, indent=2) + "\n"
+            else:
+                lines = raw.splitlines()
+                output = "\n".join(translator.translate_batch(lines, args.to_lang, args.from_lang)) + "\n"
+            if args.output_file:
+                Path(args.output_file).write_text(output, encoding="utf-8")
+                print(f"✅ Translations saved to {args.output_file}")
+            else:
+                print(output, end="")
+            memory = translator.memory.stats()
+            print(f"📚 Translation memory: {memory['hits']} hits, {memory['misses']} misses, "
+                  f"{memory['segments']} segments stored", file=sys.stderr)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+    
     elif args.text:
         try:
             translator = LanguageTranslator()
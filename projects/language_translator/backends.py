@@ -0,0 +1,130 @@
+"""
+Backends - Local seq2seq translation models (MarianMT, NLLB) for high-volume language pairs
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from common.metrics import MODEL_FORWARD, MODEL_LOAD
+
+MARIAN_MODEL = "Helsinki-NLP/opus-mt-{src}-{tgt}"
+NLLB_MODEL = "facebook/nllb-200-distilled-600M"
+
+# NLLB uses FLORES-200 codes
+NLLB_CODES = {
+    "ar": "arb_Arab", "de": "deu_Latn", "en": "eng_Latn", "es": "spa_Latn", "fr": "fra_Latn",
+    "hi": "hin_Deva", "it": "ita_Latn", "ja": "jpn_Jpan", "ko": "kor_Hang", "nl": "nld_Latn",
+    "pl": "pol_Latn", "pt": "por_Latn", "ru": "rus_Cyrl", "tr": "tur_Latn", "uk": "ukr_Cyrl",
+    "zh": "zho_Hans",
+}
+
+
+def parse_pairs(value: str) -> Set[Tuple[str, str]]:
+    """Parse "en-es,es-en,*-en" into {(from, to)}; "*" matches any language."""
+    pairs = set()
+    for item in value.split(","):
+        if "-" in item.strip():
+            src, tgt = item.strip().split("-", 1)
+            pairs.add((src.strip().lower(), tgt.strip().lower()))
+    return pairs
+
+
+def length_sorted_batches(texts: List[str], batch_size: int) -> List[List[int]]:
+    """Indices of texts grouped into batches of similar length, so little padding is wasted."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+class LocalSeq2SeqBackend:
+    def __init__(self, pairs: Set[Tuple[str, str]], model: str = "marian", int8: bool = False,
+                 batch_size: int = 16, max_length: int = 512, num_beams: Optional[int] = None):
+        """Translate the given language pairs on this machine with a Hugging Face seq2seq model.
+
+        model is "marian" (one Helsinki-NLP opus-mt model per pair), "nllb" (one
+        multilingual model for every pair) or a model name. int8 applies dynamic
+        int8 quantization to the linear layers, which is usually 2-3x faster on CPU.
+        """
+        self.pairs = pairs
+        self.model = model
+        self.int8 = int8
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.num_beams = num_beams
+        self._models: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["LocalSeq2SeqBackend"]:
+        """Build the backend from TRANSLATOR_LOCAL_* variables; None if no pairs are local."""
+        pairs = parse_pairs(os.getenv("TRANSLATOR_LOCAL_PAIRS", ""))
+        if not pairs:
+            return None
+        beams = os.getenv("TRANSLATOR_LOCAL_BEAMS")
+        return cls(
+            pairs,
+            model=os.getenv("TRANSLATOR_LOCAL_MODEL", "marian"),
+            int8=os.getenv("TRANSLATOR_LOCAL_INT8", "").strip().lower() in ("1", "true", "yes", "on"),
+            batch_size=int(os.getenv("TRANSLATOR_LOCAL_BATCH_SIZE", "16")),
+            num_beams=int(beams) if beams else None,
+        )
+
+    def handles(self, from_lang: str, to_lang: str) -> bool:
+        """Whether a pair is routed to the local model (from_lang must be known)."""
+        from_lang, to_lang = from_lang.lower(), to_lang.lower()
+        if from_lang == "auto" or from_lang == to_lang:
+            return False
+        return any(src in ("*", from_lang) and tgt in ("*", to_lang) for src, tgt in self.pairs)
+
+    def _model_name(self, from_lang: str, to_lang: str) -> str:
+        if self.model == "marian":
+            return MARIAN_MODEL.format(src=from_lang, tgt=to_lang)
+        if self.model == "nllb":
+            return NLLB_MODEL
+        return self.model
+
+    def _load(self, name: str) -> tuple:
+        """Load (and optionally quantize) a model once; returns (tokenizer, model, lock)."""
+        with self._lock:
+            if name not in self._models:
+                try:
+                    import torch
+                    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+                except ImportError as e:
+                    raise RuntimeError("The local translation backend needs transformers, torch "
+                                       "and sentencepiece (pip install transformers torch sentencepiece)") from e
+                with MODEL_LOAD.time(resource=name):
+                    tokenizer = AutoTokenizer.from_pretrained(name)
+                    model = AutoModelForSeq2SeqLM.from_pretrained(name)
+                    model.eval()
+                    if self.int8:
+                        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                self._models[name] = (tokenizer, model, threading.Lock())
+            return self._models[name]
+
+    def translate_many(self, texts: List[str], from_lang: str, to_lang: str) -> List[str]:
+        """Translate texts in length-sorted batches; results come back in input order."""
+        import torch
+
+        name = self._model_name(from_lang, to_lang)
+        tokenizer, model, lock = self._load(name)
+        kwargs = {"max_length": self.max_length}
+        if self.num_beams:
+            kwargs["num_beams"] = self.num_beams
+        nllb = name == NLLB_MODEL or "nllb" in name.lower()
+        if nllb:
+            kwargs["forced_bos_token_id"] = tokenizer.convert_tokens_to_ids(NLLB_CODES.get(to_lang, to_lang))
+
+        results: List[Optional[str]] = [None] * len(texts)
+        for batch in length_sorted_batches(texts, self.batch_size):
+            with lock, torch.inference_mode(), \
+                    MODEL_FORWARD.time(tool="language_translator", stage="local_translate"):
+                # src_lang is tokenizer state shared by every pair using this model, so set it under the lock
+                if nllb:
+                    tokenizer.src_lang = NLLB_CODES.get(from_lang, from_lang)
+                inputs = tokenizer([texts[i] for i in batch], return_tensors="pt", padding=True,
+                                   truncation=True, max_length=self.max_length)
+                outputs = model.generate(**inputs, **kwargs)
+            for i, text in zip(batch, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                results[i] = text.strip()
+        return results
@@ -0,0 +1,195 @@
+"""
+Documents - Split Markdown, HTML, SRT and text files into translatable segments and back
+"""
+
+import re
+from pathlib import Path
+from typing import Callable, List, Union
+
+FORMATS = {".md": "markdown", ".markdown": "markdown", ".html": "html", ".htm": "html", ".srt": "srt"}
+
+FENCE = re.compile(r"^\s*(```|~~~)")
+# Block prefixes kept as-is in front of the translated text: headings, quotes, list markers
+MARKDOWN_PREFIX = re.compile(r"^(\s*(?:>\s*)*(?:#{1,6}\s+|[-*+]\s+(?:\[[ xX]\]\s+)?|\d+[.)]\s+)?)(.*?)(\s*)$")
+MARKDOWN_LITERAL = re.compile(r"^\s*(\[[^\]]+\]:\s|<!--|<[a-zA-Z/][^>]*>\s*$|\|?\s*:?-{3,}|[-*_](\s*[-*_]){2,}\s*$)")
+HTML_TOKEN = re.compile(r"<!--.*?-->|<![^>]*>|<\?.*?\?>|<[^>]+>", re.DOTALL)
+HTML_SKIP = {"script", "style", "pre", "textarea", "svg", "math"}
+# Tags that stay inside a segment; any other tag ends the current one
+HTML_INLINE = {"a", "abbr", "b", "bdi", "bdo", "br", "cite", "code", "data", "dfn", "em", "i", "kbd", "mark",
+               "q", "s", "samp", "small", "span", "strong", "sub", "sup", "time", "u", "var", "wbr"}
+SRT_TIMING = re.compile(r"^\d{2}:\d{2}:\d{2}[,.]\d{3}\s*-->")
+WORD = re.compile(r"\w", re.UNICODE)
+
+
+class Document:
+    def __init__(self):
+        """A file as a list of parts: literal strings, kept byte for byte, and segments to translate."""
+        self.parts: List[Union[str, int]] = []
+        self.segments: List[str] = []
+
+    def literal(self, text: str):
+        if text:
+            self.parts.append(text)
+
+    def segment(self, text: str):
+        """Add text to translate; text without any letters or digits is kept literally."""
+        leading = text[:len(text) - len(text.lstrip())]
+        trailing = text[len(text.rstrip()):]
+        core = text.strip()
+        if not WORD.search(core):
+            self.literal(text)
+            return
+        self.literal(leading)
+        self.parts.append(len(self.segments))
+        self.segments.append(core)
+        self.literal(trailing)
+
+    def render(self, translations: List[str]) -> str:
+        """Reassemble the file with translations[i] in place of segments[i]."""
+        return "".join(part if isinstance(part, str) else translations[part] for part in self.parts)
+
+
+def detect_format(path: str) -> str:
+    return FORMATS.get(Path(path).suffix.lower(), "text")
+
+
+def parse_markdown(text: str) -> Document:
+    """Headings, list items, quotes and table cells become segments; code, front matter and markup do not.
+
+    Consecutive plain lines form one paragraph segment.
+    """
+    doc = Document()
+    lines = text.splitlines(keepends=True)
+    in_fence, paragraph = None, []
+
+    def flush():
+        if paragraph:
+            body = "".join(paragraph)
+            doc.segment(body.rstrip("\n"))
+            doc.literal(body[len(body.rstrip("\n")):])
+            paragraph.clear()
+
+    start = 0
+    if lines and lines[0].strip() == "---":
+        for end in range(1, len(lines)):
+            if lines[end].strip() in ("---", "..."):
+                doc.literal("".join(lines[:end + 1]))
+                start = end + 1
+                break
+
+    for line in lines[start:]:
+        fence = FENCE.match(line)
+        if in_fence or fence:
+            flush()
+            doc.literal(line)
+            if fence and (in_fence is None or fence.group(1) == in_fence):
+                in_fence = None if in_fence else fence.group(1)
+            continue
+        content = line.rstrip("\n")
+        prefix, body, trailing = MARKDOWN_PREFIX.match(content).groups()
+        indented_code = content.startswith(("    ", "\t")) and not paragraph and not prefix.strip()
+        if not content.strip() or MARKDOWN_LITERAL.match(content) or indented_code:
+            flush()
+            doc.literal(line)
+        elif content.lstrip().startswith("|"):
+            flush()
+            for cell in re.split(r"(\|)", content):
+                if cell == "|":
+                    doc.literal(cell)
+                else:
+                    doc.segment(cell)
+            doc.literal(line[len(content):])
+        elif prefix.strip() or not body:
+            flush()
+            doc.literal(prefix)
+            doc.segment(body + trailing)
+            doc.literal(line[len(content):])
+        else:
+            paragraph.append(line)
+    flush()
+    return doc
+
+
+def parse_html(text: str) -> Document:
+    """The contents of each block element become one segment, inline tags (b, em, a, code, ...) included.
+
+    Segments end at block-level tags, comments and doctypes, which are kept as-is,
+    as is everything inside script, style, pre and the like.
+    """
+    doc = Document()
+    skipping, run, position = [], [], 0
+
+    def flush():
+        if run:
+            chunk = "".join(run)
+            if WORD.search(HTML_TOKEN.sub("", chunk)):
+                doc.segment(chunk)
+            else:
+                doc.literal(chunk)
+            run.clear()
+
+    for match in HTML_TOKEN.finditer(text):
+        between, tag = text[position:match.start()], match.group(0)
+        position = match.end()
+        name = re.match(r"</?\s*([a-zA-Z0-9]+)", tag)
+        name = name.group(1).lower() if name else None
+        opens_skip = name in HTML_SKIP and not tag.startswith("</") and not tag.endswith("/>")
+        if skipping:
+            doc.literal(between + tag)
+            if opens_skip:
+                skipping.append(name)
+            elif tag.startswith("</") and name == skipping[-1]:
+                skipping.pop()
+            continue
+        run.append(between)
+        if name in HTML_INLINE:
+            run.append(tag)
+            continue
+        flush()
+        doc.literal(tag)
+        if opens_skip:
+            skipping.append(name)
+    if skipping:
+        doc.literal(text[position:])
+    else:
+        run.append(text[position:])
+        flush()
+    return doc
+
+
+def parse_srt(text: str) -> Document:
+    """Each cue's text lines become one segment; numbers and timings are kept."""
+    doc = Document()
+    for block in re.split(r"(\n\s*\n)", text):
+        if not block.strip() or block.isspace():
+            doc.literal(block)
+            continue
+        lines = block.split("\n")
+        timing = next((i for i, line in enumerate(lines) if SRT_TIMING.match(line.strip())), None)
+        if timing is None:
+            doc.segment(block)
+            continue
+        doc.literal("\n".join(lines[:timing + 1]) + ("\n" if timing + 1 < len(lines) else ""))
+        doc.segment("\n".join(lines[timing + 1:]))
+    return doc
+
+
+def parse_text(text: str) -> Document:
+    """Paragraphs separated by blank lines become segments."""
+    doc = Document()
+    for block in re.split(r"(\n\s*\n)", text):
+        doc.segment(block)
+    return doc
+
+
+PARSERS = {"markdown": parse_markdown, "html": parse_html, "srt": parse_srt, "text": parse_text}
+
+
+def parse_document(text: str, fmt: str = "text") -> Document:
+    return PARSERS[fmt](text)
+
+
+def translate_document(text: str, fmt: str, translate_batch: Callable[[List[str]], List[str]]) -> str:
+    """Parse, translate every segment with translate_batch and reassemble with identical structure."""
+    doc = parse_document(text, fmt)
+    return doc.render(translate_batch(doc.segments) if doc.segments else [])
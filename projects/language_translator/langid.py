@@ -0,0 +1,297 @@
+"""
+Language ID - Fast character n-gram language identification, run before any translation call
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Languages recognised by their script, checked in order, and whether the script is
+# theirs alone. Han, Arabic, Devanagari and Cyrillic are shared by many languages
+# (Cantonese, Persian, Urdu, Marathi, Bulgarian, Serbian, ...), so for those the
+# script only gives a best guess with SHARED_SCRIPT_CONFIDENCE.
+SCRIPTS = [
+    ("ja", re.compile(r"[\u3040-\u30ff]"), True),          # hiragana / katakana
+    ("ko", re.compile(r"[\uac00-\ud7af\u1100-\u11ff]"), True),
+    ("zh", re.compile(r"[\u4e00-\u9fff]"), False),
+    ("ar", re.compile(r"[\u0600-\u06ff]"), False),
+    ("hi", re.compile(r"[\u0900-\u097f]"), False),
+    ("el", re.compile(r"[\u0370-\u03ff]"), True),
+    ("he", re.compile(r"[\u0590-\u05ff]"), True),
+    ("th", re.compile(r"[\u0e00-\u0e7f]"), True),
+    ("ru", re.compile(r"[\u0400-\u04ff]"), False),
+]
+UKRAINIAN = re.compile(r"[іїєґІЇЄҐ]")
+# Share of a text's letters that must be in a script for it to decide the language
+SCRIPT_SHARE = 0.3
+SHARED_SCRIPT_CONFIDENCE = 0.5
+
+# Short training texts for the Latin-script languages; their n-gram profiles are built once at import
+SAMPLES = {
+    "en": """All human beings are born free and equal in dignity and rights. They are endowed with reason
+and conscience and should act towards one another in a spirit of brotherhood. Everyone is entitled to all
+the rights and freedoms set forth in this declaration, without distinction of any kind. Everyone has the
+right to life, liberty and security of person. Please enter your password to continue. The file could not
+be saved because the disk is full. Would you like to open the settings now? Thank you for your order, we
+will send you an email when it ships. What time is the meeting tomorrow? I think we should have a look at
+this together before the end of the week. Search results, recent documents and shared folders.""",
+    "es": """Todos los seres humanos nacen libres e iguales en dignidad y derechos y, dotados como están de
+razón y conciencia, deben comportarse fraternalmente los unos con los otros. Toda persona tiene los derechos
+y libertades proclamados en esta declaración, sin distinción alguna. Todo individuo tiene derecho a la vida,
+a la libertad y a la seguridad de su persona. Por favor, introduzca su contraseña para continuar. No se pudo
+guardar el archivo porque el disco está lleno. ¿Quiere abrir la configuración ahora? Gracias por su pedido,
+le enviaremos un correo cuando se envíe. ¿A qué hora es la reunión de mañana? Creo que deberíamos revisar
+esto juntos antes del final de la semana. Resultados de búsqueda, documentos recientes y carpetas compartidas.""",
+    "fr": """Tous les êtres humains naissent libres et égaux en dignité et en droits. Ils sont doués de raison
+et de conscience et doivent agir les uns envers les autres dans un esprit de fraternité. Chacun peut se
+prévaloir de tous les droits et de toutes les libertés proclamés dans la présente déclaration, sans
+distinction aucune. Tout individu a droit à la vie, à la liberté et à la sûreté de sa personne. Veuillez
+saisir votre mot de passe pour continuer. Le fichier n'a pas pu être enregistré car le disque est plein.
+Voulez-vous ouvrir les paramètres maintenant ? Merci pour votre commande, nous vous enverrons un courriel
+lors de l'expédition. À quelle heure est la réunion demain ? Je pense que nous devrions regarder cela ensemble
+avant la fin de la semaine. Résultats de recherche, documents récents et dossiers partagés.""",
+    "de": """Alle Menschen sind frei und gleich an Würde und Rechten geboren. Sie sind mit Vernunft und
+Gewissen begabt und sollen einander im Geist der Brüderlichkeit begegnen. Jeder hat Anspruch auf alle in
+dieser Erklärung verkündeten Rechte und Freiheiten ohne irgendeinen Unterschied. Jeder hat das Recht auf
+Leben, Freiheit und Sicherheit der Person. Bitte geben Sie Ihr Passwort ein, um fortzufahren. Die Datei
+konnte nicht gespeichert werden, weil die Festplatte voll ist. Möchten Sie die Einstellungen jetzt öffnen?
+Vielen Dank für Ihre Bestellung, wir schicken Ihnen eine E-Mail, sobald sie versandt wird. Um wie viel Uhr
+ist die Besprechung morgen? Ich denke, wir sollten uns das vor dem Ende der Woche gemeinsam ansehen.
+Suchergebnisse, zuletzt verwendete Dokumente und freigegebene Ordner.""",
+    "it": """Tutti gli esseri umani nascono liberi ed eguali in dignità e diritti. Essi sono dotati di ragione
+e di coscienza e devono agire gli uni verso gli altri in spirito di fratellanza. Ad ogni individuo spettano
+tutti i diritti e tutte le libertà enunciate nella presente dichiarazione, senza distinzione alcuna. Ogni
+individuo ha diritto alla vita, alla libertà ed alla sicurezza della propria persona. Inserisci la password
+per continuare. Non è stato possibile salvare il file perché il disco è pieno. Vuoi aprire le impostazioni
+adesso? Grazie per il tuo ordine, ti invieremo una email quando verrà spedito. A che ora è la riunione di
+domani? Penso che dovremmo guardare questo insieme prima della fine della settimana. Risultati della ricerca,
+documenti recenti e cartelle condivise.""",
+    "pt": """Todos os seres humanos nascem livres e iguais em dignidade e em direitos. Dotados de razão e de
+consciência, devem agir uns para com os outros em espírito de fraternidade. Todos os seres humanos podem
+invocar os direitos e as liberdades proclamados na presente declaração, sem distinção alguma. Todo indivíduo
+tem direito à vida, à liberdade e à segurança pessoal. Por favor, digite sua senha para continuar. Não foi
+possível salvar o arquivo porque o disco está cheio. Você quer abrir as configurações agora? Obrigado pelo
+seu pedido, enviaremos um email quando ele for despachado. A que horas é a reunião de amanhã? Acho que
+deveríamos olhar isso juntos antes do fim da semana. Resultados da pesquisa, documentos recentes e pastas
+compartilhadas.""",
+    "nl": """Alle mensen worden vrij en gelijk in waardigheid en rechten geboren. Zij zijn begiftigd met verstand
+en geweten, en behoren zich jegens elkander in een geest van broederschap te gedragen. Een ieder heeft
+aanspraak op alle rechten en vrijheden, in deze verklaring opgesomd, zonder enig onderscheid. Een ieder heeft
+het recht op leven, vrijheid en onschendbaarheid van zijn persoon. Voer uw wachtwoord in om verder te gaan.
+Het bestand kon niet worden opgeslagen omdat de schijf vol is. Wilt u de instellingen nu openen? Bedankt voor
+uw bestelling, we sturen u een e-mail zodra deze is verzonden. Hoe laat is de vergadering morgen? Ik denk dat
+we hier voor het einde van de week samen naar moeten kijken. Zoekresultaten, recente documenten en gedeelde
+mappen.""",
+}
+
+# Latin-script languages without a profile of their own. Each sample trains a catch-all class,
+# and text won by one is reported as undetermined instead of as the nearest supported language.
+# Close neighbours of the supported languages (Catalan and Galician next to Spanish, Afrikaans
+# next to Dutch, Swiss German next to German, Norwegian next to Danish and Swedish) get samples
+# as long as SAMPLES, since a short or mixed sample loses to them; the rest share one mixed sample.
+OTHER = "other"
+OTHER_SAMPLES = {
+    "ca": """Tots els éssers humans neixen lliures i iguals en dignitat i en drets. Són dotats de raó i de
+consciència, i han de comportar-se fraternalment els uns amb els altres. Tothom té tots els drets i
+llibertats proclamats en aquesta declaració, sense cap distinció. Tota persona té dret a la vida, a la
+llibertat i a la seguretat de la seva persona. Si us plau, introduïu la vostra contrasenya per continuar. No
+s'ha pogut desar el fitxer perquè el disc és ple. Voleu obrir la configuració ara? Gràcies per la vostra
+comanda, us enviarem un correu quan s'enviï. A quina hora és la reunió de demà? Crec que hauríem de revisar
+això junts abans del final de la setmana. Resultats de la cerca, documents recents i carpetes compartides.""",
+    "gl": """Tódolos seres humanos nacen libres e iguais en dignidade e dereitos e, dotados como están de
+razón e conciencia, débense comportar fraternalmente uns cos outros. Toda persoa ten os dereitos e
+liberdades proclamados nesta declaración, sen distinción ningunha. Todo individuo ten dereito á vida, á
+liberdade e á seguridade da súa persoa. Por favor, introduza o seu contrasinal para continuar. Non se puido
+gardar o ficheiro porque o disco está cheo. Quere abrir a configuración agora? Grazas polo seu pedido,
+enviarémoslle un correo cando se envíe. A que hora é a xuntanza de mañá? Coido que deberiamos revisar isto
+xuntos antes da fin da semana. Resultados da busca, documentos recentes e cartafoles compartidos.""",
+    "af": """Alle menslike wesens word vry, met gelyke waardigheid en regte, gebore. Hulle het rede en
+gewete en behoort in die gees van broederskap teenoor mekaar op te tree. Elkeen is geregtig op al die regte
+en vryhede wat in hierdie verklaring uiteengesit word, sonder enige onderskeid. Elkeen het die reg op lewe,
+vryheid en sekerheid van persoon. Voer asseblief jou wagwoord in om voort te gaan. Die lêer kon nie gestoor
+word nie omdat die skyf vol is. Wil jy nou die instellings oopmaak? Dankie vir jou bestelling, ons sal vir
+jou 'n e-pos stuur wanneer dit versend word. Hoe laat is die vergadering môre? Ek dink ons moet dit saam
+bekyk voor die einde van die week. Soekresultate, onlangse dokumente en gedeelde vouers.""",
+    "gsw": """Alli Mänsche sind frei und gliich a Wüürde und Rächt gebore. Si händ Vernunft und Gwüsse und
+sölled enand im Geischt vo de Brüederlichkeit begägne. Jede het Aaspruch uf alli Rächt und Freiheite, wo i
+dere Erklärig verchündet wärded, ohni irgendeine Unterschiid. Jede het s Rächt uf Läbe, Freiheit und
+Sicherheit vo de Person. Bitte gib dis Passwort ii, zum wiitermache. D Datei het nöd chöne gspeicheret
+wärde, will d Festplatte voll isch. Wotsch d Iistellige jetzt ufmache? Merci vilmal für dini Bstellig, mir
+schicked dir es Mail, sobald si verschickt wird. Um wievill Uhr isch d Sitzig morn? Ich dänk, mir sötted eus
+das vor em Änd vo de Wuche zäme aaluege. Suechresultat, zletscht bruuchti Dokumänt und gteilti Ordner.""",
+    "no": """Alle mennesker er født frie og med samme menneskeverd og menneskerettigheter. De er utstyrt med
+fornuft og samvittighet og bør handle mot hverandre i brorskapets ånd. Enhver har krav på alle de
+rettigheter og friheter som er nevnt i denne erklæringen, uten forskjell av noe slag. Enhver har rett til
+liv, frihet og personlig sikkerhet. Skriv inn passordet ditt for å fortsette. Filen kunne ikke lagres fordi
+disken er full. Vil du åpne innstillingene nå? Takk for bestillingen, vi sender deg en e-post når den blir
+sendt. Når er møtet i morgen? Jeg tror vi bør se på dette sammen før slutten av uken. Søkeresultater, nylige
+dokumenter og delte mapper.""",
+    "mixed": """Bütün insanlar hür, haysiyet ve haklar bakımından eşit doğarlar. Akıl ve vicdana sahiptirler
+ve birbirlerine karşı kardeşlik zihniyeti ile hareket etmelidirler. Wszyscy ludzie rodzą się wolni i równi
+pod względem swej godności i swych praw. Są oni obdarzeni rozumem i sumieniem i powinni postępować wobec
+innych w duchu braterstwa. Alla människor är födda fria och lika i värde och rättigheter. De är utrustade
+med förnuft och samvete och bör handla gentemot varandra i en anda av broderskap. Alle mennesker er født
+frie og lige i værdighed og rettigheder. De er udstyret med fornuft og samvittighed, og de bør handle mod
+hverandre i en broderskabets ånd. Semua orang dilahirkan merdeka dan mempunyai martabat dan hak-hak yang
+sama. Mereka dikaruniai akal dan hati nurani dan hendaknya bergaul satu sama lain dalam semangat
+persaudaraan. Toate ființele umane se nasc libere și egale în demnitate și în drepturi. Ele sunt înzestrate
+cu rațiune și conștiință și trebuie să se comporte unele față de altele în spiritul fraternității. Všichni
+lidé rodí se svobodní a sobě rovní co do důstojnosti a práv. Jsou nadáni rozumem a svědomím a mají spolu
+jednat v duchu bratrství. Kaikki ihmiset syntyvät vapaina ja tasavertaisina arvoltaan ja oikeuksiltaan.
+Heille on annettu järki ja omatunto, ja heidän on toimittava toisiaan kohtaan veljeyden hengessä. Minden
+emberi lény szabadon születik és egyenlő méltósága és joga van. Az emberek, ésszel és lelkiismerettel
+bírván, egymással szemben testvéri szellemben kell hogy viseltessenek. Tất cả mọi người sinh ra đều được tự
+do và bình đẳng về nhân phẩm và quyền lợi. Mọi con người đều được tạo hóa ban cho lý trí và lương tâm và cần
+phải đối xử với nhau trong tình anh em. Watu wote wamezaliwa huru, hadhi na haki zao ni sawa. Wote
+wamejaliwa akili na dhamiri, hivyo yapasa watendeane kindugu. Sva ljudska bića rađaju se slobodna i
+jednaka u dostojanstvu i pravima. Ona su obdarena razumom i sviješću pa jedna prema drugima trebaju
+postupati u duhu bratstva.""",
+}
+LANGUAGE_NAMES = {
+    "english": "en", "spanish": "es", "french": "fr", "german": "de", "italian": "it", "portuguese": "pt",
+    "dutch": "nl", "chinese": "zh", "japanese": "ja", "korean": "ko", "russian": "ru", "ukrainian": "uk",
+    "arabic": "ar", "hindi": "hi", "greek": "el", "hebrew": "he", "thai": "th",
+}
+
+NGRAM_SIZES = (1, 2, 3)
+LETTERS = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Scales log-likelihood margins into confidences; a margin of about 6 nats gives 0.9
+SOFTEN = 0.35
+
+# Below these, the guess is too weak to skip or route a translation on
+MIN_CONFIDENCE = 0.9
+MIN_LETTERS = 12
+# Share of a text's trigrams that must occur in the winning language's sample; text in an
+# unknown language can win among the known ones while matching few of their trigrams
+MIN_COVERAGE = 0.3
+# Log-likelihood (nats) by which the winner must beat every catch-all class before text is
+# taken to be already in the target language; closer than this it may be a neighbouring
+# language or dialect without a profile, and it is translated after all
+OTHER_MARGIN = 8.0
+
+
+def normalize_lang(lang: str) -> str:
+    """Map "Spanish", "es-ES" or "ES" to "es"; other values are lower-cased as-is."""
+    lang = lang.strip().lower()
+    return LANGUAGE_NAMES.get(lang, lang.split("-")[0].split("_")[0])
+
+
+def features(text: str) -> Counter:
+    """Character 1-3 grams of the lower-cased letters, with word boundaries marked by spaces."""
+    grams = Counter()
+    for word in LETTERS.findall(unicodedata.normalize("NFC", text.lower())):
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                gram = padded[i:i + n]
+                if gram != " ":
+                    grams[gram] += 1
+    return grams
+
+
+class LanguageIdentifier:
+    def __init__(self, samples: Optional[Dict[str, str]] = None,
+                 others: Optional[Dict[str, str]] = None):
+        """Naive Bayes over character n-grams, precomputed into one table.
+
+        Each n-gram maps to its vector of per-language log-probabilities, so scoring a
+        text is one dictionary lookup and one vector addition per distinct n-gram.
+        others (OTHER_SAMPLES by default; {} for none) train the catch-all classes for
+        languages outside samples.
+        """
+        samples = dict(samples or SAMPLES)
+        others = OTHER_SAMPLES if others is None else others
+        samples.update((f"{OTHER}:{name}", text) for name, text in others.items())
+        self.languages = list(samples)
+        self.others = [i for i, lang in enumerate(self.languages) if lang.startswith(f"{OTHER}:")]
+        counts = {lang: features(text) for lang, text in samples.items()}
+        vocabulary = set().union(*counts.values())
+        totals = {lang: sum(c.values()) + len(vocabulary) for lang, c in counts.items()}
+        self.table = {gram: tuple(math.log((counts[lang][gram] + 1) / totals[lang]) for lang in self.languages)
+                      for gram in vocabulary}
+        self.unseen = tuple(math.log(1 / totals[lang]) for lang in self.languages)
+
+    def _script(self, text: str) -> Optional[Tuple[str, float]]:
+        letters = sum(len(w) for w in LETTERS.findall(text))
+        for lang, pattern, unique in SCRIPTS:
+            found = len(pattern.findall(text))
+            # Kana marks Japanese even in kanji-heavy text
+            if found and (found >= SCRIPT_SHARE * letters or lang == "ja"):
+                if lang == "ru" and UKRAINIAN.search(text):
+                    lang = "uk"
+                return lang, 1.0 if unique else SHARED_SCRIPT_CONFIDENCE
+        return None
+
+    def detect(self, text: str) -> Tuple[str, float]:
+        """Return (language code, confidence between 0 and 1).
+
+        ("und", 0.0) for text without letters or in a language the identifier does not know.
+        """
+        return self.detect_many([text])[0]
+
+    def detect_many(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Detect the language of many strings in one pass over the shared n-gram table.
+
+        Repeated strings are scored once.
+        """
+        table, unseen = self.table, self.unseen
+        results = {}
+        for text in dict.fromkeys(texts):
+            script = self._script(text)
+            if script is not None:
+                results[text] = script
+                continue
+            grams = features(text)
+            if not grams:
+                results[text] = ("und", 0.0)
+                continue
+            scores = self._scores(grams)
+            # Posterior from the log-likelihood margins, softened: the n-grams are far from independent
+            best = max(scores)
+            weights = [math.exp((score - best) * SOFTEN) for score in scores]
+            index = scores.index(best)
+            trigrams = [gram for gram in grams if len(gram) == 3]
+            seen = sum(1 for gram in trigrams if table.get(gram, unseen)[index] > unseen[index])
+            if index in self.others or seen < MIN_COVERAGE * len(trigrams):
+                results[text] = ("und", 0.0)
+            else:
+                results[text] = (self.languages[index], weights[index] / sum(weights))
+        return [results[text] for text in texts]
+
+    def _scores(self, grams: Counter) -> List[float]:
+        """Per-language log-likelihoods of a text's n-grams."""
+        scores = [0.0] * len(self.languages)
+        for gram, times in grams.items():
+            vector = self.table.get(gram, self.unseen)
+            scores = [score + weight * times for score, weight in zip(scores, vector)]
+        return scores
+
+    def is_confident(self, text: str, confidence: float) -> bool:
+        """Whether a detection is reliable enough to route a translation on."""
+        return confidence >= MIN_CONFIDENCE and sum(len(w) for w in LETTERS.findall(text)) >= MIN_LETTERS
+
+    def is_clear_of_others(self, text: str) -> bool:
+        """Whether the text's best profile beats every catch-all class by OTHER_MARGIN.
+
+        Required on top of is_confident before a translation is skipped: close neighbours
+        without a profile (Catalan next to Spanish) can still win a confident detection.
+        """
+        if self._script(text) is not None:
+            return True
+        scores = self._scores(features(text))
+        other = max((scores[i] for i in self.others), default=-math.inf)
+        return max(scores) - other >= OTHER_MARGIN
+
+
+_default = None
+
+
+def get_identifier() -> LanguageIdentifier:
+    """The shared identifier, built on first use."""
+    global _default
+    if _default is None:
+        _default = LanguageIdentifier()
+    return _default
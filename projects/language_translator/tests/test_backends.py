@@ -0,0 +1,43 @@
+"""Tests for the local translation backend"""
+from unittest.mock import patch
+from app import LanguageTranslator
+from backends import LocalSeq2SeqBackend, length_sorted_batches, parse_pairs
+
+
+class FakeLocalBackend(LocalSeq2SeqBackend):
+    def __init__(self, pairs):
+        super().__init__(parse_pairs(pairs), batch_size=2)
+        self.calls = []
+
+    def translate_many(self, texts, from_lang, to_lang):
+        self.calls.append(list(texts))
+        return [f"[{to_lang}] {text}" for text in texts]
+
+
+def test_pair_routing_and_length_sorted_batches():
+    """Test pair parsing with wildcards and batches of similar-length inputs."""
+    backend = LocalSeq2SeqBackend(parse_pairs("en-es, es-en, *-de"))
+    assert backend.handles("en", "es") and backend.handles("ES", "en") and backend.handles("fr", "de")
+    assert not backend.handles("en", "fr")
+    assert not backend.handles("auto", "es")
+
+    texts = ["a much longer sentence", "hi", "medium text", "yo", "x"]
+    batches = length_sorted_batches(texts, 2)
+    assert batches == [[4, 1], [3, 2], [0]]
+    assert sorted(i for batch in batches for i in batch) == list(range(len(texts)))
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_local_pairs_skip_the_api():
+    """Test that local pairs never call OpenAI while other pairs still do."""
+    from translation_memory import TranslationMemory
+    local = FakeLocalBackend("en-es")
+    translator = LanguageTranslator(memory=TranslationMemory(None), local=local)
+
+    with patch.object(translator.client.chat.completions, 'create') as mock_create:
+        assert translator.translate("Hello", "en", "es") == "[es] Hello"
+        assert translator.translate_batch(["Open", "Save", "Open"], "es", "en") == ["[es] Open", "[es] Save", "[es] Open"]
+        assert local.calls[-1] == ["Open", "Save"]
+        assert translator.memory.get("Save", "es", "en") == "[es] Save"
+        assert mock_create.call_count == 0
+        assert not translator.is_local("en", "fr")
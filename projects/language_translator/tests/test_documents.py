@@ -0,0 +1,45 @@
+"""Tests for document parsing and reassembly"""
+from documents import parse_document, translate_document
+
+
+def upper(segments):
+    return [s.upper() for s in segments]
+
+
+def test_markdown_skips_code_and_markup_and_keeps_structure():
+    """Test that only prose is translated and the document round-trips byte for byte."""
+    text = ("---\ntitle: Guide\n---\n"
+            "# Getting started\n\n"
+            "Install the package\nand run it.\n\n"
+            "```python\nprint('hello')\n```\n\n"
+            "- [ ] First step\n  1. Nested item\n\n"
+            "| Name | Value |\n|------|-------|\n| Size | 10 |\n\n"
+            "<div align=\"center\">\n\n[docs]: https://example.com\n")
+    doc = parse_document(text, "markdown")
+    assert doc.render(doc.segments) == text
+    assert doc.segments == ["Getting started", "Install the package\nand run it.", "First step",
+                            "Nested item", "Name", "Value", "Size", "10"]
+
+    translated = translate_document(text, "markdown", upper)
+    assert "# GETTING STARTED\n" in translated
+    assert "print('hello')" in translated and "title: Guide" in translated
+    assert "| NAME | VALUE |\n|------|-------|" in translated
+    assert "[docs]: https://example.com" in translated
+
+
+def test_html_and_srt_keep_tags_code_and_timings():
+    """Test each HTML block (inline tags included) outside pre and style and each SRT cue's text are segments."""
+    html = ("<!DOCTYPE html><html><head><title>Hello</title><style>p { color: red; }</style></head>"
+            "<body><p class=\"intro\">Welcome <b>back</b>!</p><pre><code>x = 1</code></pre>"
+            "<ul><li>Run <code>make</code>, then <a href=\"/docs\">read on</a>.</li><li><br></li></ul></body></html>")
+    doc = parse_document(html, "html")
+    assert doc.segments == ["Hello", "Welcome <b>back</b>!", 'Run <code>make</code>, then <a href="/docs">read on</a>.']
+    assert doc.render(doc.segments) == html
+    translated = translate_document(html, "html", lambda segments: [f"[{s}]" for s in segments])
+    assert "<title>[Hello]</title>" in translated and "<code>x = 1</code>" in translated
+    assert '<p class="intro">[Welcome <b>back</b>!]</p>' in translated
+
+    srt = "1\n00:00:01,000 --> 00:00:02,500\nHello there\nfriend\n\n2\n00:00:03,000 --> 00:00:04,000\nBye\n"
+    doc = parse_document(srt, "srt")
+    assert doc.segments == ["Hello there\nfriend", "Bye"]
+    assert translate_document(srt, "srt", upper) == srt.replace("Hello there\nfriend", "HELLO THERE\nFRIEND").replace("Bye", "BYE")
@@ -0,0 +1,71 @@
+"""Tests for local language identification"""
+import time
+from unittest.mock import Mock, patch
+from app import LanguageTranslator
+from langid import get_identifier, normalize_lang
+
+
+def test_detects_languages_quickly_in_batches():
+    """Test n-gram and script detection, confidence gating and per-string speed."""
+    identifier = get_identifier()
+    texts = ["Your changes have been saved successfully", "La contraseña que has introducido no es correcta",
+             "Ihre Änderungen wurden erfolgreich gespeichert", "Vos modifications ont été enregistrées",
+             "変更が保存されました", "您的更改已成功保存", "Привет, как дела?", "Привіт, як справи?", "12345"]
+    results = identifier.detect_many(texts)
+    assert [lang for lang, _ in results] == ["en", "es", "de", "fr", "ja", "zh", "ru", "uk", "und"]
+    assert identifier.is_confident(texts[0], results[0][1])
+    assert not identifier.is_confident("Save", identifier.detect("Save")[1])
+    # Kana decides Japanese; Cyrillic and Han are shared by several languages, so they only give a guess
+    japanese, russian = "変更は正常に保存されました。ありがとうございます", "Ваши изменения успешно сохранены"
+    assert identifier.is_confident(japanese, identifier.detect(japanese)[1])
+    assert identifier.detect(russian)[0] == "ru" and not identifier.is_confident(russian, identifier.detect(russian)[1])
+    # Languages without a profile are not passed off as the nearest known one
+    assert identifier.detect("Merhaba, bu akşam iki kişilik bir masa ayırtmak istiyorum lütfen.") == ("und", 0.0)
+    # nor are close neighbours of the supported languages (Catalan, Swiss German, Afrikaans)
+    neighbours = ["Bon dia, com estàs? Avui farem una reunió a la tarda amb tot l'equip.",
+                  "Mir händ hüt am Morge no kei Ziit gha, aber mir chömed spöter gern verbii.",
+                  "Ons gaan môre vroeg see toe, want die weer is baie mooi."]
+    assert identifier.detect_many(neighbours) == [("und", 0.0)] * 3
+    assert normalize_lang("Spanish") == "es" and normalize_lang("pt-BR") == "pt"
+
+    batch = texts * 200
+    start = time.perf_counter()
+    identifier.detect_many([f"{text} {i}" for i, text in enumerate(batch)])
+    assert (time.perf_counter() - start) / len(batch) < 0.001
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_auto_source_skips_text_already_in_the_target_language():
+    """Test that no-op translations never reach the API and detected languages are named in the prompt."""
+    from common.llm_cache import CacheConfig, ResponseCache
+    from translation_memory import TranslationMemory
+    translator = LanguageTranslator(cache=ResponseCache(CacheConfig(enabled=False)), memory=TranslationMemory(None))
+    english = "Your changes have been saved successfully"
+    spanish = "La contraseña que has introducido no es correcta"
+
+    with patch.object(translator.client.chat.completions, 'create') as mock_create:
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = '<seg id="1">Your changes were saved</seg>'
+        mock_response.usage = None
+        mock_create.return_value = mock_response
+
+        assert translator.translate(english, "auto", "en") == english
+        assert mock_create.call_count == 0
+
+        assert translator.translate_batch([english, spanish], "en") == [english, "Your changes were saved"]
+        assert mock_create.call_count == 1
+        assert "from es to en" in mock_create.call_args.kwargs["messages"][-1]["content"]
+
+        # Turkish looks closest to English and Bulgarian is Cyrillic, but neither is already in the target
+        mock_response.choices[0].message.content = "translated"
+        assert translator.translate("Merhaba, bu akşam iki kişilik bir masa ayırtmak istiyorum lütfen.",
+                                    "auto", "en") == "translated"
+        assert mock_create.call_count == 2
+        assert translator.translate("Бих искал да запазя маса за двама тази вечер, моля.", "auto", "ru") == "translated"
+        assert mock_create.call_count == 3
+        assert "from auto to ru" in mock_create.call_args.kwargs["messages"][-1]["content"]
+        # Catalan is nearest to Spanish but is not Spanish, so a request for Spanish is still translated
+        assert translator.translate("Bon dia, com estàs? Avui farem una reunió a la tarda amb tot l'equip.",
+                                    "auto", "es") == "translated"
+        assert mock_create.call_count == 4
@@ -0,0 +1,66 @@
+"""Tests for the translation memory"""
+import sqlite3
+
+from translation_memory import TranslationMemory, ngrams
+
+
+def test_exact_matches_persist_per_target_language(tmp_path):
+    """Test that stored segments are found again, whitespace-insensitively, after reopening."""
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"))
+    memory.add([("Save file", "Guardar archivo"), ("Open", "Abrir")], "es", "en")
+    memory.add([("Save file", "Datei speichern")], "de", "en")
+
+    reopened = TranslationMemory(str(tmp_path / "tm.sqlite3"))
+    assert reopened.lookup(["Save  file ", "Open", "Close"], "es", "en") == {"Save  file ": "Guardar archivo", "Open": "Abrir"}
+    assert reopened.get("Save file", "de", "en") == "Datei speichern"
+    assert reopened.stats() == {"segments": 3, "hits": 3, "misses": 1}
+
+    memory.add([("Open", "Abrir ahora")], "es", "en")
+    assert memory.get("Open", "es", "en") == "Abrir ahora"
+    assert len(memory) == 3
+
+
+def test_fuzzy_matches_use_the_ngram_index():
+    """Test that near-identical segments are suggested and unrelated ones are not."""
+    memory = TranslationMemory(None, fuzzy_threshold=0.75)
+    memory.add([("Save the current file", "Guardar el archivo actual"),
+                ("Delete account permanently", "Eliminar la cuenta permanentemente")], "es")
+
+    [(source, target, score)] = memory.fuzzy("Save the current files", "es")
+    assert source == "Save the current file" and target == "Guardar el archivo actual"
+    assert 0.75 <= score < 1
+    assert memory.fuzzy("Print preview", "es") == []
+    assert memory.fuzzy("Save the current files", "fr") == []
+
+
+def test_the_source_language_is_part_of_the_key():
+    """Test that the same text from two source languages keeps two translations."""
+    memory = TranslationMemory(None)
+    memory.add([("Gift", "Regalo"), ("Gift in the box", "Regalo en la caja")], "es", "en")
+    memory.add([("Gift", "Veneno"), ("Gift in the box", "Veneno en la caja")], "es", "de")
+
+    assert memory.get("Gift", "es", "en") == "Regalo"
+    assert memory.get("Gift", "es", "de") == "Veneno"
+    assert memory.get("Gift", "es") is None
+    assert [target for _, target, _ in memory.fuzzy("Gift in the boxes", "es", "de")] == ["Veneno en la caja"]
+    assert len(memory) == 4
+
+
+def test_memories_keyed_without_the_source_language_are_migrated(tmp_path):
+    """Test that a database from before source_lang was in the key is upgraded in place."""
+    path = str(tmp_path / "tm.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE segments (id INTEGER PRIMARY KEY, target_lang TEXT NOT NULL, source TEXT NOT NULL, "
+               "source_lang TEXT, target TEXT NOT NULL, grams INTEGER NOT NULL, created_at REAL NOT NULL, "
+               "UNIQUE (target_lang, source))")
+    db.execute("CREATE TABLE grams (gram TEXT NOT NULL, segment_id INTEGER NOT NULL)")
+    db.execute("INSERT INTO segments VALUES (1, 'es', 'Save the current file', 'en', 'Guardar el archivo actual', 23, 0)")
+    db.executemany("INSERT INTO grams VALUES (?, 1)", ((g,) for g in ngrams("Save the current file")))
+    db.commit()
+    db.close()
+
+    memory = TranslationMemory(path)
+    assert memory.get("Save the current file", "es", "en") == "Guardar el archivo actual"
+    assert memory.fuzzy("Save the current files", "es", "en")[0][1] == "Guardar el archivo actual"
+    memory.add([("Save the current file", "Speichern")], "es", "de")
+    assert len(memory) == 2
@@ -24,3 +24,69 @@ def test_translate():
         result = translator.translate("Hello", "en", "es")
         assert result == "Hola"
 
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_translate_cached():
+    """Test that repeated translations are served from the response cache."""
+    from common.llm_cache import CacheConfig, ResponseCache
+    translator = LanguageTranslator(cache=ResponseCache(CacheConfig(enabled=True, db_path=None)))
+    with patch.object(translator.client.chat.completions, 'create') as mock_create:
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hola"
+        mock_create.return_value = mock_response
+
+        assert translator.translate("Hello", "en", "es") == "Hola"
+        assert translator.translate("Hello", "en", "es") == "Hola"
+        assert mock_create.call_count == 1
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_translate_batch_packs_segments_and_uses_the_memory():
+    """Test one tagged prompt per batch, the per-segment fallback and memory hits."""
+    from common.llm_cache import CacheConfig, ResponseCache
+    from translation_memory import TranslationMemory
+    translator = LanguageTranslator(cache=ResponseCache(CacheConfig(enabled=False)), memory=TranslationMemory(None))
+
+    def create(**params):
+        prompt = params["messages"][-1]["content"]
+        response = Mock()
+        response.choices = [Mock()]
+        response.usage = None
+        if '<seg id="1">' in prompt:
+            # Segment 3 is dropped from the reply
+            response.choices[0].message.content = '<seg id="1">Abrir</seg>\n<seg id="2">Guardar</seg>'
+        else:
+            response.choices[0].message.content = "Cerrar"
+        return response
+
+    with patch.object(translator.client.chat.completions, 'create', side_effect=create) as mock_create:
+        result = translator.translate_batch(["Open", "Save", "Open", "Close", ""], "es", "en")
+        assert result == ["Abrir", "Guardar", "Abrir", "Cerrar", ""]
+        assert mock_create.call_count == 2
+
+        assert translator.translate_batch(["Save", "Close"], "es", "en") == ["Guardar", "Cerrar"]
+        assert mock_create.call_count == 2
+
+
+@patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
+def test_translate_batch_memory_is_per_source_language():
+    """Test that a segment remembered from one source language is translated again from another."""
+    from common.llm_cache import CacheConfig, ResponseCache
+    from translation_memory import TranslationMemory
+    translator = LanguageTranslator(cache=ResponseCache(CacheConfig(enabled=False)), memory=TranslationMemory(None))
+    translator.memory.add([("Gift", "Regalo")], "es", "en")
+
+    def create(**params):
+        response = Mock()
+        response.choices = [Mock()]
+        response.usage = None
+        response.choices[0].message.content = '<seg id="1">Veneno</seg>'
+        return response
+
+    with patch.object(translator.client.chat.completions, 'create', side_effect=create) as mock_create:
+        assert translator.translate_batch(["Gift"], "es", "en") == ["Regalo"]
+        assert mock_create.call_count == 0
+        assert translator.translate_batch(["Gift"], "es", "de") == ["Veneno"]
+        assert mock_create.call_count == 1
+        assert "from de to es" in mock_create.call_args.kwargs["messages"][-1]["content"]
@@ -0,0 +1,160 @@
+"""
+Translation Memory - Persistent store of translated segments with exact and fuzzy lookup
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_DB_PATH = str(Path.home() / ".cache" / "mini-ai-labs" / "translation_memory.sqlite3")
+
+# Character n-gram size for the fuzzy index
+NGRAM = 3
+# Longer segments (whole paragraphs) are only matched exactly
+MAX_FUZZY_GRAMS = 900
+
+
+def normalize(text: str) -> str:
+    """Collapse whitespace so layout-only differences still match exactly."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def ngrams(text: str, n: int = NGRAM) -> set:
+    """Character n-grams of the lower-cased text, padded so short strings still index."""
+    padded = f" {text.lower()} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class TranslationMemory:
+    def __init__(self, db_path: Optional[str] = DEFAULT_DB_PATH, fuzzy_threshold: float = 0.75):
+        """Translated segments keyed by source language, target language and source text.
+        Set db_path to None for memory only.
+
+        Exact matches are served without calling the API; fuzzy matches at or above
+        fuzzy_threshold (n-gram candidates, then a similarity check) are offered to the
+        model as reference translations.
+        """
+        self.db_path = db_path
+        self.fuzzy_threshold = fuzzy_threshold
+        self._db = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "TranslationMemory":
+        """Read TRANSLATION_MEMORY_DB ("none" for memory only) and TRANSLATION_MEMORY_FUZZY_THRESHOLD."""
+        db_path = os.getenv("TRANSLATION_MEMORY_DB", DEFAULT_DB_PATH)
+        return cls(db_path if db_path.lower() != "none" else None,
+                   float(os.getenv("TRANSLATION_MEMORY_FUZZY_THRESHOLD", "0.75")))
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._db is None:
+            if self.db_path:
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path or ":memory:", check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            schema = self._db.execute("SELECT sql FROM sqlite_master WHERE name = 'segments'").fetchone()
+            migrate = schema is not None and "UNIQUE (source_lang, target_lang, source)" not in schema[0]
+            if migrate:
+                # Memories written before the source language was part of the key
+                self._db.execute("ALTER TABLE segments RENAME TO segments_old")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                "id INTEGER PRIMARY KEY, target_lang TEXT NOT NULL, source TEXT NOT NULL, "
+                "source_lang TEXT NOT NULL, target TEXT NOT NULL, grams INTEGER NOT NULL, created_at REAL NOT NULL, "
+                "UNIQUE (source_lang, target_lang, source))"
+            )
+            if migrate:
+                # Keep the ids so the n-gram index still points at the right rows
+                self._db.execute(
+                    "INSERT INTO segments SELECT id, target_lang, source, COALESCE(source_lang, 'auto'), "
+                    "target, grams, created_at FROM segments_old")
+                self._db.execute("DROP TABLE segments_old")
+            self._db.execute("CREATE TABLE IF NOT EXISTS grams (gram TEXT NOT NULL, segment_id INTEGER NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS grams_gram ON grams (gram)")
+            self._db.commit()
+        return self._db
+
+    def lookup(self, segments: Iterable[str], to_lang: str, from_lang: str = "auto") -> Dict[str, str]:
+        """Exact matches for many segments at once: {segment: translation}.
+
+        Only translations stored for the same from_lang match, so identical text in two
+        languages (or an unknown one, "auto") never shares a translation.
+        """
+        wanted = {}
+        for segment in segments:
+            if segment.strip():
+                wanted.setdefault(normalize(segment), []).append(segment)
+        found = {}
+        with self._lock:
+            db = self._connection()
+            keys = list(wanted)
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = db.execute(
+                    f"SELECT source, target FROM segments WHERE source_lang = ? AND target_lang = ? AND source IN "
+                    f"({','.join('?' * len(batch))})", (from_lang, to_lang, *batch)).fetchall()
+                found.update((original, target) for source, target in rows for original in wanted[source])
+            hits = sum(1 for key in keys if wanted[key][0] in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def get(self, segment: str, to_lang: str, from_lang: str = "auto") -> Optional[str]:
+        return self.lookup([segment], to_lang, from_lang).get(segment)
+
+    def fuzzy(self, segment: str, to_lang: str, from_lang: str = "auto", limit: int = 3, candidates: int = 20) -> List[Tuple[str, str, float]]:
+        """Similar earlier segments as (source, translation, similarity), best first."""
+        query = normalize(segment)
+        grams = ngrams(query)
+        if len(grams) > MAX_FUZZY_GRAMS:
+            return []
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT s.source, s.target, s.grams, COUNT(*) AS shared FROM grams g "
+                f"JOIN segments s ON s.id = g.segment_id "
+                f"WHERE g.gram IN ({','.join('?' * len(grams))}) AND s.source_lang = ? AND s.target_lang = ? "
+                f"GROUP BY g.segment_id ORDER BY shared DESC LIMIT ?", (*grams, from_lang, to_lang, candidates)).fetchall()
+        matches = []
+        for source, target, count, shared in rows:
+            # Dice coefficient on n-grams is an upper bound worth checking properly
+            if 2 * shared / (len(grams) + count) < self.fuzzy_threshold or source == query:
+                continue
+            score = SequenceMatcher(None, query, source).ratio()
+            if score >= self.fuzzy_threshold:
+                matches.append((source, target, score))
+        return sorted(matches, key=lambda m: -m[2])[:limit]
+
+    def add(self, pairs: Iterable[Tuple[str, str]], to_lang: str, from_lang: str = "auto"):
+        """Store (segment, translation) pairs, replacing earlier translations of the same segment."""
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            for source, target in pairs:
+                source = normalize(source)
+                if not source or not target:
+                    continue
+                grams = ngrams(source)
+                old = db.execute("SELECT id FROM segments WHERE source_lang = ? AND target_lang = ? AND source = ?",
+                                 (from_lang, to_lang, source)).fetchone()
+                if old is not None:
+                    db.execute("DELETE FROM grams WHERE segment_id = ?", old)
+                    db.execute("DELETE FROM segments WHERE id = ?", old)
+                cursor = db.execute("INSERT INTO segments (target_lang, source, source_lang, target, grams, created_at) "
+                                    "VALUES (?, ?, ?, ?, ?, ?)", (to_lang, source, from_lang, target, len(grams), now))
+                db.executemany("INSERT INTO grams VALUES (?, ?)", ((g, cursor.lastrowid) for g in grams))
+            db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"segments": len(self), "hits": self.hits, "misses": self.misses}
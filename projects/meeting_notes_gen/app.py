@@ -5,18 +5,29 @@ Meeting Notes Generator - Generates structured meeting notes from transcripts
 
 import argparse
 import os
+import sys
+from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.serving import add_serve_arguments, serve
+
 load_dotenv()
 
 class MeetingNotesGenerator:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None):
         """Initialize the meeting notes generator."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else ResponseCache.from_env("meeting_notes_gen")
 
     def generate(self, transcript: str) -> str:
         """Generate structured meeting notes."""
@@ -34,7 +45,8 @@ Please provide:
 
 Format the output clearly with headers:"""
         
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client, self.cache, tool="meeting_notes_gen",
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are an expert at summarizing meetings and extracting key information."},
@@ -46,56 +58,67 @@ Format the output clearly with headers:"""
         return response.choices[0].message.content.strip()
 
 
+def create_app():
+    """Build the web app; the generator is created on the first request."""
+    from flask import Flask, request, render_template_string
+
+    app = Flask(__name__)
+    instrument_app(app, "meeting_notes_gen")
+    generator = LazyResource(MeetingNotesGenerator, "meeting_notes_gen")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Meeting Notes Generator</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 900px; margin: 50px auto; padding: 20px; }
+            textarea { width: 100%; height: 300px; margin: 10px 0; }
+            button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
+        </style>
+    </head>
+    <body>
+        <h1>📝 Meeting Notes Generator</h1>
+        <form method="POST">
+            <textarea name="transcript" placeholder="Paste meeting transcript here..." required></textarea>
+            <button type="submit">Generate Notes</button>
+        </form>
+        {% if notes %}
+        <div class="result">{{ notes }}</div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            transcript = request.form.get('transcript', '')
+            try:
+                notes = generator.get().generate(transcript)
+                return render_template_string(HTML_TEMPLATE, notes=notes)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    return app
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate meeting notes from transcripts")
     parser.add_argument("--transcript", "-t", type=str, help="Meeting transcript file")
     parser.add_argument("--output", "-o", type=str, help="Output file (optional)")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string
-        
-        app = Flask(__name__)
-        generator = MeetingNotesGenerator()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Meeting Notes Generator</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 900px; margin: 50px auto; padding: 20px; }
-                textarea { width: 100%; height: 300px; margin: 10px 0; }
-                button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
-            </style>
-        </head>
-        <body>
-            <h1>📝 Meeting Notes Generator</h1>
-            <form method="POST">
-                <textarea name="transcript" placeholder="Paste meeting transcript here..." required></textarea>
-                <button type="submit">Generate Notes</button>
-            </form>
-            {% if notes %}
-            <div class="result">{{ notes }}</div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                transcript = request.form.get('transcript', '')
-                try:
-                    notes = generator.generate(transcript)
-                    return render_template_string(HTML_TEMPLATE, notes=notes)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
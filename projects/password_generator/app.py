@@ -4,15 +4,53 @@ Password Generator - Generates secure passwords with strength analysis
 """
 
 import argparse
+import json
+import math
+import os
 import secrets
 import string
-import re
-from typing import Tuple
+import sys
+import time
+from itertools import tee
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.metrics import instrument_app
+from common.serving import add_serve_arguments, serve
+from breach import DEFAULT_INDEX_PATH, BreachIndex, build_index
+from estimator import estimate
+from strength import SYMBOL_CHARS, analyze, analyze_many
+
+SYMBOLS = SYMBOL_CHARS
+CHARACTER_CLASSES = {
+    "lowercase": string.ascii_lowercase,
+    "uppercase": string.ascii_uppercase,
+    "numbers": string.digits,
+    "symbols": SYMBOLS,
+}
+# Random bytes drawn per call to secrets.token_bytes in batch generation
+BLOCK_BYTES = 64 * 1024
+# Per-class minimums are met by redrawing, so requirements that fewer random passwords than
+# this meet are refused instead of drawing for ever (numbers=16 at length 16 is about 2e-13)
+MIN_ACCEPTANCE = 1e-3
+STRENGTHS = ("Weak", "Fair", "Good", "Strong")
+# The strongest rating each estimator score (0-4) allows
+ESTIMATE_STRENGTHS = ("Weak", "Weak", "Fair", "Good", "Strong")
+# Long repeats and runs of patterns, the inputs that give the estimator the most work
+WORST_CASE_PASSWORDS = ("ab" * 50, "xy" * 40, "a" * 100, "1234567890" * 10,
+                        "aabbccddeeffgghhiijjkkllmmnnooppqqrrsstt", "P@ssw0rd1987" * 8)
+
 
 class PasswordGenerator:
-    def __init__(self):
-        """Initialize the password generator."""
-        pass
+    def __init__(self, breaches: Optional[BreachIndex] = None):
+        """Initialize the password generator.
+
+        Strength analysis also checks passwords against breaches, or against the
+        index at PASSWORD_BREACH_INDEX when one has been built.
+        """
+        self.breaches = breaches if breaches is not None else BreachIndex.from_env()
 
     def generate(self, length: int = 12, include_uppercase: bool = True,
                  include_lowercase: bool = True, include_numbers: bool = True,
@@ -26,61 +64,308 @@ class PasswordGenerator:
         if include_numbers:
             chars += string.digits
         if include_symbols:
-            chars += "!@#$%^&*()_+-=[]{}|;:,.<>?"
+            chars += SYMBOLS
         
         if not chars:
             raise ValueError("At least one character set must be enabled")
         
         return ''.join(secrets.choice(chars) for _ in range(length))
 
-    def analyze_strength(self, password: str) -> Tuple[str, dict]:
-        """Analyze password strength."""
-        score = 0
-        feedback = []
-        
-        length = len(password)
-        if length >= 12:
-            score += 2
-        elif length >= 8:
-            score += 1
-        else:
-            feedback.append("Password is too short (recommend at least 12 characters)")
-        
-        if re.search(r'[a-z]', password):
-            score += 1
-        else:
-            feedback.append("Add lowercase letters")
-        
-        if re.search(r'[A-Z]', password):
-            score += 1
-        else:
-            feedback.append("Add uppercase letters")
-        
-        if re.search(r'\d', password):
-            score += 1
-        else:
-            feedback.append("Add numbers")
-        
-        if re.search(r'[!@#$%^&*()_+\-=\[\]{}|;:,.<>?]', password):
-            score += 1
-        else:
-            feedback.append("Add special characters for better security")
-        
-        if len(set(password)) / len(password) > 0.7:
-            score += 1
-        else:
-            feedback.append("Use more diverse characters")
-        
-        if score <= 2:
-            strength = "Weak"
-        elif score <= 4:
-            strength = "Fair"
-        elif score <= 5:
-            strength = "Good"
-        else:
-            strength = "Strong"
-        
-        return strength, {"score": score, "feedback": feedback, "length": length}
+    def iter_many(self, n: int, length: int = 12, include_uppercase: bool = True,
+                  include_lowercase: bool = True, include_numbers: bool = True,
+                  include_symbols: bool = False, min_counts: Optional[Dict[str, int]] = None) -> Iterator[str]:
+        """Yield n passwords, drawing randomness in large blocks instead of once per character.
+
+        Each random byte below the largest multiple of the alphabet size maps to one
+        character and the rest are discarded (rejection sampling), so every character
+        is uniform. Both steps run inside bytes.translate over the whole block.
+        min_counts maps a class ("lowercase", "uppercase", "numbers", "symbols") to
+        the fewest characters of it a password must have; passwords short of that are
+        drawn again, which keeps the accepted ones uniform too. Requirements that fewer
+        than MIN_ACCEPTANCE of random passwords meet raise ValueError.
+        """
+        if length < 1:
+            raise ValueError("Password length must be at least 1")
+        enabled = {"lowercase": include_lowercase, "uppercase": include_uppercase,
+                   "numbers": include_numbers, "symbols": include_symbols}
+        classes = [name for name in CHARACTER_CLASSES if enabled[name]]
+        if not classes:
+            raise ValueError("At least one character set must be enabled")
+        min_counts = {name: count for name, count in (min_counts or {}).items() if count > 0}
+        for name in min_counts:
+            if name not in CHARACTER_CLASSES:
+                raise ValueError(f"Unknown character class: {name}")
+            if not enabled[name]:
+                raise ValueError(f"{name} is required but not enabled")
+        if sum(min_counts.values()) > length:
+            raise ValueError("The required characters do not fit in the password length")
+        sizes = {name: len(CHARACTER_CLASSES[name]) for name in classes}
+        acceptance = acceptance_rate(length, sizes, min_counts)
+        if acceptance < MIN_ACCEPTANCE:
+            raise ValueError(f"Only {acceptance:.1e} of random passwords meet the requirements; "
+                             f"lower the minimums or lengthen the password")
+
+        alphabet = "".join(CHARACTER_CLASSES[name] for name in classes).encode("ascii")
+        limit = 256 - 256 % len(alphabet)
+        table = bytes(alphabet[b % len(alphabet)] if b < limit else 0 for b in range(256))
+        rejected = bytes(range(limit, 256))
+        # Characters mapped to their class index, so requirements are checked with bytes.count
+        class_table = bytearray(256)
+        for index, name in enumerate(classes):
+            for char in CHARACTER_CLASSES[name].encode("ascii"):
+                class_table[char] = index
+        required = [(bytes([classes.index(name)]), count) for name, count in min_counts.items()]
+
+        pool, produced = b"", 0
+        while produced < n:
+            pool += secrets.token_bytes(BLOCK_BYTES).translate(table, rejected)
+            usable = len(pool) - len(pool) % length
+            for start in range(0, usable, length):
+                candidate = pool[start:start + length]
+                if required:
+                    classes_used = candidate.translate(class_table)
+                    if any(classes_used.count(index) < count for index, count in required):
+                        continue
+                yield candidate.decode("ascii")
+                produced += 1
+                if produced == n:
+                    return
+            pool = pool[usable:]
+
+    def generate_many(self, n: int, length: int = 12, include_uppercase: bool = True,
+                      include_lowercase: bool = True, include_numbers: bool = True,
+                      include_symbols: bool = False, min_counts: Optional[Dict[str, int]] = None) -> List[str]:
+        """Generate n passwords at once; see iter_many."""
+        return list(self.iter_many(n, length, include_uppercase, include_lowercase,
+                                   include_numbers, include_symbols, min_counts))
+
+    def write_many(self, output: TextIO, n: int, length: int = 12, **options) -> int:
+        """Stream n passwords to a file, one per line, without holding them in memory."""
+        batch = []
+        for password in self.iter_many(n, length, **options):
+            batch.append(password)
+            if len(batch) == 10_000:
+                output.write("\n".join(batch) + "\n")
+                batch.clear()
+        if batch:
+            output.write("\n".join(batch) + "\n")
+        return n
+
+    def analyze_strength(self, password: str, user_inputs: Iterable[str] = ()) -> Tuple[str, dict]:
+        """Analyze password strength.
+
+        The checklist rating is capped by the pattern-matching estimate, so a password
+        like "P@ssw0rd1!" that ticks every box is still rated by how guessable it is.
+        The estimate is in analysis["estimate"]; user_inputs (name, e-mail, ...) count
+        as guessable words.
+        """
+        strength, analysis = analyze(password, self.breaches)
+        return _cap_by_estimate(password, strength, analysis, user_inputs)
+
+    def analyze_many(self, passwords: Iterable[str], processes: Optional[int] = None,
+                     estimated: bool = False) -> Iterator[Tuple[str, dict]]:
+        """Analyze passwords from any iterable (e.g. an open file), yielding results in order.
+
+        By default the verdicts are the checklist's alone, for throughput. With
+        estimated=True each is capped by the guessability estimate as in
+        analyze_strength, at about half a millisecond per password.
+        """
+        if not estimated:
+            return analyze_many(passwords, processes, breaches=self.breaches)
+        passwords, originals = tee(passwords)
+        return (_cap_by_estimate(password, strength, analysis)
+                for (strength, analysis), password in zip(analyze_many(passwords, processes, breaches=self.breaches),
+                                                          originals))
+
+
+def acceptance_rate(length: int, sizes: Dict[str, int], min_counts: Dict[str, int]) -> float:
+    """Share of uniformly random passwords with at least min_counts[name] characters of each class.
+
+    sizes maps every enabled class to its alphabet size. The required classes are
+    taken one at a time: of the positions no earlier class took, each one is in
+    this class with its share of the remaining alphabet, so its count is binomial.
+    """
+    if not min_counts:
+        return 1.0
+    # remaining[r]: probability that r positions are left for the classes not yet taken
+    remaining = [0.0] * length + [1.0]
+    mass = sum(sizes.values())
+    for name, count in min_counts.items():
+        q = sizes[name] / mass
+        mass -= sizes[name]
+        taken = [0.0] * (length + 1)
+        for r, chance in enumerate(remaining):
+            if chance:
+                for k in range(count, r + 1):
+                    taken[r - k] += chance * _binomial(r, k, q)
+        remaining = taken
+    return sum(remaining)
+
+
+def _binomial(n: int, k: int, q: float) -> float:
+    """P(k successes in n trials of probability q), in log space so long passwords cannot overflow."""
+    if q >= 1.0:
+        return 1.0 if k == n else 0.0
+    return math.exp(math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+                    + k * math.log(q) + (n - k) * math.log1p(-q))
+
+
+def _cap_by_estimate(password: str, strength: str, analysis: dict,
+                     user_inputs: Iterable[str] = ()) -> Tuple[str, dict]:
+    """Cap a checklist verdict by the pattern-matching estimate and merge its feedback."""
+    result = estimate(password, user_inputs)
+    analysis["estimate"] = result
+    strength = min(strength, ESTIMATE_STRENGTHS[result["score"]], key=STRENGTHS.index)
+    if result["warning"]:
+        analysis["feedback"].insert(1 if analysis.get("breached") else 0, result["warning"])
+    analysis["feedback"] += [s for s in result["suggestions"] if s not in analysis["feedback"]]
+    return strength, analysis
+
+
+def benchmark(count: int = 100_000, length: int = 16) -> dict:
+    """Passwords per second for the per-character generate() and the block-based generate_many(),
+    and the time the strength estimator takes per password, typical and worst case.
+    """
+    generator = PasswordGenerator()
+    results = {}
+    for name, run in (("generate", lambda: [generator.generate(length) for _ in range(count)]),
+                      ("generate_many", lambda: generator.generate_many(count, length))):
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        results[name] = {"seconds": round(seconds, 3), "passwords_per_second": round(count / seconds)}
+    results["speedup"] = round(results["generate"]["seconds"] / results["generate_many"]["seconds"], 1)
+
+    # Random passwords plus ones full of patterns, which give the estimator the most matches
+    samples = generator.generate_many(1000, length, include_symbols=True)
+    samples += ["Password123!", "correcthorsebatterystaple", "qwerty2019!!", "P@ssw0rd1987", "aaaabbbb1234"] * 200
+    timings = []
+    for password in samples:
+        start = time.perf_counter()
+        estimate(password)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    worst = 0.0
+    for password in WORST_CASE_PASSWORDS:
+        start = time.perf_counter()
+        estimate(password)
+        worst = max(worst, time.perf_counter() - start)
+    results["estimate"] = {"mean_us": round(sum(timings) / len(timings) * 1e6),
+                           "p99_us": round(timings[int(len(timings) * 0.99)] * 1e6),
+                           "worst_ms": round(worst * 1e3, 1)}
+    return results
+
+
+def create_app():
+    """Build the web app; the generator is created on the first request."""
+    from flask import Flask, jsonify, request, render_template_string
+
+    app = Flask(__name__)
+    instrument_app(app, "password_generator")
+    generator = LazyResource(PasswordGenerator, "password_generator")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Password Generator</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
+            input, select { width: 100%; padding: 10px; margin: 5px 0; }
+            button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; }
+            .strong { color: #28a745; }
+            .good { color: #17a2b8; }
+            .fair { color: #ffc107; }
+            .weak { color: #dc3545; }
+        </style>
+    </head>
+    <body>
+        <h1>🔐 Password Generator</h1>
+        <form method="POST">
+            <input type="number" name="length" value="12" min="8" max="128" placeholder="Length">
+            <label><input type="checkbox" name="uppercase" checked> Uppercase</label>
+            <label><input type="checkbox" name="lowercase" checked> Lowercase</label>
+            <label><input type="checkbox" name="numbers" checked> Numbers</label>
+            <label><input type="checkbox" name="symbols"> Symbols</label>
+            <button type="submit">Generate Password</button>
+        </form>
+        <hr>
+        <h2>Analyze Password</h2>
+        <form method="POST" action="{{ url_for('analyze') }}">
+            <input type="text" name="password" placeholder="Enter password to analyze">
+            <button type="submit">Analyze</button>
+        </form>
+        {% if password %}
+        <div class="result">
+            <strong>Generated Password:</strong><br>
+            <code style="font-size: 1.2em;">{{ password }}</code>
+            {% if strength %}
+            <p><strong>Strength:</strong> <span class="{{ strength.lower() }}">{{ strength }}</span></p>
+            {% endif %}
+            {% if analysis and analysis.estimate %}
+            <p><strong>Guesses to crack:</strong> about 10<sup>{{ analysis.estimate.guesses_log10 }}</sup>
+               ({{ analysis.estimate.crack_time }} offline)</p>
+            {% if analysis.feedback %}
+            <ul>{% for item in analysis.feedback %}<li>{{ item }}</li>{% endfor %}</ul>
+            {% endif %}
+            {% endif %}
+        </div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            length = int(request.form.get('length', 12))
+            uppercase = request.form.get('uppercase') == 'on'
+            lowercase = request.form.get('lowercase') == 'on'
+            numbers = request.form.get('numbers') == 'on'
+            symbols = request.form.get('symbols') == 'on'
+            try:
+                password = generator.get().generate(length, uppercase, lowercase, numbers, symbols)
+                strength, _ = generator.get().analyze_strength(password)
+                return render_template_string(HTML_TEMPLATE, password=password, strength=strength)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    @app.route('/analyze', methods=['POST'])
+    def analyze():
+        password = request.form.get('password', '')
+        strength, analysis = generator.get().analyze_strength(password)
+        return render_template_string(HTML_TEMPLATE, 
+                                    password=password, 
+                                    strength=strength,
+                                    analysis=analysis)
+
+    @app.route('/api/analyze', methods=['POST'])
+    def api_analyze():
+        """Analyze a batch: {"passwords": [...]} -> {"results": [{"strength", "score", "feedback", "length", "estimate"}]}.
+
+        Verdicts are capped by the guessability estimate, as on the /analyze page.
+        """
+        passwords = (request.get_json(silent=True) or {}).get('passwords')
+        if not isinstance(passwords, list) or not all(isinstance(p, str) for p in passwords):
+            return jsonify({"error": "passwords must be a list of strings"}), 400
+        results = [{"strength": strength, **analysis}
+                   for strength, analysis in generator.get().analyze_many(passwords, estimated=True)]
+        return jsonify({"results": results})
+
+    return app
+
+
+def read_passwords(path: str) -> Iterator[str]:
+    """Lines of a password file ("-" for stdin), read lazily; undecodable bytes are replaced."""
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8", errors="replace", newline="")
+    try:
+        for line in source:
+            yield line.rstrip("\r\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
 
 
 def main():
@@ -90,96 +375,126 @@ def main():
     parser.add_argument("--include-lowercase", action="store_true", default=True, help="Include lowercase letters")
     parser.add_argument("--include-numbers", action="store_true", default=True, help="Include numbers")
     parser.add_argument("--include-symbols", action="store_true", help="Include symbols")
+    parser.add_argument("--count", "-n", type=int, default=1, help="Number of passwords to generate")
+    parser.add_argument("--output", "-o", type=str, help="Write the passwords to this file (with --count)")
+    parser.add_argument("--require", type=str, default="",
+                        help="Minimum characters per class, e.g. uppercase=1,numbers=2,symbols=1 (with --count)")
+    parser.add_argument("--benchmark", action="store_true", help="Compare passwords/sec of the single and batch paths")
     parser.add_argument("--analyze", "-a", type=str, help="Analyze password strength")
+    parser.add_argument("--analyze-file", type=str, help="Analyze every line of a file (- for stdin)")
+    parser.add_argument("--processes", "-p", type=int, default=1, help="Processes for --analyze-file")
+    parser.add_argument("--estimate", action="store_true",
+                        help="Cap --analyze-file verdicts by the guessability estimate, as --analyze does (slower)")
+    parser.add_argument("--build-breach-index", type=str, metavar="SOURCE",
+                        help="Build the breached password index from a wordlist or SHA-1 list (- for stdin)")
+    parser.add_argument("--source-format", choices=["auto", "plain", "sha1"], default="auto",
+                        help="Lines of --build-breach-index: passwords or SHA-1 hashes (HASH[:COUNT])")
+    parser.add_argument("--breach-index", type=str, help="Breached password index to build or check against "
+                        "(default: PASSWORD_BREACH_INDEX or ~/.cache/mini-ai-labs/breached_passwords.idx)")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string
-        
-        app = Flask(__name__)
-        generator = PasswordGenerator()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Password Generator</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
-                input, select { width: 100%; padding: 10px; margin: 5px 0; }
-                button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; }
-                .strong { color: #28a745; }
-                .good { color: #17a2b8; }
-                .fair { color: #ffc107; }
-                .weak { color: #dc3545; }
-            </style>
-        </head>
-        <body>
-            <h1>🔐 Password Generator</h1>
-            <form method="POST">
-                <input type="number" name="length" value="12" min="8" max="128" placeholder="Length">
-                <label><input type="checkbox" name="uppercase" checked> Uppercase</label>
-                <label><input type="checkbox" name="lowercase" checked> Lowercase</label>
-                <label><input type="checkbox" name="numbers" checked> Numbers</label>
-                <label><input type="checkbox" name="symbols"> Symbols</label>
-                <button type="submit">Generate Password</button>
-            </form>
-            <hr>
-            <h2>Analyze Password</h2>
-            <form method="POST" action="/analyze">
-                <input type="text" name="password" placeholder="Enter password to analyze">
-                <button type="submit">Analyze</button>
-            </form>
-            {% if password %}
-            <div class="result">
-                <strong>Generated Password:</strong><br>
-                <code style="font-size: 1.2em;">{{ password }}</code>
-                {% if strength %}
-                <p><strong>Strength:</strong> <span class="{{ strength.lower() }}">{{ strength }}</span></p>
-                {% endif %}
-            </div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                length = int(request.form.get('length', 12))
-                uppercase = request.form.get('uppercase') == 'on'
-                lowercase = request.form.get('lowercase') == 'on'
-                numbers = request.form.get('numbers') == 'on'
-                symbols = request.form.get('symbols') == 'on'
-                try:
-                    password = generator.generate(length, uppercase, lowercase, numbers, symbols)
-                    strength, _ = generator.analyze_strength(password)
-                    return render_template_string(HTML_TEMPLATE, password=password, strength=strength)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
-        @app.route('/analyze', methods=['POST'])
-        def analyze():
-            password = request.form.get('password', '')
-            strength, analysis = generator.analyze_strength(password)
-            return render_template_string(HTML_TEMPLATE, 
-                                        password=password, 
-                                        strength=strength,
-                                        analysis=analysis)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
+    elif args.build_breach_index:
+        try:
+            path = args.breach_index or os.getenv("PASSWORD_BREACH_INDEX", DEFAULT_INDEX_PATH)
+            print(f"🗂️  Building the breached password index...")
+            start = time.perf_counter()
+            count = build_index(read_passwords(args.build_breach_index), path, args.source_format)
+            print(f"✅ {count:,} distinct passwords indexed in {time.perf_counter() - start:.1f}s -> {path}")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+
+    elif args.benchmark:
+        count = args.count if args.count > 1 else 100_000
+        print(f"⏱️  Generating {count} passwords of length {args.length} both ways...")
+        results = benchmark(count, args.length)
+        for name in ("generate", "generate_many"):
+            print(f"  {name:<14} {results[name]['passwords_per_second']:>10,} passwords/sec "
+                  f"({results[name]['seconds']}s)")
+        print(f"  speedup        {results['speedup']}x")
+        print(f"  estimate       {results['estimate']['mean_us']:>10,} µs/password mean, "
+              f"{results['estimate']['p99_us']:,} µs p99, {results['estimate']['worst_ms']} ms worst case")
+
+    elif args.count > 1:
+        try:
+            generator = PasswordGenerator()
+            min_counts = {}
+            for item in filter(None, args.require.split(",")):
+                name, _, count = item.partition("=")
+                min_counts[name.strip()] = int(count or 1)
+            options = dict(include_uppercase=args.include_uppercase, include_lowercase=args.include_lowercase,
+                           include_numbers=args.include_numbers, include_symbols=args.include_symbols,
+                           min_counts=min_counts)
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    generator.write_many(f, args.count, args.length, **options)
+                print(f"✅ {args.count} passwords written to {args.output}")
+            else:
+                generator.write_many(sys.stdout, args.count, args.length, **options)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+
+    elif args.analyze_file:
+        try:
+            generator = PasswordGenerator(BreachIndex(args.breach_index) if args.breach_index else None)
+            counts = {"Weak": 0, "Fair": 0, "Good": 0, "Strong": 0}
+            breached = 0
+            output = open(args.output, "w", encoding="utf-8") if args.output else None
+            start = time.perf_counter()
+            passwords = read_passwords(args.analyze_file)
+            if output:
+                # Keep each password next to its result; tee the stream instead of storing it
+                passwords, originals = tee(passwords)
+            try:
+                for strength, analysis in generator.analyze_many(passwords, args.processes, args.estimate):
+                    counts[strength] += 1
+                    breached += analysis.get("breached", False)
+                    if output:
+                        output.write(json.dumps({"password": next(originals), "strength": strength,
+                                                 "verdict": "estimate" if args.estimate else "checklist",
+                                                 "score": analysis["score"], "length": analysis["length"],
+                                                 "breached": analysis.get("breached")},
+                                                ensure_ascii=False) + "\n")
+            finally:
+                if output:
+                    output.close()
+            seconds = time.perf_counter() - start
+            total = sum(counts.values())
+            print(f"✅ Analyzed {total:,} passwords in {seconds:.1f}s ({total / max(seconds, 1e-9):,.0f}/sec)")
+            if not args.estimate:
+                print("  Checklist verdicts; add --estimate to cap them by guessability as --analyze does")
+            for strength, count in counts.items():
+                print(f"  {strength:<7} {count:>12,}  {count / max(total, 1):6.1%}")
+            if generator.breaches is not None:
+                print(f"  {'Breached':<7} {breached:>11,}  {breached / max(total, 1):6.1%}")
+            if args.output:
+                print(f"📄 Results written to {args.output}")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+
     elif args.analyze:
-        generator = PasswordGenerator()
+        generator = PasswordGenerator(BreachIndex(args.breach_index) if args.breach_index else None)
         strength, analysis = generator.analyze_strength(args.analyze)
         print(f"\nPassword: {args.analyze}")
         print(f"Strength: {strength}")
         print(f"Score: {analysis['score']}/7")
+        print(f"Guesses: 10^{analysis['estimate']['guesses_log10']} "
+              f"(score {analysis['estimate']['score']}/4, {analysis['estimate']['crack_time']} offline)")
+        if "breached" in analysis:
+            print(f"Breached: {'yes' if analysis['breached'] else 'no'}")
         if analysis['feedback']:
             print("\nSuggestions:")
             for item in analysis['feedback']:
@@ -0,0 +1,177 @@
+"""
+Breach - Memory-mapped index of breached passwords, built once from a wordlist or SHA-1 hash list
+"""
+
+import hashlib
+import heapq
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+DEFAULT_INDEX_PATH = str(Path.home() / ".cache" / "mini-ai-labs" / "breached_passwords.idx")
+
+MAGIC = b"MALBRIX1"
+# Hashes are bucketed by their top 16 bits; the header holds where each bucket starts
+BUCKETS = 1 << 16
+HEADER = len(MAGIC) + 8 + (BUCKETS + 1) * 8
+# Hashes sorted in memory before being written out as one run of the external sort
+RUN_SIZE = 4_000_000
+READ_SIZE = 64 * 1024
+
+SHA1_LINE = re.compile(r"([0-9A-Fa-f]{40})(?::\d+)?")
+
+
+def fingerprint(password: str) -> int:
+    """The first 64 bits of the password's SHA-1; collisions are negligible at any list size."""
+    return int.from_bytes(hashlib.sha1(password.encode("utf-8")).digest()[:8], "big")
+
+
+def _read_run(path: str) -> Iterator[int]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = array("Q")
+            try:
+                chunk.fromfile(f, READ_SIZE)
+            except EOFError:
+                pass
+            if not chunk:
+                return
+            yield from chunk
+
+
+def _fingerprints(lines: Iterable[str], source_format: str) -> Iterator[int]:
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        if source_format == "sha1":
+            match = SHA1_LINE.fullmatch(line.strip())
+            if match:
+                yield int(match.group(1)[:16], 16)
+        else:
+            yield fingerprint(line)
+
+
+def build_index(lines: Iterable[str], output_path: str = DEFAULT_INDEX_PATH,
+                source_format: str = "auto") -> int:
+    """Build the index from password lines or SHA-1 lines ("HASH" or "HASH:COUNT", as HIBP ships).
+
+    The input is streamed and sorted externally in runs of RUN_SIZE, so lists far
+    larger than memory can be indexed. Returns the number of distinct entries.
+    """
+    lines = iter(lines)
+    if source_format == "auto":
+        first = next((line for line in lines if line.strip()), "")
+        source_format = "sha1" if SHA1_LINE.fullmatch(first.strip()) else "plain"
+        lines = _chain(first, lines)
+
+    output_path = str(output_path)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Path(output_path).parent) as tmp:
+        runs: List[str] = []
+        run = array("Q")
+
+        def flush():
+            path = os.path.join(tmp, f"run{len(runs)}")
+            with open(path, "wb") as f:
+                array("Q", sorted(run)).tofile(f)
+            runs.append(path)
+            del run[:]
+
+        for value in _fingerprints(lines, source_format):
+            run.append(value)
+            if len(run) >= RUN_SIZE:
+                flush()
+        if run:
+            flush()
+
+        part = output_path + ".part"
+        bucket_counts = [0] * BUCKETS
+        count, previous = 0, None
+        with open(part, "wb") as f:
+            f.write(b"\0" * HEADER)
+            buffer = array("Q")
+            for value in heapq.merge(*(_read_run(path) for path in runs)):
+                if value == previous:
+                    continue
+                previous = value
+                buffer.append(value)
+                bucket_counts[value >> 48] += 1
+                count += 1
+                if len(buffer) >= READ_SIZE:
+                    _write_big_endian(f, buffer)
+            _write_big_endian(f, buffer)
+
+            starts, total = [], 0
+            for bucket in bucket_counts:
+                starts.append(total)
+                total += bucket
+            starts.append(total)
+            f.seek(0)
+            f.write(MAGIC + struct.pack(">Q", count) + struct.pack(f">{BUCKETS + 1}Q", *starts))
+        os.replace(part, output_path)
+    return count
+
+
+def _chain(first: str, rest: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+def _write_big_endian(f, buffer: array):
+    if sys.byteorder == "little":
+        buffer.byteswap()
+    buffer.tofile(f)
+    del buffer[:]
+
+
+class BreachIndex:
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        """Open an index built by build_index; the file is memory-mapped, not read.
+
+        A lookup reads two bucket offsets from the header and binary-searches one
+        bucket, touching a handful of pages, so resident memory stays small
+        however large the list is.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a breached password index")
+        self.count = struct.unpack_from(">Q", self._map, len(MAGIC))[0]
+
+    @classmethod
+    def from_env(cls) -> Optional["BreachIndex"]:
+        """Open PASSWORD_BREACH_INDEX (default under ~/.cache); None if no index has been built."""
+        path = os.getenv("PASSWORD_BREACH_INDEX", DEFAULT_INDEX_PATH)
+        return cls(path) if os.path.exists(path) else None
+
+    def contains_fingerprint(self, value: int) -> bool:
+        bucket = value >> 48
+        low, high = struct.unpack_from(">QQ", self._map, len(MAGIC) + 8 + bucket * 8)
+        while low < high:
+            middle = (low + high) // 2
+            found = struct.unpack_from(">Q", self._map, HEADER + middle * 8)[0]
+            if found == value:
+                return True
+            if found < value:
+                low = middle + 1
+            else:
+                high = middle
+        return False
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_fingerprint(fingerprint(password))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._map.close()
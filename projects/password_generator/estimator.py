@@ -0,0 +1,730 @@
+"""
+Estimator - Guesses needed to crack a password, from the patterns it is made of (zxcvbn-style)
+"""
+
+import math
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Patterns are matched in the first MAX_LENGTH characters, which bounds the dynamic program's
+# work; the rest counts as one bruteforce run unless the whole password repeats a short base
+MAX_LENGTH = 40
+
+REFERENCE_YEAR = date.today().year
+MIN_YEAR_SPACE = 20
+DATE_MIN_YEAR, DATE_MAX_YEAR = 1000, 2050
+
+BRUTEFORCE_CARDINALITY = 10
+MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10_000
+MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
+MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
+# Guesses are capped well inside a float's range (about 1.8e308), so that arithmetic on a
+# bruteforce run of thousands of characters cannot overflow; anything that long is strong anyway
+MAX_GUESSES = 1e300
+
+# Upper bounds of guesses for scores 0-3; zxcvbn adds a small delta so round numbers fall below
+SCORE_THRESHOLDS = (1e3 + 5, 1e6 + 5, 1e8 + 5, 1e10 + 5)
+# An offline attack on a slow hash such as bcrypt
+GUESSES_PER_SECOND = 1e4
+
+COMMON_PASSWORDS = """
+password 123456 123456789 12345678 12345 qwerty 1234567 111111 1234567890 123123 abc123 1234
+password1 iloveyou 1q2w3e4r 000000 qwerty123 zaq12wsx dragon sunshine princess letmein 654321
+monkey 1qaz2wsx 123321 qwertyuiop superman asdfghjkl trustno1 master welcome shadow football
+baseball michael jennifer hunter 121212 killer ashley jordan harley ranger buster thomas tigger
+robert soccer batman test pass hockey george charlie andrew michelle love jessica pepper daniel
+access joshua maggie starwars silver william dallas yankees 666666 hello amanda orange freedom
+computer thunder nicole ginger heather hammer summer corvette taylor austin merlin matthew
+7777777 secret admin login passw0rd qazwsx mustang 112233 whatever donald flower lovely
+cheese chelsea diamond bailey 888888 555555 123qwe matrix banana cookie purple snoopy jasmine
+charlie1 internet samsung blink182 liverpool arsenal chocolate butterfly 159753 1q2w3e
+qweasd zxcvbnm asdfgh aaaaaa 11111111 abcdef abcd1234 admin123 root toor changeme default
+guest hello123 welcome1 password123 iloveyou1 princess1 monkey1 dragon1 sunshine1 qwerty1
+football1 letmein1 trustno1 master1 baseball1 superman1 starwars1 michael1 batman1 shadow1
+""".split()
+
+ENGLISH_WORDS = """
+the and that have for not with you this but his from they say her she will one all would
+there their what out about who get which when make can like time just him know take people
+into year your good some could them see other than then now look only come its over think
+also back after use two how our work first well way even new want because any these give day
+most man woman child world school state family student group country problem hand part place
+case week company system program question government number night point home water room mother
+area money story fact month book eye job word business issue side kind head house service
+friend father power hour game line end member law car city name team minute idea body back
+face level office door health person art war history party result change morning reason girl
+boy moment air teacher force education foot age music market sense nation plan college death
+love heart light voice mind price road arm value action model season space ground form event
+star table court figure street image phone picture piece land doctor wall news test movie
+north south east west baby computer tree song secret dragon summer winter spring autumn flower
+garden orange purple yellow silver golden black white green blue red sun moon sky ocean river
+mountain forest tiger lion eagle wolf bear horse cat dog fish bird apple banana cherry lemon
+coffee chocolate cookie pizza guitar piano soccer football hockey tennis monkey princess angel
+magic ninja pirate rock heaven shadow thunder storm fire ice earth wind phoenix master hello
+welcome freedom happy lucky sweet pretty crazy super hunter killer king queen prince knight
+castle sword shield gold diamond crystal rainbow butterfly snow rain cloud ocean beach island
+summer paradise dream wonder spirit soul faith hope peace trust forever family letter correct
+battery staple monday friday sunday january march april june july august october december
+""".split()
+
+NAMES = """
+james john robert michael william david richard joseph thomas charles mary patricia jennifer
+linda elizabeth barbara susan jessica sarah karen daniel matthew anthony mark donald steven
+paul andrew joshua kenneth kevin brian george nancy lisa betty margaret sandra ashley kimberly
+emily donna michelle dorothy carol amanda melissa deborah stephanie rebecca laura sharon
+cynthia kathleen amy shirley angela helen anna brenda pamela nicole emma samantha katherine
+christine rachel catherine janet ruth maria heather diane virginia julie joyce victoria olivia
+kelly christina lauren joan evelyn megan andrea hannah martha jacqueline frances gloria teresa
+sara alice madison abigail julia grace denise amber danielle sophia marie diana brittany
+natalie isabella charlotte rose alexis kayla jack harry oliver jacob noah ethan liam lucas
+mason logan alexander henry sebastian benjamin samuel max leo adam alex chris peter eric
+smith johnson williams brown jones garcia miller davis rodriguez martinez wilson anderson
+taylor moore jackson martin lee thompson white harris clark lewis walker hall allen young
+wright scott green baker adams nelson hill campbell mitchell roberts carter phillips evans
+turner torres parker collins edwards stewart morris murphy cook rogers morgan peterson cooper
+""".split()
+
+RANKED_DICTIONARIES = {
+    "passwords": COMMON_PASSWORDS,
+    "english": ENGLISH_WORDS,
+    "names": NAMES,
+}
+
+L33T_TABLE = {
+    "a": "4@", "b": "8", "c": "({[<", "e": "3", "g": "69", "i": "1!|",
+    "l": "1|7", "o": "0", "s": "$5", "t": "+7", "x": "%", "z": "2",
+}
+# Substituted character -> the letters it can stand for
+L33T_LETTERS: Dict[str, str] = {}
+for _letter, _subs in L33T_TABLE.items():
+    for _sub in _subs:
+        L33T_LETTERS[_sub] = L33T_LETTERS.get(_sub, "") + _letter
+
+# Key rows, each key written as its unshifted and shifted character
+QWERTY_ROWS = [
+    "`~ 1! 2@ 3# 4$ 5% 6^ 7& 8* 9( 0) -_ =+",
+    "qQ wW eE rR tT yY uU iI oO pP [{ ]} \\|",
+    "aA sS dD fF gG hH jJ kK lL ;: '\"",
+    "zZ xX cC vV bB nN mM ,< .> /?",
+]
+KEYPAD_ROWS = [
+    " / * -",
+    "7 8 9 +",
+    "4 5 6",
+    "1 2 3",
+    " 0 .",
+]
+
+DATE_SPLITS = {
+    4: ((1, 2), (2, 3)),
+    5: ((1, 3), (2, 3)),
+    6: ((1, 2), (2, 4), (4, 5)),
+    7: ((1, 3), (2, 3), (4, 5), (4, 6)),
+    8: ((2, 4), (4, 6)),
+}
+DATE_WITH_SEPARATOR = re.compile(r"(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})")
+RECENT_YEAR = re.compile(r"19\d\d|20\d\d")
+REPEAT_GREEDY = re.compile(r"(.+)\1+", re.DOTALL)
+REPEAT_LAZY = re.compile(r"(.+?)\1+", re.DOTALL)
+
+START_UPPER = re.compile(r"[A-Z][^A-Z]+")
+END_UPPER = re.compile(r"[^A-Z]+[A-Z]")
+ALL_UPPER = re.compile(r"[^a-z]+")
+ALL_LOWER = re.compile(r"[^A-Z]+")
+
+Match = dict
+
+
+def _build_trie(dictionaries: Dict[str, Iterable[str]]) -> dict:
+    """Merge ranked word lists into one trie of nested dicts; "" marks a word end.
+
+    A word end holds {dictionary: rank}, so one walk over the password finds every
+    dictionary word starting at a position, in every list, at once.
+    """
+    root: dict = {}
+    for name, words in dictionaries.items():
+        for rank, word in enumerate(words, 1):
+            word = word.lower()
+            if len(word) < 3:
+                continue
+            node = root
+            for char in word:
+                node = node.setdefault(char, {})
+            ends = node.setdefault("", {})
+            ends.setdefault(name, rank)
+    return root
+
+
+def _build_graph(rows: List[str], slanted: bool) -> Tuple[Dict[str, Dict[str, Tuple[int, bool]]], float]:
+    """Map each character to {adjacent character: (direction, shifted)} and the average key degree.
+
+    On the slanted qwerty layout each row is offset half a key, which gives every key six
+    neighbours; the aligned keypad has eight.
+    """
+    positions = {}
+    for y, row in enumerate(rows):
+        if slanted:
+            for x, key in enumerate(row.split(" ")):
+                positions[(x + (1 if y else 0), y)] = key
+        else:
+            for x, key in enumerate(row.split(" ")):
+                if key:
+                    positions[(x, y)] = key
+    if slanted:
+        offsets = ((-1, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 1))
+    else:
+        offsets = ((-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1))
+
+    graph: Dict[str, Dict[str, Tuple[int, bool]]] = {}
+    degrees = []
+    for (x, y), key in positions.items():
+        neighbours = {}
+        for direction, (dx, dy) in enumerate(offsets):
+            adjacent = positions.get((x + dx, y + dy))
+            if adjacent:
+                for index, char in enumerate(adjacent):
+                    neighbours[char] = (direction, index == 1)
+        degree = sum(1 for dx, dy in offsets if (x + dx, y + dy) in positions)
+        for char in key:
+            graph[char] = neighbours
+            degrees.append(degree)
+    return graph, sum(degrees) / len(degrees)
+
+
+TRIE = _build_trie(RANKED_DICTIONARIES)
+GRAPHS = {
+    "qwerty": _build_graph(QWERTY_ROWS, slanted=True),
+    "keypad": _build_graph(KEYPAD_ROWS, slanted=False),
+}
+SHIFTED_CHARS = {"qwerty": frozenset("".join(key[1:] for row in QWERTY_ROWS for key in row.split(" "))),
+                 "keypad": frozenset()}
+
+
+# Matching
+
+def _dictionary_matches(password: str, trie: dict) -> List[Match]:
+    """Walk the trie from every position, branching on l33t characters as they are met.
+
+    A substitution must be used consistently within one word ("p4ss" and "p@ss" both
+    read as "pass", but "1" cannot stand for both "i" and "l" in one word).
+    """
+    lower = password.lower()
+    n = len(lower)
+    matches = []
+    for i in range(n):
+        stack = [(trie, i, ())]
+        while stack:
+            node, j, subs = stack.pop()
+            ends = node.get("")
+            if ends is not None and j > i:
+                token = password[i:j]
+                if not subs or len(token) > 1:
+                    word = "".join(dict(subs).get(char, char) for char in lower[i:j])
+                    for name, rank in ends.items():
+                        matches.append({"pattern": "dictionary", "i": i, "j": j - 1, "token": token,
+                                        "matched_word": word, "rank": rank, "dictionary": name,
+                                        "reversed": False, "l33t": dict(subs)})
+            if j == n:
+                continue
+            char = lower[j]
+            child = node.get(char)
+            if child is not None:
+                stack.append((child, j + 1, subs))
+            for letter in L33T_LETTERS.get(char, ""):
+                child = node.get(letter)
+                if child is None or any(s == char and l != letter for s, l in subs):
+                    continue
+                stack.append((child, j + 1, subs if (char, letter) in subs else subs + ((char, letter),)))
+    return matches
+
+
+def _reverse_dictionary_matches(password: str, trie: dict) -> List[Match]:
+    n = len(password)
+    matches = _dictionary_matches(password[::-1], trie)
+    for match in matches:
+        match["token"] = match["token"][::-1]
+        match["reversed"] = True
+        match["i"], match["j"] = n - 1 - match["j"], n - 1 - match["i"]
+    return matches
+
+
+def _spatial_matches(password: str) -> List[Match]:
+    """Runs of three or more adjacent keys, counting changes of direction and shifted keys."""
+    matches = []
+    n = len(password)
+    for name, (graph, _) in GRAPHS.items():
+        shifted_chars = SHIFTED_CHARS[name]
+        i = 0
+        while i < n - 2:
+            j, turns, last_direction = i + 1, 0, None
+            shifted = 1 if password[i] in shifted_chars else 0
+            while j < n:
+                step = graph.get(password[j - 1], {}).get(password[j])
+                if step is None:
+                    break
+                direction, is_shifted = step
+                if direction != last_direction:
+                    turns += 1
+                    last_direction = direction
+                shifted += is_shifted
+                j += 1
+            if j - i > 2:
+                matches.append({"pattern": "spatial", "i": i, "j": j - 1, "token": password[i:j],
+                                "graph": name, "turns": turns, "shifted_count": shifted})
+            i = j
+    return matches
+
+
+def _repeat_matches(password: str) -> List[Match]:
+    """Repeated substrings ("aaa", "abcabc"); the base is itself estimated like a password."""
+    matches = []
+    last_index = 0
+    while last_index < len(password):
+        greedy = REPEAT_GREEDY.search(password, last_index)
+        if not greedy:
+            break
+        lazy = REPEAT_LAZY.search(password, last_index)
+        if len(greedy.group(0)) > len(lazy.group(0)):
+            match = greedy
+            base = REPEAT_LAZY.fullmatch(match.group(0)).group(1)
+        else:
+            match, base = lazy, lazy.group(1)
+        i, j = match.start(), match.end() - 1
+        matches.append({"pattern": "repeat", "i": i, "j": j, "token": match.group(0), "base_token": base,
+                        "base_guesses": _base_guesses(base),
+                        "repeat_count": len(match.group(0)) // len(base)})
+        last_index = j + 1
+    return matches
+
+
+@lru_cache(maxsize=1024)
+def _base_guesses(base: str) -> float:
+    """Guesses for a repeat's base, which recurs across the overlapping repeats of one password."""
+    return _most_guessable(base)[0]
+
+
+def _sequence_matches(password: str) -> List[Match]:
+    """Runs with a constant step of 1 to 5 code points, like "abc", "9753" or "ACEG"."""
+    matches = []
+    if len(password) < 2:
+        return matches
+
+    def add(i: int, j: int, delta: int):
+        if (j - i > 1 or abs(delta) == 1) and 0 < abs(delta) <= 5:
+            matches.append({"pattern": "sequence", "i": i, "j": j, "token": password[i:j + 1],
+                            "ascending": delta > 0})
+
+    i, last_delta = 0, None
+    for k in range(1, len(password)):
+        delta = ord(password[k]) - ord(password[k - 1])
+        if last_delta is None:
+            last_delta = delta
+        if delta == last_delta:
+            continue
+        add(i, k - 1, last_delta)
+        i, last_delta = k - 1, delta
+    add(i, len(password) - 1, last_delta)
+    return matches
+
+
+def _year_matches(password: str) -> List[Match]:
+    return [{"pattern": "year", "i": m.start(), "j": m.end() - 1, "token": m.group(0), "year": int(m.group(0))}
+            for m in RECENT_YEAR.finditer(password)]
+
+
+def _two_to_four_digit_year(year: int) -> int:
+    if year > 99:
+        return year
+    return year + (1900 if year > 50 else 2000)
+
+
+def _day_month(first: int, second: int) -> Optional[Tuple[int, int]]:
+    for day, month in ((first, second), (second, first)):
+        if 1 <= day <= 31 and 1 <= month <= 12:
+            return day, month
+    return None
+
+
+def _to_date(ints: Tuple[int, int, int]) -> Optional[int]:
+    """The year, if the three numbers read as a day, month and year in some order."""
+    if ints[1] > 31 or ints[1] <= 0:
+        return None
+    over_12 = over_31 = under_1 = 0
+    for value in ints:
+        if 99 < value < DATE_MIN_YEAR or value > DATE_MAX_YEAR:
+            return None
+        over_31 += value > 31
+        over_12 += value > 12
+        under_1 += value <= 0
+    if over_31 >= 2 or over_12 == 3 or under_1 >= 2:
+        return None
+    splits = ((ints[2], ints[0], ints[1]), (ints[0], ints[1], ints[2]))
+    for year, first, second in splits:
+        if DATE_MIN_YEAR <= year <= DATE_MAX_YEAR:
+            return year if _day_month(first, second) else None
+    for year, first, second in splits:
+        if _day_month(first, second):
+            return _two_to_four_digit_year(year)
+    return None
+
+
+def _date_matches(password: str) -> List[Match]:
+    """Dates of 4-8 digits ("13111987", "1187") or with a separator ("13.11.87"), years 1000-2050."""
+    matches = []
+    n = len(password)
+    for i in range(n - 3):
+        for j in range(i + 3, min(i + 8, n)):
+            token = password[i:j + 1]
+            if not token.isdigit() or not token.isascii():
+                continue
+            candidates = [year for k, l in DATE_SPLITS[len(token)]
+                          for year in [_to_date((int(token[:k]), int(token[k:l]), int(token[l:])))] if year]
+            if candidates:
+                year = min(candidates, key=lambda y: abs(y - REFERENCE_YEAR))
+                matches.append({"pattern": "date", "i": i, "j": j, "token": token, "year": year,
+                                "separator": ""})
+    for i in range(n - 5):
+        for j in range(i + 5, min(i + 10, n)):
+            match = DATE_WITH_SEPARATOR.fullmatch(password, i, j + 1)
+            if match:
+                year = _to_date((int(match.group(1)), int(match.group(3)), int(match.group(4))))
+                if year:
+                    matches.append({"pattern": "date", "i": i, "j": j, "token": match.group(0), "year": year,
+                                    "separator": match.group(2)})
+    # A date inside a longer date ("1987" in "13111987") adds nothing
+    return [m for m in matches
+            if not any(o is not m and o["i"] <= m["i"] and o["j"] >= m["j"] for o in matches)]
+
+
+def _omnimatch(password: str, trie: dict, user_trie: Optional[dict] = None) -> List[Match]:
+    matches = []
+    for words in (trie, user_trie) if user_trie else (trie,):
+        matches += _dictionary_matches(password, words)
+        matches += _reverse_dictionary_matches(password, words)
+    matches += _spatial_matches(password)
+    matches += _repeat_matches(password)
+    matches += _sequence_matches(password)
+    matches += _year_matches(password)
+    matches += _date_matches(password)
+    return matches
+
+
+# Guess estimates
+
+def _uppercase_variations(token: str) -> int:
+    if ALL_LOWER.fullmatch(token) or token.lower() == token:
+        return 1
+    if START_UPPER.fullmatch(token) or END_UPPER.fullmatch(token) or ALL_UPPER.fullmatch(token):
+        return 2
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    return sum(math.comb(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def _l33t_variations(match: Match) -> int:
+    variations = 1
+    token = match["token"].lower()
+    for sub, letter in match["l33t"].items():
+        subbed, unsubbed = token.count(sub), token.count(letter)
+        if not subbed or not unsubbed:
+            variations *= 2
+        else:
+            variations *= sum(math.comb(subbed + unsubbed, i) for i in range(1, min(subbed, unsubbed) + 1))
+    return variations
+
+
+def _spatial_guesses(match: Match) -> int:
+    graph, degree = GRAPHS[match["graph"]]
+    starts, length, turns = len(graph), len(match["token"]), match["turns"]
+    guesses = 0.0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += math.comb(i - 1, j - 1) * starts * degree ** j
+    shifted = match["shifted_count"]
+    if shifted:
+        unshifted = length - shifted
+        if not unshifted:
+            guesses *= 2
+        else:
+            guesses *= sum(math.comb(shifted + unshifted, i) for i in range(1, min(shifted, unshifted) + 1))
+    return guesses
+
+
+def _sequence_guesses(match: Match) -> int:
+    first = match["token"][0]
+    if first in "aAzZ019":
+        base = 4
+    elif first.isdigit():
+        base = 10
+    else:
+        base = 26
+    return base * len(match["token"]) * (1 if match["ascending"] else 2)
+
+
+def _bruteforce_guesses(length: int, password_length: int) -> int:
+    """Guesses for a run of characters that matched nothing."""
+    return max(min(BRUTEFORCE_CARDINALITY ** length, MAX_GUESSES),
+               MIN_SUBMATCH_GUESSES_SINGLE_CHAR + 1 if length == 1 else MIN_SUBMATCH_GUESSES_MULTI_CHAR + 1)
+
+
+def _guesses(match: Match, password_length: int) -> float:
+    """Guesses an attacker who knows the pattern needs to produce this match, cached on it."""
+    if "guesses" in match:
+        return match["guesses"]
+    pattern = match["pattern"]
+    length = len(match["token"])
+    if pattern == "dictionary":
+        guesses = (match["rank"] * _uppercase_variations(match["token"]) * _l33t_variations(match)
+                   * (2 if match["reversed"] else 1))
+    elif pattern == "spatial":
+        guesses = _spatial_guesses(match)
+    elif pattern == "repeat":
+        guesses = match["base_guesses"] * match["repeat_count"]
+    elif pattern == "sequence":
+        guesses = _sequence_guesses(match)
+    else:
+        guesses = max(abs(match["year"] - REFERENCE_YEAR), MIN_YEAR_SPACE)
+        if pattern == "date":
+            guesses *= 365 * (4 if match["separator"] else 1)
+    if length < password_length:
+        guesses = max(guesses, MIN_SUBMATCH_GUESSES_SINGLE_CHAR if length == 1 else MIN_SUBMATCH_GUESSES_MULTI_CHAR)
+    match["guesses"] = guesses
+    return guesses
+
+
+def _greedy_cover(password: str, matches: List[Match]) -> Tuple[float, List[Match]]:
+    """One complete cover, cheap to find: the longest match at each position, bruteforce runs in between."""
+    n = len(password)
+    longest: Dict[int, Match] = {}
+    for match in matches:
+        if match["i"] not in longest or match["j"] > longest[match["i"]]["j"]:
+            longest[match["i"]] = match
+    sequence, product, start, i = [], 1, 0, 0
+
+    def bruteforce(end: int):
+        if end > start:
+            sequence.append({"pattern": "bruteforce", "i": start, "j": end - 1, "token": password[start:end],
+                             "guesses": _bruteforce_guesses(end - start, n)})
+
+    while i < n:
+        match = longest.get(i)
+        if match is None:
+            i += 1
+            continue
+        bruteforce(i)
+        sequence.append(match)
+        start = i = match["j"] + 1
+    bruteforce(n)
+    for match in sequence:
+        product *= _guesses(match, n)
+    length = len(sequence)
+    return math.factorial(length) * product + MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (length - 1), sequence
+
+
+def _most_guessable(password: str, matches: Optional[List[Match]] = None) -> Tuple[float, List[Match]]:
+    """The cheapest way to produce the password from matches plus bruteforce runs between them.
+
+    A sequence of l matches costs l! * (product of their guesses), since the attacker also
+    has to guess the order, plus 10000^(l-1) so that splitting into more pieces is never
+    free. The dynamic program keeps, for each end position and sequence length, only the
+    cheapest sequence, so it runs in O(n^2) over positions rather than over all covers.
+    """
+    n = len(password)
+    if not n:
+        return 1, []
+    if matches is None:
+        matches = _omnimatch(password, TRIE)
+
+    by_end: List[List[Match]] = [[] for _ in range(n)]
+    for match in matches:
+        by_end[match["j"]].append(match)
+    for bucket in by_end:
+        bucket.sort(key=lambda m: m["i"])
+
+    # Any complete cover bounds the answer, and a prefix only gets costlier as it is extended,
+    # so prefixes already above a greedy cover's guesses are dropped (with slack for rounding)
+    greedy = _greedy_cover(password, matches)
+    bound = min(greedy[0], _bruteforce_guesses(n, n) + 1) * (1 + 1e-9)
+
+    # Per end position k: {sequence length: (guesses of the prefix, product of guesses, start, last match)},
+    # with None as the last match for a bruteforce run
+    optimal: List[Dict[int, Tuple[float, float, int, Optional[Match]]]] = [{} for _ in range(n)]
+    # Lengths at each position whose sequence ends in a pattern; two adjacent bruteforce runs
+    # are always worse than one, so only these are extended by a bruteforce run
+    extendable: List[List[int]] = []
+
+    def update(i: int, k: int, length: int, match_guesses: float, match: Optional[Match]):
+        product = match_guesses
+        if length > 1:
+            product *= optimal[i - 1][length - 1][1]
+        guesses = math.factorial(length) * product + MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (length - 1)
+        if guesses > bound:
+            return
+        best = optimal[k]
+        for other_length, other in best.items():
+            if other_length <= length and other[0] <= guesses:
+                return
+        best[length] = (guesses, product, i, match)
+
+    for k in range(n):
+        for match in by_end[k]:
+            i, match_guesses = match["i"], _guesses(match, n)
+            if i:
+                for length in optimal[i - 1]:
+                    update(i, k, length + 1, match_guesses, match)
+            else:
+                update(0, k, 1, match_guesses, match)
+        update(0, k, 1, _bruteforce_guesses(k + 1, n), None)
+        for i in range(1, k + 1):
+            if extendable[i - 1]:
+                match_guesses = _bruteforce_guesses(k - i + 1, n)
+                for length in extendable[i - 1]:
+                    update(i, k, length + 1, match_guesses, None)
+        extendable.append([length for length, entry in optimal[k].items() if entry[3] is not None])
+
+    if not optimal[n - 1]:
+        # Keeping one sequence per length can drop a prefix only a bruteforce run would have
+        # extended, so the greedy cover is occasionally the cheaper one
+        return greedy
+    length, (guesses, _, _, _) = min(optimal[n - 1].items(), key=lambda item: item[1][0])
+    if greedy[0] < guesses:
+        return greedy
+    sequence = []
+    k = n - 1
+    while k >= 0:
+        _, _, i, match = optimal[k][length]
+        if match is None:
+            match = {"pattern": "bruteforce", "i": i, "j": k, "token": password[i:k + 1],
+                     "guesses": _bruteforce_guesses(k - i + 1, n)}
+        sequence.append(match)
+        k, length = i - 1, length - 1
+    return guesses, sequence[::-1]
+
+
+# Feedback
+
+def _match_feedback(match: Match, only_match: bool) -> Tuple[str, List[str]]:
+    pattern = match["pattern"]
+    if pattern == "dictionary":
+        warning = ""
+        if match["dictionary"] == "passwords":
+            if only_match and not match["l33t"] and not match["reversed"]:
+                warning = ("This is a top-10 common password" if match["rank"] <= 10 else
+                           "This is a top-100 common password" if match["rank"] <= 100 else
+                           "This is a very common password")
+            else:
+                warning = "This is similar to a commonly used password"
+        elif match["dictionary"] == "english":
+            warning = "A word by itself is easy to guess" if only_match else ""
+        elif match["dictionary"] == "names":
+            warning = ("Names and surnames by themselves are easy to guess" if only_match
+                       else "Common names and surnames are easy to guess")
+        else:
+            warning = "Avoid words from your own details"
+        suggestions = []
+        token = match["token"]
+        if START_UPPER.fullmatch(token):
+            suggestions.append("Capitalization doesn't help very much")
+        elif ALL_UPPER.fullmatch(token) and token.lower() != token:
+            suggestions.append("All-uppercase is almost as easy to guess as all-lowercase")
+        if match["reversed"] and len(token) >= 4:
+            suggestions.append("Reversed words aren't much harder to guess")
+        if match["l33t"]:
+            suggestions.append("Predictable substitutions like '@' instead of 'a' don't help very much")
+        return warning, suggestions
+    if pattern == "spatial":
+        warning = ("Straight rows of keys are easy to guess" if match["turns"] == 1
+                   else "Short keyboard patterns are easy to guess")
+        return warning, ["Use a longer keyboard pattern with more turns"]
+    if pattern == "repeat":
+        warning = ('Repeats like "aaa" are easy to guess' if len(match["base_token"]) == 1
+                   else 'Repeats like "abcabcabc" are only slightly harder to guess than "abc"')
+        return warning, ["Avoid repeated words and characters"]
+    if pattern == "sequence":
+        return "Sequences like abc or 6543 are easy to guess", ["Avoid sequences"]
+    if pattern == "year":
+        return "Recent years are easy to guess", ["Avoid recent years", "Avoid years that are associated with you"]
+    if pattern == "date":
+        return "Dates are often easy to guess", ["Avoid dates and years that are associated with you"]
+    return "", []
+
+
+def _feedback(score: int, sequence: List[Match]) -> Tuple[str, List[str]]:
+    if not sequence:
+        return "", ["Use a few words, avoid common phrases", "No need for symbols, digits, or uppercase letters"]
+    if score > 2:
+        return "", []
+    longest = max(sequence, key=lambda m: len(m["token"]))
+    warning, suggestions = _match_feedback(longest, len(sequence) == 1)
+    return warning, ["Add another word or two. Uncommon words are better."] + suggestions
+
+
+def display_time(seconds: float) -> str:
+    for unit, size in (("year", 31_536_000), ("month", 2_678_400), ("day", 86_400),
+                       ("hour", 3_600), ("minute", 60), ("second", 1)):
+        if seconds >= size:
+            if unit == "year" and seconds >= 100 * size:
+                return "centuries"
+            count = round(seconds / size)
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    return "less than a second"
+
+
+def _past_max_length(password: str, guesses: float, sequence: List[Match]) -> Tuple[float, List[Match]]:
+    """Extend the estimate for the first MAX_LENGTH characters to the whole password.
+
+    A password that is one short base repeated ("ab" * 50) stays a single repeat;
+    otherwise the rest is appended to the sequence as one bruteforce run.
+    """
+    n = len(password)
+    repeat = REPEAT_LAZY.fullmatch(password)
+    if repeat and len(repeat.group(1)) <= MAX_LENGTH:
+        base = repeat.group(1)
+        match = {"pattern": "repeat", "i": 0, "j": n - 1, "token": password, "base_token": base,
+                 "base_guesses": _base_guesses(base), "repeat_count": n // len(base)}
+        return _guesses(match, n), [match]
+    if sequence and sequence[-1]["pattern"] == "bruteforce":
+        # A bruteforce run at the end of the head simply continues into the tail
+        *sequence, last = sequence
+        start = last["i"]
+    else:
+        start = MAX_LENGTH
+    tail = {"pattern": "bruteforce", "i": start, "j": n - 1, "token": password[start:],
+            "guesses": _bruteforce_guesses(n - start, n)}
+    product = math.prod(_guesses(match, MAX_LENGTH) for match in sequence) * tail["guesses"]
+    length = len(sequence) + 1
+    return (math.factorial(length) * product + MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (length - 1),
+            sequence + [tail])
+
+
+def estimate(password: str, user_inputs: Iterable[str] = ()) -> dict:
+    """Estimate how many guesses it takes to crack a password.
+
+    Every dictionary word (with l33t and reversal), keyboard walk, repeat, sequence,
+    year and date in the password is found, and the cheapest combination of them and
+    bruteforce runs gives the guesses. user_inputs (names, e-mail, site name) are
+    matched as one more dictionary. The score runs from 0 (too guessable) to 4.
+    """
+    user_words = [word.lower() for word in user_inputs if word]
+    user_trie = _build_trie({"user_inputs": user_words}) if user_words else None
+    head = password[:MAX_LENGTH]
+    guesses, sequence = _most_guessable(head, _omnimatch(head, TRIE, user_trie))
+    if len(password) > MAX_LENGTH:
+        guesses, sequence = _past_max_length(password, guesses, sequence)
+    guesses = min(guesses, MAX_GUESSES)
+    score = next((score for score, limit in enumerate(SCORE_THRESHOLDS) if guesses < limit), 4)
+    warning, suggestions = _feedback(score, sequence)
+    seconds = guesses / GUESSES_PER_SECOND
+    return {
+        "score": score,
+        "guesses": guesses,
+        "guesses_log10": round(math.log10(guesses), 2),
+        "entropy_bits": round(math.log2(guesses), 1),
+        "crack_time_seconds": seconds,
+        "crack_time": display_time(seconds),
+        "warning": warning,
+        "suggestions": suggestions,
+        "sequence": [{key: value for key, value in match.items() if key != "guesses"} for match in sequence],
+    }
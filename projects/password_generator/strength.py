@@ -0,0 +1,169 @@
+"""
+Strength - Checklist strength analysis in a single table-driven pass, for one password or millions
+"""
+
+import multiprocessing
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from breach import BreachIndex
+
+SYMBOL_CHARS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
+
+LOWER, UPPER, DIGIT, SYMBOL, OTHER = 1, 2, 4, 8, 16
+
+# Class bit of every ASCII character, applied to a whole password by one bytes.translate
+CLASS_TABLE = bytes(
+    LOWER if chr(b).islower() else
+    UPPER if chr(b).isupper() else
+    DIGIT if chr(b).isdigit() else
+    SYMBOL if chr(b) in SYMBOL_CHARS else OTHER
+    for b in range(128)
+) + bytes([OTHER]) * 128
+
+BATCH_SIZE = 10_000
+
+BREACHED_FEEDBACK = "This password appears in a list of breached passwords - never use it"
+
+
+def features(password: str) -> Tuple[int, int, float]:
+    """(length, class bits present, share of distinct characters) in one pass over the password."""
+    length = len(password)
+    if not length:
+        return 0, 0, 0.0
+    classes = 0
+    if password.isascii():
+        # The class values are distinct bits, so the sum of the distinct ones is their union
+        classes = sum(set(password.encode("ascii").translate(CLASS_TABLE)))
+    else:
+        # Outside ASCII only decimal digits count, as they would for \d
+        for char in set(password):
+            classes |= CLASS_TABLE[ord(char)] if ord(char) < 128 else (DIGIT if char.isdecimal() else OTHER)
+    return length, classes, len(set(password)) / length
+
+
+def _checklist(length_band: int, classes: int, diverse: bool) -> Tuple[str, int, Tuple[str, ...]]:
+    """The 7-point checklist: length (0-2 points), four character classes and diversity."""
+    score = length_band
+    feedback = []
+    if not length_band:
+        feedback.append("Password is too short (recommend at least 12 characters)")
+
+    for bit, advice in ((LOWER, "Add lowercase letters"), (UPPER, "Add uppercase letters"),
+                        (DIGIT, "Add numbers"), (SYMBOL, "Add special characters for better security")):
+        if classes & bit:
+            score += 1
+        else:
+            feedback.append(advice)
+
+    if diverse:
+        score += 1
+    else:
+        feedback.append("Use more diverse characters")
+
+    if score <= 2:
+        strength = "Weak"
+    elif score <= 4:
+        strength = "Fair"
+    elif score <= 5:
+        strength = "Good"
+    else:
+        strength = "Strong"
+    return strength, score, tuple(feedback)
+
+
+# Every outcome of the checklist, indexed by (length band, class bits, diverse)
+VERDICTS = {(band, classes, diverse): _checklist(band, classes, diverse)
+            for band in range(3) for classes in range(32) for diverse in (False, True)}
+
+
+def _key(password: str) -> Tuple[int, int, bool]:
+    length, classes, diversity = features(password)
+    return 2 if length >= 12 else 1 if length >= 8 else 0, classes, diversity > 0.7
+
+
+def _verdict(key: Tuple[int, int, bool], length: int, breached: Optional[bool]) -> Tuple[str, dict]:
+    """Build the result; a breached password is Weak whatever its checklist score."""
+    strength, score, feedback = VERDICTS[key]
+    analysis = {"score": score, "feedback": list(feedback), "length": length}
+    if breached is not None:
+        analysis["breached"] = breached
+        if breached:
+            strength = "Weak"
+            analysis["feedback"].insert(0, BREACHED_FEEDBACK)
+    return strength, analysis
+
+
+def analyze(password: str, breaches: Optional[BreachIndex] = None) -> Tuple[str, dict]:
+    """Score a password on the checklist with one feature pass and one table lookup.
+
+    With a breach index, the result also says whether the password is in it.
+    """
+    return _verdict(_key(password), len(password), password in breaches if breaches is not None else None)
+
+
+@lru_cache(maxsize=None)
+def _open_index(path: str) -> BreachIndex:
+    """The index for a path, opened once per worker process."""
+    return BreachIndex(path)
+
+
+def _classify(passwords: List[str], breaches: Union[BreachIndex, str, None] = None) -> list:
+    """The verdict key, length and breach flag of each password, with the common ASCII case inlined.
+
+    Results are small tuples, so batches classified in worker processes are cheap to
+    send back. Workers get the index as a path and map it themselves.
+    """
+    if isinstance(breaches, str):
+        breaches = _open_index(breaches)
+    keys = []
+    append, table = keys.append, CLASS_TABLE
+    for password in passwords:
+        length = len(password)
+        breached = password in breaches if breaches is not None else None
+        if not length or not password.isascii():
+            append((_key(password), length, breached))
+            continue
+        band = 2 if length >= 12 else 1 if length >= 8 else 0
+        classes = sum(set(password.encode("ascii").translate(table)))
+        append(((band, classes, len(set(password)) / length > 0.7), length, breached))
+    return keys
+
+
+def _results(keys: list) -> Iterator[Tuple[str, dict]]:
+    for key, length, breached in keys:
+        yield _verdict(key, length, breached)
+
+
+def _batches(passwords: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(passwords)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def analyze_many(passwords: Iterable[str], processes: Optional[int] = None,
+                 batch_size: int = BATCH_SIZE, breaches: Optional[BreachIndex] = None) -> Iterator[Tuple[str, dict]]:
+    """Analyze passwords from any iterable, yielding (strength, analysis) in input order.
+
+    The input is consumed lazily, so a file of millions of lines is never held in
+    memory. With processes > 1, batches are analyzed in a process pool, with at most
+    two batches per process in flight.
+    """
+    if not processes or processes <= 1:
+        for batch in _batches(passwords, batch_size):
+            yield from _results(_classify(batch, breaches))
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        pending = deque()
+        for batch in _batches(passwords, batch_size):
+            pending.append(pool.apply_async(_classify, (batch, breaches.path if breaches is not None else None)))
+            if len(pending) >= 2 * processes:
+                yield from _results(pending.popleft().get())
+        while pending:
+            yield from _results(pending.popleft().get())
@@ -0,0 +1,53 @@
+"""Tests for batch password generation"""
+import io
+from collections import Counter
+
+import pytest
+from app import CHARACTER_CLASSES, SYMBOLS, PasswordGenerator, acceptance_rate
+
+
+def test_generate_many_is_uniform_and_meets_requirements():
+    """Test that batch passwords use the alphabet evenly and honour per-class minimums."""
+    generator = PasswordGenerator()
+    passwords = generator.generate_many(5000, 16, include_symbols=True,
+                                        min_counts={"numbers": 2, "symbols": 1})
+    assert len(passwords) == 5000
+    assert all(len(p) == 16 for p in passwords)
+    assert all(sum(c in CHARACTER_CLASSES["numbers"] for c in p) >= 2 for p in passwords)
+    assert all(any(c in SYMBOLS for c in p) for p in passwords)
+
+    # Without requirements every one of the 62 characters is equally likely (bias would show up here)
+    counts = Counter("".join(generator.generate_many(20000, 16)))
+    assert len(counts) == 62
+    expected = 20000 * 16 / 62
+    assert all(abs(count - expected) < expected * 0.1 for count in counts.values())
+
+
+def test_write_many_streams_lines_and_rejects_impossible_requirements():
+    """Test streaming to a file and the errors for requirements that cannot be met."""
+    generator = PasswordGenerator()
+    output = io.StringIO()
+    assert generator.write_many(output, 25_000, 8, include_uppercase=False) == 25_000
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 25_000 and len(set(lines)) > 24_900
+    assert not any(c.isupper() for line in lines for c in line)
+
+    with pytest.raises(ValueError):
+        generator.generate_many(1, 4, min_counts={"numbers": 3, "uppercase": 2})
+    with pytest.raises(ValueError):
+        generator.generate_many(1, 12, min_counts={"symbols": 1})
+    # Requirements that fit but almost no random password meets fail fast instead of drawing for ever
+    with pytest.raises(ValueError, match="meet the requirements"):
+        generator.generate_many(1, 16, min_counts={"numbers": 16})
+    with pytest.raises(ValueError, match="at least 1"):
+        generator.generate_many(1, 0)
+
+
+def test_acceptance_rate_matches_the_multinomial():
+    """Test the share of random passwords meeting per-class minimums, including very long ones."""
+    sizes = {name: len(CHARACTER_CLASSES[name]) for name in ("lowercase", "uppercase", "numbers")}
+    assert acceptance_rate(16, sizes, {}) == 1.0
+    assert acceptance_rate(16, sizes, {"numbers": 16}) == pytest.approx((10 / 62) ** 16)
+    # P(numbers >= 1) = 1 - (52/62)^8
+    assert acceptance_rate(8, sizes, {"numbers": 1}) == pytest.approx(1 - (52 / 62) ** 8)
+    assert 0.7 < acceptance_rate(1000, sizes, {"numbers": 150, "uppercase": 400}) < 0.8
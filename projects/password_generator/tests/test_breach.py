@@ -0,0 +1,38 @@
+"""Tests for the breached password index"""
+import hashlib
+
+import breach
+from app import PasswordGenerator
+from breach import BreachIndex, build_index
+
+
+def test_build_index_sorts_externally_and_dedupes(tmp_path, monkeypatch):
+    """Test building across several sorted runs, duplicate removal and lookups from plain and SHA-1 lists."""
+    monkeypatch.setattr(breach, "RUN_SIZE", 100)
+    words = [f"leaked{i}" for i in range(1000)]
+    assert build_index(words + words[:300] + [""], tmp_path / "plain.idx") == 1000
+
+    index = BreachIndex(str(tmp_path / "plain.idx"))
+    assert len(index) == 1000
+    assert all(word in index for word in words)
+    assert not any(f"safe{i}" in index for i in range(1000))
+
+    hashes = [f"{hashlib.sha1(w.encode()).hexdigest().upper()}:{i}" for i, w in enumerate(words[:50])]
+    assert build_index(hashes, tmp_path / "sha1.idx") == 50
+    assert "leaked7" in BreachIndex(str(tmp_path / "sha1.idx"))
+    assert "leaked70" not in BreachIndex(str(tmp_path / "sha1.idx"))
+
+
+def test_breached_passwords_are_weak(tmp_path):
+    """Test that a password meeting the whole checklist is still Weak once it is known to be breached."""
+    build_index(["Password123!", "qwerty"], tmp_path / "breached.idx")
+    generator = PasswordGenerator(BreachIndex(str(tmp_path / "breached.idx")))
+
+    strength, analysis = generator.analyze_strength("Password123!")
+    assert strength == "Weak" and analysis["breached"]
+    assert "breached" in analysis["feedback"][0]
+    strength, analysis = generator.analyze_strength("Vq7#mZ2!pL9x")
+    assert strength == "Strong" and analysis["breached"] is False
+
+    results = list(generator.analyze_many(["qwerty", "Vq7#mZ2!pL9x", "Password123!"], processes=2))
+    assert [analysis["breached"] for _, analysis in results] == [True, False, True]
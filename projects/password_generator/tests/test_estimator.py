@@ -0,0 +1,59 @@
+"""Tests for the pattern-matching strength estimator"""
+import time
+
+from app import WORST_CASE_PASSWORDS, PasswordGenerator
+from estimator import MAX_GUESSES, MAX_LENGTH, estimate
+
+
+def test_estimate_finds_patterns():
+    """Test that dictionary words (l33t, reversed), keyboard walks, repeats, sequences and dates are found."""
+    def patterns(password):
+        return [(m["pattern"], m["token"]) for m in estimate(password)["sequence"]]
+
+    assert patterns("p@ssw0rd") == [("dictionary", "p@ssw0rd")]
+    assert estimate("p@ssw0rd")["sequence"][0]["l33t"] == {"@": "a", "0": "o"}
+    assert estimate("drowssap")["sequence"][0]["reversed"]
+    assert patterns("zxcvbn") == [("spatial", "zxcvbn")]
+    assert patterns("abcabcabc") == [("repeat", "abcabcabc")]
+    assert patterns("13.11.1987") == [("date", "13.11.1987")]
+    assert patterns("jennifer2019") == [("dictionary", "jennifer"), ("year", "2019")]
+    assert patterns("correcthorsebatterystaple") == [("dictionary", "correct"), ("dictionary", "horse"),
+                                                     ("dictionary", "battery"), ("dictionary", "staple")]
+
+    assert estimate("password")["score"] == 0
+    assert estimate("password")["warning"] == "This is a top-10 common password"
+    assert estimate("Vq7#mZ2!pL9x")["score"] == 4 and estimate("Vq7#mZ2!pL9x")["guesses"] == 10 ** 12 + 1
+    assert estimate("")["guesses"] == 1
+    personal = estimate("alexandra.reyes77", ["Alexandra", "Reyes"])
+    assert personal["sequence"][0]["dictionary"] == "user_inputs"
+    assert personal["guesses"] < estimate("alexandra.reyes77")["guesses"]
+
+
+def test_analyze_strength_is_capped_by_the_estimate():
+    """Test that a password ticking every checklist box is rated by how guessable it is."""
+    generator = PasswordGenerator()
+    strength, analysis = generator.analyze_strength("P@ssw0rd1987")
+    assert analysis["score"] == 7
+    assert strength == "Weak" and analysis["estimate"]["score"] <= 1
+    assert analysis["feedback"][0] == "This is similar to a commonly used password"
+
+    strength, analysis = generator.analyze_strength("Vq7#mZ2!pL9x")
+    assert strength == "Strong" and analysis["feedback"] == []
+
+
+def test_long_passwords_are_bounded():
+    """Test that long inputs stay fast, repeats of a short base stay repeats and other tails are bruteforced."""
+    for password in WORST_CASE_PASSWORDS:
+        start = time.perf_counter()
+        estimate(password)
+        assert time.perf_counter() - start < 0.05, password
+
+    repeated = estimate("ab" * 50)
+    assert [m["pattern"] for m in repeated["sequence"]] == ["repeat"] and repeated["score"] <= 1
+    tail = estimate("correcthorsebatterystaple" * 2 + "Vq7#")["sequence"][-1]
+    assert tail["pattern"] == "bruteforce" and tail["i"] <= MAX_LENGTH and tail["token"].endswith("stapleVq7#")
+
+    # Guesses for thousands of characters are capped instead of overflowing a float
+    huge = estimate("Vq7#mZ2!pL9x" * 100 + "!")
+    assert huge["guesses"] == MAX_GUESSES and huge["score"] == 4 and huge["crack_time"] == "centuries"
+    assert PasswordGenerator().analyze_strength("Tr0ub4dor&3xyz" * 100)[0] == "Strong"
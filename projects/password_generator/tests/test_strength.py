@@ -0,0 +1,34 @@
+"""Tests for the table-driven strength analyzer"""
+from app import PasswordGenerator, create_app
+from strength import analyze, analyze_many
+
+
+def test_analyze_matches_the_checklist():
+    """Test scores, feedback and edge cases (empty, non-ASCII digits) of the single-pass analyzer."""
+    assert analyze("Tr0ub4dor&3xyz") == ("Strong", {"score": 7, "feedback": [], "length": 14})
+    strength, analysis = analyze("aaaaaaaa")
+    assert strength == "Weak" and analysis["score"] == 2
+    assert analysis["feedback"] == ["Add uppercase letters", "Add numbers",
+                                    "Add special characters for better security", "Use more diverse characters"]
+    # Arabic-Indic digits count as numbers, like \d; other non-ASCII characters count as nothing
+    assert "Add numbers" not in analyze("é٣")[1]["feedback"]
+    assert analyze("") == ("Weak", {"score": 0, "feedback": [
+        "Password is too short (recommend at least 12 characters)", "Add lowercase letters",
+        "Add uppercase letters", "Add numbers", "Add special characters for better security",
+        "Use more diverse characters"], "length": 0})
+
+
+def test_analyze_many_streams_in_order_across_processes():
+    """Test that batch analysis, in-process or in a pool, matches one-by-one analysis and order."""
+    passwords = [f"user{i}Pass!" if i % 3 else "x" * (i % 20) for i in range(2500)]
+    expected = [analyze(p) for p in passwords]
+    assert list(analyze_many(iter(passwords), batch_size=100)) == expected
+    assert list(PasswordGenerator().analyze_many(iter(passwords), processes=2)) == expected
+
+    # Estimated batch verdicts agree with analyze_strength, as the API's do
+    generator = PasswordGenerator()
+    assert [strength for strength, _ in generator.analyze_many(["P@ssw0rd1987", "Tr0ub4dor&3xyz"], estimated=True)] \
+        == [generator.analyze_strength("P@ssw0rd1987")[0], "Strong"] == ["Weak", "Strong"]
+    response = create_app().test_client().post("/api/analyze", json={"passwords": ["abc", "Tr0ub4dor&3xyz",
+                                                                                   "P@ssw0rd1987"]})
+    assert [r["strength"] for r in response.get_json()["results"]] == ["Weak", "Strong", "Weak"]
@@ -5,19 +5,38 @@ PDF Q&A Bot - Answers questions about PDF documents
 
 import argparse
 import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 from pdfminer.high_level import extract_text
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.jobs import JobQueue, pending_html, register_job_routes, submit_response
+from common.lazy import LazyResource
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.semantic_cache import SemanticCache
+from common.serving import add_serve_arguments, serve
+from common.tokens import fit_to_budget, trim_to_tokens
+
 load_dotenv()
 
 class PDFQABot:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None,
+                 semantic_cache: Optional[SemanticCache] = None):
         """Initialize the PDF Q&A bot."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else ResponseCache.from_env("pdf_qa_bot")
+        self.semantic_cache = semantic_cache if semantic_cache is not None else SemanticCache.from_env("pdf_qa_bot")
+        # Roughly the old 12,000-character cutoff; raise it to send more of long documents
+        self.max_document_tokens = int(os.getenv("PDF_QA_MAX_DOCUMENT_TOKENS", "3000"))
 
     def extract_text(self, pdf_path: str) -> str:
         """Extract text from PDF."""
@@ -29,14 +48,9 @@ class PDFQABot:
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {e}")
 
-    def answer_question(self, pdf_text: str, question: str) -> str:
-        """Answer a question about the PDF content."""
-        # Truncate text if too long (to fit in context window)
-        max_chars = 12000
-        if len(pdf_text) > max_chars:
-            pdf_text = pdf_text[:max_chars] + "... [truncated]"
-        
-        prompt = f"""Based on the following document content, answer the question. If the answer is not in the document, say so.
+    def _prompt(self, pdf_text: str, question: str) -> str:
+        """Build the user prompt for a question about the document."""
+        return f"""Based on the following document content, answer the question. If the answer is not in the document, say so.
 
 Document Content:
 {pdf_text}
@@ -44,17 +58,122 @@ Document Content:
 Question: {question}
 
 Answer:"""
+
+    def answer_question(self, pdf_text: str, question: str) -> str:
+        """Answer a question about the PDF content."""
+        model = "gpt-3.5-turbo"
+        system_prompt = "You are a helpful assistant that answers questions based on provided documents."
         
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        # Truncate the document to the token limit and whatever the model budget leaves
+        # after the system prompt and question
+        pdf_text = trim_to_tokens(pdf_text, self.max_document_tokens, model)
+        pdf_text = fit_to_budget(pdf_text, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": self._prompt("", question)},
+        ], model)
+        
+        # Paraphrased questions about the same document can reuse an earlier answer
+        if self.semantic_cache is not None:
+            answer = self.semantic_cache.get(question, context=f"{model}\n{pdf_text}")
+            if answer is not None:
+                return answer
+        
+        response = chat_completion(
+            self.client, self.cache, tool="pdf_qa_bot",
+            model=model,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant that answers questions based on provided documents."},
-                {"role": "user", "content": prompt}
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": self._prompt(pdf_text, question)}
             ],
             temperature=0.7
         )
         
-        return response.choices[0].message.content.strip()
+        answer = response.choices[0].message.content.strip()
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(question, answer, context=f"{model}\n{pdf_text}")
+        return answer
+
+
+def create_app():
+    """Build the web app; the bot is created on the first request.
+
+    Questions are answered by a background job queue, so requests return straight away.
+    """
+    from flask import Flask, request, render_template_string, send_file, jsonify
+    import werkzeug
+
+    app = Flask(__name__)
+    instrument_app(app, "pdf_qa_bot")
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    bot = LazyResource(PDFQABot, "pdf_qa_bot")
+    jobs = JobQueue.from_env("pdf_qa_bot")
+    register_job_routes(app, jobs)
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>PDF Q&A Bot</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 900px; margin: 50px auto; padding: 20px; }
+            input, textarea { width: 100%; padding: 10px; margin: 5px 0; }
+            button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; }
+        </style>
+    </head>
+    <body>
+        <h1>📄 PDF Q&A Bot</h1>
+        <form method="POST" enctype="multipart/form-data">
+            <input type="file" name="pdf" accept=".pdf" required>
+            <textarea name="question" placeholder="Ask a question about the PDF..." required></textarea>
+            <button type="submit">Get Answer</button>
+        </form>
+        {% if answer %}
+        <div class="result">
+            <strong>Answer:</strong><br>{{ answer }}
+        </div>
+        {% endif %}
+        {% if pending %}{{ pending }}{% endif %}
+        {% if error %}
+        <div class="result"><strong>Error:</strong> {{ error }}</div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    def prepare():
+        """Read the uploaded PDF now and return the slow part (answering) as a job."""
+        if 'pdf' not in request.files:
+            raise ValueError("No PDF file provided")
+        file = request.files['pdf']
+        question = request.form.get('question', '').strip()
+        if not question:
+            raise ValueError("Question is required")
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as temp:
+            file.save(temp)
+            temp.flush()
+            pdf_text = bot.get().extract_text(temp.name)
+        return lambda: bot.get().answer_question(pdf_text, question)
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            try:
+                job_id = jobs.submit(prepare())
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+            return render_template_string(HTML_TEMPLATE, pending=pending_html(job_id))
+        return render_template_string(HTML_TEMPLATE)
+
+    @app.route('/jobs', methods=['POST'])
+    def create_job():
+        try:
+            job = prepare()
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+        return submit_response(jobs, job)
+
+    return app
 
 
 def main():
@@ -62,68 +181,15 @@ def main():
     parser.add_argument("--pdf", "-p", type=str, help="PDF file path")
     parser.add_argument("--question", "-q", type=str, help="Question to ask")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string, send_file
-        import werkzeug
-        
-        app = Flask(__name__)
-        app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
-        bot = PDFQABot()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>PDF Q&A Bot</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 900px; margin: 50px auto; padding: 20px; }
-                input, textarea { width: 100%; padding: 10px; margin: 5px 0; }
-                button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; }
-            </style>
-        </head>
-        <body>
-            <h1>📄 PDF Q&A Bot</h1>
-            <form method="POST" enctype="multipart/form-data">
-                <input type="file" name="pdf" accept=".pdf" required>
-                <textarea name="question" placeholder="Ask a question about the PDF..." required></textarea>
-                <button type="submit">Get Answer</button>
-            </form>
-            {% if answer %}
-            <div class="result">
-                <strong>Answer:</strong><br>{{ answer }}
-            </div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                if 'pdf' not in request.files:
-                    return render_template_string(HTML_TEMPLATE, error="No PDF file provided")
-                
-                file = request.files['pdf']
-                question = request.form.get('question', '').strip()
-                
-                if not question:
-                    return render_template_string(HTML_TEMPLATE, error="Question is required")
-                
-                try:
-                    temp_path = f"/tmp/{file.filename}"
-                    file.save(temp_path)
-                    pdf_text = bot.extract_text(temp_path)
-                    answer = bot.answer_question(pdf_text, question)
-                    os.remove(temp_path)
-                    return render_template_string(HTML_TEMPLATE, answer=answer)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
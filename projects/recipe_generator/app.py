@@ -5,18 +5,29 @@ Recipe Generator - Generates personalized recipes using AI
 
 import argparse
 import os
+import sys
+from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.llm import chat_completion
+from common.llm_cache import ResponseCache
+from common.metrics import instrument_app
+from common.serving import add_serve_arguments, serve
+
 load_dotenv()
 
 class RecipeGenerator:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None):
         """Initialize the recipe generator."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else ResponseCache.from_env("recipe_generator")
 
     def generate(self, ingredients: str, cuisine: str = "any", 
                 dietary: str = "", servings: int = 4) -> str:
@@ -35,7 +46,8 @@ Include:
 5. Difficulty level
 6. Optional: Nutritional information"""
         
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client, self.cache, tool="recipe_generator",
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are an expert chef and recipe creator. Create detailed, practical recipes."},
@@ -47,6 +59,66 @@ Include:
         return response.choices[0].message.content.strip()
 
 
+def create_app():
+    """Build the web app; the generator is created on the first request."""
+    from flask import Flask, request, render_template_string
+
+    app = Flask(__name__)
+    instrument_app(app, "recipe_generator")
+    generator = LazyResource(RecipeGenerator, "recipe_generator")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Recipe Generator</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 900px; margin: 50px auto; padding: 20px; }
+            input, textarea, select { width: 100%; padding: 10px; margin: 5px 0; }
+            button { padding: 12px 24px; background: #28a745; color: white; border: none; cursor: pointer; }
+            .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
+        </style>
+    </head>
+    <body>
+        <h1>🍳 Recipe Generator</h1>
+        <form method="POST">
+            <input type="text" name="ingredients" placeholder="Ingredients (comma-separated)" required>
+            <select name="cuisine">
+                <option value="any">Any Cuisine</option>
+                <option value="italian">Italian</option>
+                <option value="chinese">Chinese</option>
+                <option value="mexican">Mexican</option>
+                <option value="indian">Indian</option>
+                <option value="french">French</option>
+            </select>
+            <input type="text" name="dietary" placeholder="Dietary restrictions (optional)">
+            <input type="number" name="servings" value="4" min="1" placeholder="Servings">
+            <button type="submit">Generate Recipe</button>
+        </form>
+        {% if recipe %}
+        <div class="result">{{ recipe }}</div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            ingredients = request.form.get('ingredients', '')
+            cuisine = request.form.get('cuisine', 'any')
+            dietary = request.form.get('dietary', '')
+            servings = int(request.form.get('servings', 4))
+            try:
+                recipe = generator.get().generate(ingredients, cuisine, dietary, servings)
+                return render_template_string(HTML_TEMPLATE, recipe=recipe)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+        return render_template_string(HTML_TEMPLATE)
+
+    return app
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate personalized recipes")
     parser.add_argument("--ingredients", "-i", type=str, help="Available ingredients (comma-separated)")
@@ -54,64 +126,15 @@ def main():
     parser.add_argument("--dietary", "-d", type=str, default="", help="Dietary restrictions")
     parser.add_argument("--servings", "-s", type=int, default=4, help="Number of servings")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string
-        
-        app = Flask(__name__)
-        generator = RecipeGenerator()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Recipe Generator</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 900px; margin: 50px auto; padding: 20px; }
-                input, textarea, select { width: 100%; padding: 10px; margin: 5px 0; }
-                button { padding: 12px 24px; background: #28a745; color: white; border: none; cursor: pointer; }
-                .result { margin-top: 20px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
-            </style>
-        </head>
-        <body>
-            <h1>🍳 Recipe Generator</h1>
-            <form method="POST">
-                <input type="text" name="ingredients" placeholder="Ingredients (comma-separated)" required>
-                <select name="cuisine">
-                    <option value="any">Any Cuisine</option>
-                    <option value="italian">Italian</option>
-                    <option value="chinese">Chinese</option>
-                    <option value="mexican">Mexican</option>
-                    <option value="indian">Indian</option>
-                    <option value="french">French</option>
-                </select>
-                <input type="text" name="dietary" placeholder="Dietary restrictions (optional)">
-                <input type="number" name="servings" value="4" min="1" placeholder="Servings">
-                <button type="submit">Generate Recipe</button>
-            </form>
-            {% if recipe %}
-            <div class="result">{{ recipe }}</div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                ingredients = request.form.get('ingredients', '')
-                cuisine = request.form.get('cuisine', 'any')
-                dietary = request.form.get('dietary', '')
-                servings = int(request.form.get('servings', 4))
-                try:
-                    recipe = generator.generate(ingredients, cuisine, dietary, servings)
-                    return render_template_string(HTML_TEMPLATE, recipe=recipe)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
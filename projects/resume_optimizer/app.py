@@ -5,24 +5,39 @@ Resume Optimizer - Analyzes and optimizes resumes for specific job roles
 
 import argparse
 import os
+import sys
+import tempfile
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from pdfminer.high_level import extract_text
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.jobs import JobQueue, pending_html, register_job_routes, submit_response
+from common.lazy import LazyResource
+from common.llm_cache import ResponseCache
+from common.metrics import OPENAI_ERRORS, OPENAI_LATENCY, instrument_app
+from common.serving import add_serve_arguments, serve
+from common.tokens import count_message_tokens, fit_to_budget, prompt_budget, trim_to_tokens, usage
+
 # Load environment variables
 load_dotenv()
 
+# Most of the prompt budget goes to the resume; a pasted job description gets at most this share
+JOB_DESCRIPTION_SHARE = 0.25
+
 
 class ResumeOptimizer:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None):
         """Initialize the Resume Optimizer with LangChain."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set. Please set it in your environment or .env file.")
         
-        self.llm = ChatOpenAI(temperature=0.7)
+        self.llm = ChatOpenAI(temperature=0.7, max_tokens=2000)
+        self.cache = cache if cache is not None else ResponseCache.from_env("resume_optimizer")
         
         # Create prompt template for resume optimization
         self.prompt_template = ChatPromptTemplate.from_messages([
@@ -61,18 +76,155 @@ OPTIMIZED RESUME:
             raise Exception(f"Error extracting text from PDF: {e}")
 
     def optimize_resume(self, resume_text: str, job_role: str, job_description: str = "") -> str:
-        """Optimize the resume for the given job role."""
+        """Optimize the resume for the given job role.
+
+        The job description and resume are trimmed so the whole prompt fits the model's
+        token budget: the job description to at most JOB_DESCRIPTION_SHARE of the room
+        left by the template, the resume to whatever remains.
+        """
         try:
-            chain = self.prompt_template | self.llm
-            result = chain.invoke({
+            job_description = job_description or "Not provided"
+            model, max_tokens = self.llm.model_name, self.llm.max_tokens
+            available = prompt_budget(model, max_tokens) - count_message_tokens(
+                self._messages(resume_text="", job_role=job_role, job_description=""), model)
+            job_description = trim_to_tokens(job_description, max(1, int(available * JOB_DESCRIPTION_SHARE)), model)
+            resume_text = fit_to_budget(
+                resume_text, self._messages(resume_text="", job_role=job_role, job_description=job_description),
+                model, max_tokens)
+            inputs = {
                 "resume_text": resume_text,
                 "job_role": job_role,
-                "job_description": job_description or "Not provided"
-            })
-            return result.content if hasattr(result, 'content') else str(result)
+                "job_description": job_description
+            }
+            key = None
+            if self.cache.should_cache(self.llm.temperature):
+                key = self.cache.key_for(self.llm.model_name, self._messages(**inputs),
+                                         self.llm.temperature, self.llm.max_tokens)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached.content
+
+            chain = self.prompt_template | self.llm
+            try:
+                with OPENAI_LATENCY.time(tool="resume_optimizer", model=self.llm.model_name):
+                    result = chain.invoke(inputs)
+            except Exception as e:
+                OPENAI_ERRORS.labels("resume_optimizer", self.llm.model_name, type(e).__name__).inc()
+                raise
+            content = result.content if hasattr(result, 'content') else str(result)
+            token_usage = getattr(result, "response_metadata", {}).get("token_usage") or {}
+            usage.record("resume_optimizer", self.llm.model_name,
+                         token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0))
+            if key is not None:
+                self.cache.put(key, content, token_usage)
+            return content
         except Exception as e:
             raise Exception(f"Error optimizing resume: {e}")
 
+    def _messages(self, **inputs) -> list:
+        """The prompt for inputs as chat messages, for token counting and cache keys."""
+        roles = {"human": "user", "ai": "assistant"}
+        return [{"role": roles.get(m.type, m.type), "content": m.content}
+                for m in self.prompt_template.format_messages(**inputs)]
+
+
+def create_app():
+    """Build the web app; the optimizer is created on the first request.
+
+    Resumes are optimized by a background job queue, so requests return straight away.
+    """
+    from flask import Flask, request, render_template_string, jsonify
+    import werkzeug
+
+    app = Flask(__name__)
+    instrument_app(app, "resume_optimizer")
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+
+    optimizer = LazyResource(ResumeOptimizer, "resume_optimizer")
+    jobs = JobQueue.from_env("resume_optimizer")
+    register_job_routes(app, jobs)
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Resume Optimizer</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 1000px; margin: 50px auto; padding: 20px; }
+            form { display: flex; flex-direction: column; gap: 15px; }
+            input, textarea { padding: 10px; border: 1px solid #ddd; border-radius: 5px; }
+            input[type="file"] { padding: 5px; }
+            button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
+            button:hover { background: #0056b3; }
+            .result { margin-top: 30px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
+            .section { margin: 20px 0; padding: 15px; background: white; border-left: 4px solid #007bff; }
+        </style>
+    </head>
+    <body>
+        <h1>📄 Resume Optimizer</h1>
+        <form method="POST" enctype="multipart/form-data">
+            <input type="file" name="resume" accept=".pdf" required>
+            <input type="text" name="job_role" placeholder="Target Job Role (e.g., Software Engineer)" required>
+            <textarea name="job_description" placeholder="Job Description (optional)" rows="5"></textarea>
+            <button type="submit">Optimize Resume</button>
+        </form>
+        {% if result %}
+        <div class="result">
+            {{ result }}
+        </div>
+        {% endif %}
+        {% if pending %}{{ pending }}{% endif %}
+        {% if error %}
+        <div class="result" style="background: #f8d7da; color: #721c24;">
+            <strong>Error:</strong> {{ error }}
+        </div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    def prepare():
+        """Read the uploaded resume now and return the slow part (optimizing) as a job."""
+        if 'resume' not in request.files:
+            raise ValueError("No resume file provided")
+
+        file = request.files['resume']
+        job_role = request.form.get('job_role', '').strip()
+        job_description = request.form.get('job_description', '').strip()
+
+        if not job_role:
+            raise ValueError("Job role is required")
+
+        if file.filename == '':
+            raise ValueError("No file selected")
+
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as temp:
+            file.save(temp)
+            temp.flush()
+            resume_text = optimizer.get().extract_text_from_pdf(temp.name)
+        return lambda: optimizer.get().optimize_resume(resume_text, job_role, job_description)
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            try:
+                job_id = jobs.submit(prepare())
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+            return render_template_string(HTML_TEMPLATE, pending=pending_html(job_id))
+
+        return render_template_string(HTML_TEMPLATE)
+
+    @app.route('/jobs', methods=['POST'])
+    def create_job():
+        try:
+            job = prepare()
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+        return submit_response(jobs, job)
+
+    return app
+
 
 def main():
     parser = argparse.ArgumentParser(description="Optimize resumes for specific job roles")
@@ -81,92 +233,15 @@ def main():
     parser.add_argument("--description", "-d", type=str, default="", help="Job description (optional)")
     parser.add_argument("--output", "-o", type=str, help="Output file path (optional)")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string, jsonify
-        import werkzeug
-        
-        app = Flask(__name__)
-        app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-        
-        optimizer = ResumeOptimizer()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Resume Optimizer</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 1000px; margin: 50px auto; padding: 20px; }
-                form { display: flex; flex-direction: column; gap: 15px; }
-                input, textarea { padding: 10px; border: 1px solid #ddd; border-radius: 5px; }
-                input[type="file"] { padding: 5px; }
-                button { padding: 12px 24px; background: #007bff; color: white; border: none; cursor: pointer; }
-                button:hover { background: #0056b3; }
-                .result { margin-top: 30px; padding: 20px; background: #f8f9fa; border-radius: 5px; white-space: pre-wrap; }
-                .section { margin: 20px 0; padding: 15px; background: white; border-left: 4px solid #007bff; }
-            </style>
-        </head>
-        <body>
-            <h1>📄 Resume Optimizer</h1>
-            <form method="POST" enctype="multipart/form-data">
-                <input type="file" name="resume" accept=".pdf" required>
-                <input type="text" name="job_role" placeholder="Target Job Role (e.g., Software Engineer)" required>
-                <textarea name="job_description" placeholder="Job Description (optional)" rows="5"></textarea>
-                <button type="submit">Optimize Resume</button>
-            </form>
-            {% if result %}
-            <div class="result">
-                {{ result }}
-            </div>
-            {% endif %}
-            {% if error %}
-            <div class="result" style="background: #f8d7da; color: #721c24;">
-                <strong>Error:</strong> {{ error }}
-            </div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                if 'resume' not in request.files:
-                    return render_template_string(HTML_TEMPLATE, error="No resume file provided")
-                
-                file = request.files['resume']
-                job_role = request.form.get('job_role', '').strip()
-                job_description = request.form.get('job_description', '').strip()
-                
-                if not job_role:
-                    return render_template_string(HTML_TEMPLATE, error="Job role is required")
-                
-                if file.filename == '':
-                    return render_template_string(HTML_TEMPLATE, error="No file selected")
-                
-                try:
-                    # Save uploaded file temporarily
-                    temp_path = f"/tmp/{file.filename}"
-                    file.save(temp_path)
-                    
-                    # Extract text from PDF
-                    resume_text = optimizer.extract_text_from_pdf(temp_path)
-                    
-                    # Optimize resume
-                    result = optimizer.optimize_resume(resume_text, job_role, job_description)
-                    
-                    # Clean up
-                    os.remove(temp_path)
-                    
-                    return render_template_string(HTML_TEMPLATE, result=result)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
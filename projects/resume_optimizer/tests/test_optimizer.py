@@ -44,3 +44,20 @@ def test_extract_text_from_pdf_empty(mock_extract):
         with pytest.raises(ValueError, match="No text could be extracted"):
             optimizer.extract_text_from_pdf("test.pdf")
 
+
+
+def test_optimize_resume_trims_the_job_description_and_wraps_budget_errors():
+    """Test that a huge job description is trimmed and budget errors become the tool's error message."""
+    from common.tokens import PromptTooLargeError, count_tokens
+    seen = {}
+
+    def fit(text, template_messages, model, max_tokens):
+        seen["prompt"] = template_messages[-1]["content"]
+        raise PromptTooLargeError("Prompt template alone exceeds the budget")
+
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+        optimizer = ResumeOptimizer()
+        with patch('app.fit_to_budget', side_effect=fit):
+            with pytest.raises(Exception, match="Error optimizing resume: Prompt template alone"):
+                optimizer.optimize_resume("Resume", "Software Engineer", "Must know Python. " * 20000)
+    assert "[truncated]" in seen["prompt"] and count_tokens(seen["prompt"]) < 1500
@@ -4,10 +4,18 @@ Sentiment Classifier - Classifies text as Positive/Neutral/Negative
 """
 
 import argparse
+import sys
+from pathlib import Path
 import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch.nn.functional as F
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.metrics import MODEL_FORWARD, instrument_app
+from common.profiling import instrument_profiling
+from common.serving import add_serve_arguments, serve
+
 
 class SentimentClassifier:
     def __init__(self, model_name: str = "cardiffnlp/twitter-roberta-base-sentiment-latest"):
@@ -26,11 +34,12 @@ class SentimentClassifier:
     def classify(self, text: str) -> tuple:
         """Classify the sentiment of the given text."""
         # Tokenize and encode
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, 
-                               max_length=512, padding=True).to(self.device)
+        with MODEL_FORWARD.time(tool="sentiment_classifier", stage="tokenize"):
+            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, 
+                                   max_length=512, padding=True).to(self.device)
         
         # Get predictions
-        with torch.no_grad():
+        with torch.no_grad(), MODEL_FORWARD.time(tool="sentiment_classifier", stage="forward"):
             outputs = self.model(**inputs)
             logits = outputs.logits
             probabilities = F.softmax(logits, dim=-1)
@@ -43,6 +52,90 @@ class SentimentClassifier:
         return label, confidence
 
 
+def create_app(model_name: str = "cardiffnlp/twitter-roberta-base-sentiment-latest"):
+    """Build the web app; the model is loaded on the first request."""
+    from flask import Flask, request, render_template_string, jsonify
+
+    app = Flask(__name__)
+    instrument_app(app, "sentiment_classifier")
+    instrument_profiling(app, "sentiment_classifier")
+    classifier = LazyResource(lambda: SentimentClassifier(model_name), "sentiment_classifier")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Sentiment Classifier</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
+            textarea { width: 100%; height: 200px; margin: 10px 0; }
+            button { padding: 10px 20px; background: #007bff; color: white; border: none; cursor: pointer; }
+            button:hover { background: #0056b3; }
+            .result { margin-top: 20px; padding: 15px; border-radius: 5px; }
+            .positive { background: #d4edda; color: #155724; }
+            .negative { background: #f8d7da; color: #721c24; }
+            .neutral { background: #fff3cd; color: #856404; }
+        </style>
+    </head>
+    <body>
+        <h1>💬 Sentiment Classifier</h1>
+        <form method="POST">
+            <textarea name="text" placeholder="Enter text to analyze..."></textarea>
+            <br>
+            <button type="submit">Classify Sentiment</button>
+        </form>
+        {% if sentiment %}
+        <div class="result {{ sentiment.lower() }}">
+            <h2>Sentiment: {{ sentiment }}</h2>
+            <p>Confidence: {{ "%.2f"|format(confidence * 100) }}%</p>
+        </div>
+        {% endif %}
+        {% if error %}
+        <div class="result negative">
+            <strong>Error:</strong> {{ error }}
+        </div>
+        {% endif %}
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            text = request.form.get('text', '').strip()
+            if not text:
+                return render_template_string(HTML_TEMPLATE, error="Please enter some text")
+
+            try:
+                sentiment, confidence = classifier.get().classify(text)
+                return render_template_string(HTML_TEMPLATE, 
+                                            sentiment=sentiment, 
+                                            confidence=confidence)
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE, error=str(e))
+
+        return render_template_string(HTML_TEMPLATE)
+
+    @app.route('/api/classify', methods=['POST'])
+    def api_classify():
+        data = request.get_json()
+        text = data.get('text', '')
+        if not text:
+            return jsonify({'error': 'Text is required'}), 400
+
+        try:
+            sentiment, confidence = classifier.get().classify(text)
+            return jsonify({
+                'sentiment': sentiment,
+                'confidence': confidence,
+                'text': text
+            })
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    return app
+
+
 def main():
     parser = argparse.ArgumentParser(description="Classify text sentiment as Positive/Neutral/Negative")
     parser.add_argument("--text", "-t", type=str, help="Text to classify")
@@ -50,87 +143,15 @@ def main():
     parser.add_argument("--model", "-m", type=str, default="cardiffnlp/twitter-roberta-base-sentiment-latest",
                        help="Model to use for classification")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(lambda: create_app(args.model), args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string, jsonify
-        
-        app = Flask(__name__)
-        classifier = SentimentClassifier(args.model)
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Sentiment Classifier</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
-                textarea { width: 100%; height: 200px; margin: 10px 0; }
-                button { padding: 10px 20px; background: #007bff; color: white; border: none; cursor: pointer; }
-                button:hover { background: #0056b3; }
-                .result { margin-top: 20px; padding: 15px; border-radius: 5px; }
-                .positive { background: #d4edda; color: #155724; }
-                .negative { background: #f8d7da; color: #721c24; }
-                .neutral { background: #fff3cd; color: #856404; }
-            </style>
-        </head>
-        <body>
-            <h1>💬 Sentiment Classifier</h1>
-            <form method="POST">
-                <textarea name="text" placeholder="Enter text to analyze..."></textarea>
-                <br>
-                <button type="submit">Classify Sentiment</button>
-            </form>
-            {% if sentiment %}
-            <div class="result {{ sentiment.lower() }}">
-                <h2>Sentiment: {{ sentiment }}</h2>
-                <p>Confidence: {{ "%.2f"|format(confidence * 100) }}%</p>
-            </div>
-            {% endif %}
-            {% if error %}
-            <div class="result negative">
-                <strong>Error:</strong> {{ error }}
-            </div>
-            {% endif %}
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                text = request.form.get('text', '').strip()
-                if not text:
-                    return render_template_string(HTML_TEMPLATE, error="Please enter some text")
-                
-                try:
-                    sentiment, confidence = classifier.classify(text)
-                    return render_template_string(HTML_TEMPLATE, 
-                                                sentiment=sentiment, 
-                                                confidence=confidence)
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE, error=str(e))
-            
-            return render_template_string(HTML_TEMPLATE)
-        
-        @app.route('/api/classify', methods=['POST'])
-        def api_classify():
-            data = request.get_json()
-            text = data.get('text', '')
-            if not text:
-                return jsonify({'error': 'Text is required'}), 400
-            
-            try:
-                sentiment, confidence = classifier.classify(text)
-                return jsonify({
-                    'sentiment': sentiment,
-                    'confidence': confidence,
-                    'text': text
-                })
-            except Exception as e:
-                return jsonify({'error': str(e)}), 500
-        
+        app = create_app(args.model)
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
@@ -4,102 +4,370 @@ Text to Speech Converter - Converts text to natural-sounding speech
 """
 
 import argparse
+import io
 import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lazy import LazyResource
+from common.metrics import instrument_app
+from common.serving import add_serve_arguments, serve
+from common.singleflight import SingleFlight
+from audio_cache import AudioCache
+from longform import JOINABLE_FORMATS, joinable, sentence_units, split_text
+
 load_dotenv()
 
+MODEL = "tts-1"
+
+# Output formats of the speech endpoint and the content type each is served as
+AUDIO_FORMATS = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "aac": "audio/aac",
+    "flac": "audio/flac",
+    "wav": "audio/wav",
+    # Raw 24 kHz 16-bit little-endian mono samples
+    "pcm": "application/octet-stream",
+}
+
+# Texts longer than one chunk are synthesized long-form: split, in parallel, joined in order
+CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "1500"))
+# The first chunk is kept short so its audio starts playing while the rest is synthesized
+FIRST_CHUNK_CHARS = int(os.getenv("TTS_FIRST_CHUNK_CHARS", "300"))
+
+
 class TextToSpeech:
-    def __init__(self):
-        """Initialize the TTS converter."""
+    def __init__(self, workers: Optional[int] = None, cache: Optional[AudioCache] = None):
+        """Initialize the TTS converter; workers caps concurrent synthesis requests per long text."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not set")
         self.client = OpenAI(api_key=api_key)
         self.available_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
+        self.workers = workers or int(os.getenv("TTS_WORKERS", "4"))
+        self.cache = cache if cache is not None else AudioCache.from_env()
+        self._inflight = SingleFlight()
+        self.synthesized = 0
 
-    def convert(self, text: str, voice: str = "alloy", output_path: str = "output.mp3") -> str:
-        """Convert text to speech."""
+    def _check_voice(self, voice: str):
         if voice not in self.available_voices:
             raise ValueError(f"Voice must be one of: {', '.join(self.available_voices)}")
+
+    def _check_format(self, response_format: str):
+        if response_format not in AUDIO_FORMATS:
+            raise ValueError(f"Format must be one of: {', '.join(AUDIO_FORMATS)}")
+
+    def is_long(self, text: str) -> bool:
+        return len(text) > CHUNK_CHARS
+
+    def convert(self, text: str, voice: str = "alloy", output_path: str = "output.mp3",
+                response_format: Optional[str] = None) -> str:
+        """Convert text to speech; long texts are synthesized in parallel chunks.
+
+        The format defaults to the output file's extension, or mp3.
+        """
+        self._check_voice(voice)
+        if response_format is None:
+            suffix = Path(output_path).suffix.lstrip(".").lower()
+            response_format = suffix if suffix in AUDIO_FORMATS else "mp3"
+        self._check_format(response_format)
+        if self.is_long(text):
+            with open(output_path, "wb") as f:
+                for audio in self.stream_long(text, voice, response_format):
+                    f.write(audio)
+            return output_path
+        if self.cache.enabled:
+            with self.open_audio(text, voice, response_format) as audio, open(output_path, "wb") as f:
+                shutil.copyfileobj(audio, f)
+            return output_path
         
         response = self.client.audio.speech.create(
-            model="tts-1",
+            model=MODEL,
             voice=voice,
-            input=text
+            input=text,
+            response_format=response_format
         )
         
         response.stream_to_file(output_path)
         return output_path
 
+    def _request(self, text: str, voice: str, response_format: str) -> bytes:
+        response = self.client.audio.speech.create(
+            model=MODEL,
+            voice=voice,
+            input=text,
+            response_format=response_format
+        )
+        return response.content
+
+    def open_cached(self, text: str, voice: str = "alloy", response_format: str = "mp3") -> Optional[BinaryIO]:
+        """The cached audio for text as an open file, or None if it is not cached (or the cache is off)."""
+        self._check_format(response_format)
+        if not self.cache.enabled:
+            return None
+        return self.cache.open(AudioCache.key_for(text, voice, MODEL, response_format), response_format)
+
+    def audio_file(self, text: str, voice: str = "alloy", response_format: str = "mp3") -> Path:
+        """The cached audio file for text, synthesized on a miss; needs the cache enabled.
+
+        Concurrent misses for the same audio share one synthesis request. The file can
+        be evicted by another request at any time; use open_audio to read it.
+        """
+        self._check_format(response_format)
+        key = AudioCache.key_for(text, voice, MODEL, response_format)
+        path = self.cache.get(key, response_format)
+        if path is not None:
+            return path
+
+        def synthesize():
+            self.synthesized += 1
+            return self.cache.put(key, response_format, self._request(text, voice, response_format))
+
+        return self._inflight.do(key, synthesize)
+
+    def open_audio(self, text: str, voice: str = "alloy", response_format: str = "mp3") -> BinaryIO:
+        """The audio for text as an open file, from the cache or synthesized on a miss.
+
+        A file evicted between lookup and open is looked up (and synthesized) again.
+        """
+        for _ in range(2):
+            try:
+                return open(self.audio_file(text, voice, response_format), "rb")
+            except FileNotFoundError:
+                continue
+        return io.BytesIO(self._request(text, voice, response_format))
+
+    def _synthesize(self, text: str, voice: str, response_format: str) -> bytes:
+        if self.cache.enabled:
+            with self.open_audio(text, voice, response_format) as f:
+                audio = f.read()
+        else:
+            audio = self._request(text, voice, response_format)
+        return joinable(audio, response_format)
+
+    def stream(self, text: str, voice: str = "alloy", response_format: str = "mp3") -> Iterator[bytes]:
+        """Audio for text as byte chunks, passed on as they arrive from the API.
+
+        The upstream request is opened before this returns, so errors are raised here
+        rather than halfway through a response. Long texts go through stream_long, whose
+        first chunk is synthesized before this returns for the same reason; with the
+        cache on, the streamed audio is also stored once it is complete.
+        """
+        self._check_voice(voice)
+        self._check_format(response_format)
+        if self.is_long(text):
+            audio = self.stream_long(text, voice, response_format)
+            return _primed(next(audio, b""), audio)
+        stack = ExitStack()
+        response = stack.enter_context(self.client.audio.speech.with_streaming_response.create(
+            model=MODEL,
+            voice=voice,
+            input=text,
+            response_format=response_format
+        ))
+        key = AudioCache.key_for(text, voice, MODEL, response_format) if self.cache.enabled else None
+        return self._relay(stack, response, key, response_format)
+
+    def _relay(self, stack: ExitStack, response, key: Optional[str], response_format: str) -> Iterator[bytes]:
+        with stack:
+            parts = []
+            for data in response.iter_bytes():
+                if key is not None:
+                    parts.append(data)
+                yield data
+            if key is not None:
+                self.synthesized += 1
+                self.cache.put(key, response_format, b"".join(parts))
+
+    def stream_long(self, text: str, voice: str = "alloy", response_format: str = "mp3") -> Iterator[bytes]:
+        """Synthesize text chunk by chunk, yielding each chunk's audio in order as soon as it is ready.
+
+        Chunks break at sentence and paragraph boundaries; up to self.workers are
+        synthesized at once. The audio is joined by appending bytes, never re-encoded.
+        With the cache enabled, sentences already cached on their own are reused and
+        the sentences between them are packed into chunks the same way, so a text
+        that shares sentences with earlier ones only pays for the new ones, in as
+        few requests as without the cache.
+        """
+        self._check_voice(voice)
+        if response_format not in JOINABLE_FORMATS:
+            raise ValueError(f"Long-form audio can only be joined for: {', '.join(JOINABLE_FORMATS)}")
+        if self.cache.enabled:
+            chunks = self._plan_chunks(text, voice, response_format)
+        else:
+            chunks = split_text(text, CHUNK_CHARS, FIRST_CHUNK_CHARS)
+        return self._stream_chunks(chunks, voice, response_format)
+
+    def _plan_chunks(self, text: str, voice: str, response_format: str) -> List[str]:
+        """Cached sentences as chunks of their own; each run of uncached ones packed like split_text.
+
+        Runs are cached as whole chunks, and the same text gives the same runs again.
+        """
+        chunks, run = [], []
+
+        def flush():
+            if run:
+                chunks.extend(split_text(" ".join(run), CHUNK_CHARS, CHUNK_CHARS if chunks else FIRST_CHUNK_CHARS))
+                run.clear()
+
+        for sentence in sentence_units(text):
+            if self.cache.contains(AudioCache.key_for(sentence, voice, MODEL, response_format), response_format):
+                flush()
+                chunks.append(sentence)
+            else:
+                run.append(sentence)
+        flush()
+        return chunks
+
+    def _stream_chunks(self, chunks, voice: str, response_format: str) -> Iterator[bytes]:
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(chunks))))
+        try:
+            # Submitted in order, so the first chunk is synthesized first
+            futures = [pool.submit(self._synthesize, chunk, voice, response_format) for chunk in chunks]
+            for future in futures:
+                yield future.result()
+        finally:
+            # A client that disconnects stops the chunks not yet started
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def warm(self, phrases: Iterable[str], voice: str = "alloy", response_format: str = "mp3") -> dict:
+        """Synthesize any phrases not yet cached, in parallel, so later requests for them are hits.
+
+        Long phrases are warmed sentence by sentence, the way they are looked up.
+        """
+        self._check_voice(voice)
+        if not self.cache.enabled:
+            raise ValueError("The audio cache is disabled (set TTS_CACHE_ENABLED=1)")
+        units = list(dict.fromkeys(unit for phrase in phrases if phrase.strip()
+                                   for unit in (sentence_units(phrase) if self.is_long(phrase) else [phrase])))
+        synthesized = self.synthesized
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(lambda unit: self.audio_file(unit, voice, response_format), units))
+        return {"phrases": len(units), "synthesized": self.synthesized - synthesized}
+
+
+def _primed(first: bytes, rest: Iterator[bytes]) -> Iterator[bytes]:
+    """An already-pulled first chunk followed by the rest; closing it closes rest too."""
+    yield first
+    yield from rest
+
+
+def create_app():
+    """Build the web app; the TTS client is created on the first request."""
+    from flask import Flask, Response, request, render_template_string, send_file, stream_with_context
+
+    app = Flask(__name__)
+    instrument_app(app, "text_to_speech")
+    tts = LazyResource(TextToSpeech, "text_to_speech")
+
+    HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Text to Speech Converter</title>
+        <style>
+            body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
+            textarea { width: 100%; height: 200px; margin: 10px 0; }
+            select, button { padding: 10px; margin: 5px; }
+            button { background: #007bff; color: white; border: none; cursor: pointer; }
+        </style>
+    </head>
+    <body>
+        <h1>🔊 Text to Speech Converter</h1>
+        <form method="POST">
+            <textarea name="text" placeholder="Enter text to convert..." required></textarea>
+            <select name="voice">
+                <option value="alloy">Alloy</option>
+                <option value="echo">Echo</option>
+                <option value="fable">Fable</option>
+                <option value="onyx">Onyx</option>
+                <option value="nova">Nova</option>
+                <option value="shimmer">Shimmer</option>
+            </select>
+            <select name="format">
+                <option value="mp3">MP3</option>
+                <option value="opus">Opus</option>
+                <option value="pcm">PCM (24 kHz, 16-bit)</option>
+            </select>
+            <button type="submit">Convert to Speech</button>
+        </form>
+    </body>
+    </html>
+    """
+
+    @app.route('/', methods=['GET', 'POST'])
+    def index():
+        if request.method == 'POST':
+            text = request.form.get('text', '')
+            voice = request.form.get('voice', 'alloy')
+            response_format = request.form.get('format', 'mp3')
+            try:
+                download_name = f"speech.{response_format}"
+                cached = None if tts.get().is_long(text) else tts.get().open_cached(text, voice, response_format)
+                if cached is not None:
+                    # Served from the open cache file (sendfile where the server supports it), so an
+                    # eviction by another request cannot remove it mid-response
+                    return send_file(cached, mimetype=AUDIO_FORMATS[response_format],
+                                     as_attachment=True, download_name=download_name)
+                # Relayed chunk by chunk as the API produces it; nothing is written to disk first
+                audio = tts.get().stream(text, voice, response_format)
+                return Response(stream_with_context(audio), mimetype=AUDIO_FORMATS[response_format],
+                                headers={"Content-Disposition": f"attachment; filename={download_name}"})
+            except Exception as e:
+                return render_template_string(HTML_TEMPLATE + f"<p style='color:red;'>Error: {e}</p>")
+        return render_template_string(HTML_TEMPLATE)
+
+    return app
+
 
 def main():
     parser = argparse.ArgumentParser(description="Convert text to speech")
     parser.add_argument("--text", "-t", type=str, help="Text to convert")
+    parser.add_argument("--file", "-f", type=str, help="Read the text to convert from a file")
     parser.add_argument("--voice", "-v", type=str, default="alloy", 
                        help=f"Voice option: {', '.join(['alloy', 'echo', 'fable', 'onyx', 'nova', 'shimmer'])}")
     parser.add_argument("--output", "-o", type=str, default="output.mp3", help="Output file path")
+    parser.add_argument("--format", type=str, choices=list(AUDIO_FORMATS),
+                        help="Audio format (default: from the output file's extension, else mp3)")
+    parser.add_argument("--warm", type=str, help="Pre-synthesize the phrases in a file (one per line) into the cache")
     parser.add_argument("--web", action="store_true", help="Run as web server")
+    add_serve_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.serve:
+        return serve(create_app, args)
+    
     if args.web:
-        from flask import Flask, request, render_template_string, send_file
-        
-        app = Flask(__name__)
-        tts = TextToSpeech()
-        
-        HTML_TEMPLATE = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Text to Speech Converter</title>
-            <style>
-                body { font-family: Arial, sans-serif; max-width: 800px; margin: 50px auto; padding: 20px; }
-                textarea { width: 100%; height: 200px; margin: 10px 0; }
-                select, button { padding: 10px; margin: 5px; }
-                button { background: #007bff; color: white; border: none; cursor: pointer; }
-            </style>
-        </head>
-        <body>
-            <h1>🔊 Text to Speech Converter</h1>
-            <form method="POST">
-                <textarea name="text" placeholder="Enter text to convert..." required></textarea>
-                <select name="voice">
-                    <option value="alloy">Alloy</option>
-                    <option value="echo">Echo</option>
-                    <option value="fable">Fable</option>
-                    <option value="onyx">Onyx</option>
-                    <option value="nova">Nova</option>
-                    <option value="shimmer">Shimmer</option>
-                </select>
-                <button type="submit">Convert to Speech</button>
-            </form>
-        </body>
-        </html>
-        """
-        
-        @app.route('/', methods=['GET', 'POST'])
-        def index():
-            if request.method == 'POST':
-                text = request.form.get('text', '')
-                voice = request.form.get('voice', 'alloy')
-                try:
-                    output_path = tts.convert(text, voice, f"/tmp/output_{voice}.mp3")
-                    return send_file(output_path, as_attachment=True, download_name="speech.mp3")
-                except Exception as e:
-                    return render_template_string(HTML_TEMPLATE + f"<p style='color:red;'>Error: {e}</p>")
-            return render_template_string(HTML_TEMPLATE)
-        
+        app = create_app()
         print("🌐 Web server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
     
-    elif args.text:
+    elif args.warm:
+        try:
+            tts = TextToSpeech()
+            phrases = Path(args.warm).read_text(encoding="utf-8").splitlines()
+            print(f"🔥 Warming the audio cache...")
+            result = tts.warm(phrases, args.voice, args.format or "mp3")
+            print(f"✅ {result['phrases']} phrases cached, {result['synthesized']} newly synthesized")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+
+    elif args.text or args.file:
         try:
+            text = Path(args.file).read_text(encoding="utf-8") if args.file else args.text
             tts = TextToSpeech()
             print(f"🔊 Converting text to speech...")
-            output = tts.convert(args.text, args.voice, args.output)
+            output = tts.convert(text, args.voice, args.output, args.format)
             print(f"✅ Audio saved to {output}")
         except Exception as e:
             print(f"❌ Error: {e}")
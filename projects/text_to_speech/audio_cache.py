@@ -0,0 +1,151 @@
+"""
+Audio Cache - Content-addressed on-disk store of synthesized speech with LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+DEFAULT_CACHE_DIR = str(Path.home() / ".cache" / "mini-ai-labs" / "tts_audio")
+
+
+def normalize(text: str) -> str:
+    """Unicode NFC with whitespace collapsed, so layout-only differences share an entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class AudioCache:
+    def __init__(self, directory: Optional[str] = DEFAULT_CACHE_DIR, max_bytes: int = 512 * 1024 * 1024):
+        """Audio files named by the hash of what produced them. Set directory to None to disable.
+
+        Entries are plain files so they can be served straight from disk. Once the
+        files add up to more than max_bytes, the least recently used are deleted;
+        a hit refreshes the file's mtime, so recency survives restarts.
+        """
+        self.directory = Path(directory) if directory else None
+        self.max_bytes = max_bytes
+        self._entries: Optional[OrderedDict] = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "AudioCache":
+        """Read TTS_CACHE_ENABLED (off by default), TTS_CACHE_DIR and TTS_CACHE_MAX_MB."""
+        enabled = os.getenv("TTS_CACHE_ENABLED", "").strip().lower() in ("1", "true", "yes", "on")
+        return cls(os.getenv("TTS_CACHE_DIR", DEFAULT_CACHE_DIR) if enabled else None,
+                   int(float(os.getenv("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024))
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    @staticmethod
+    def key_for(text: str, voice: str, model: str, response_format: str) -> str:
+        """Hash everything that determines the audio."""
+        payload = json.dumps([normalize(text), voice, model, response_format], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str, response_format: str) -> Path:
+        return self.directory / key[:2] / f"{key}.{response_format}"
+
+    def _index(self) -> OrderedDict:
+        """Scan the directory on first use: {path: size}, least recently used first."""
+        if self._entries is None:
+            files = []
+            if self.directory.exists():
+                for path in self.directory.glob("*/*.*"):
+                    if path.suffix == ".part":
+                        continue
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, path, stat.st_size))
+            files.sort()
+            self._entries = OrderedDict((path, size) for _, path, size in files)
+            self._size = sum(self._entries.values())
+        return self._entries
+
+    def get(self, key: str, response_format: str) -> Optional[Path]:
+        """The cached file for key, or None on a miss."""
+        path = self.path_for(key, response_format)
+        with self._lock:
+            entries = self._index()
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # Evicted by another process sharing the directory
+                if path in entries:
+                    self._size -= entries.pop(path)
+                self.misses += 1
+                return None
+            if path not in entries:
+                entries[path] = path.stat().st_size
+                self._size += entries[path]
+            entries.move_to_end(path)
+            self.hits += 1
+            return path
+
+    def contains(self, key: str, response_format: str) -> bool:
+        """Whether key is cached, without counting a lookup or refreshing its recency."""
+        return self.path_for(key, response_format).exists()
+
+    def open(self, key: str, response_format: str) -> Optional[BinaryIO]:
+        """The cached file for key, opened for reading, or None on a miss.
+
+        An open file stays readable even if put() evicts it a moment later, which a
+        path returned by get() does not.
+        """
+        path = self.get(key, response_format)
+        if path is None:
+            return None
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, response_format: str, data: bytes) -> Path:
+        """Store audio atomically and evict old entries past the size limit."""
+        path = self.path_for(key, response_format)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            entries = self._index()
+            self._size += len(data) - entries.pop(path, 0)
+            entries[path] = len(data)
+            while self._size > self.max_bytes and len(entries) > 1:
+                old, size = entries.popitem(last=False)
+                self._size -= size
+                self.evictions += 1
+                try:
+                    old.unlink()
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._index()) if self.enabled else 0
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": self._size,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,126 @@
+"""
+Long-form - Split long text into speech-sized chunks and join their audio without re-encoding
+"""
+
+import re
+from typing import List
+
+# The speech endpoint accepts at most this many characters per request
+MAX_INPUT_CHARS = 4096
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# A sentence runs to its closing punctuation (plus closing quotes or brackets) followed by whitespace
+SENTENCE = re.compile(r"\S.*?(?:[.!?…]+[\"'”’)\]]*(?=\s|\Z)|[。！？]+|\Z)", re.DOTALL)
+
+# Formats whose streams can be joined by appending bytes: MP3 and ADTS AAC are sequences of
+# self-contained frames, raw PCM has no framing, and Ogg Opus files chain into one valid stream
+JOINABLE_FORMATS = ("mp3", "aac", "opus", "pcm")
+
+MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),   # MPEG-1 Layer III
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),        # MPEG-2 Layer III
+}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def split_sentences(text: str) -> List[List[str]]:
+    """The sentences of each paragraph."""
+    paragraphs = [p.strip() for p in PARAGRAPH_BREAK.split(text)]
+    return [[s.strip() for s in SENTENCE.findall(p)] for p in paragraphs if p]
+
+
+def _split_long(sentence: str, limit: int) -> List[str]:
+    """Split a sentence longer than limit at spaces, or anywhere if a single word is too long."""
+    pieces, current = [], ""
+    for word in sentence.split():
+        while len(word) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:limit])
+            word = word[limit:]
+        if current and len(current) + 1 + len(word) > limit:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_text(text: str, max_chars: int = 1500, first_chars: int = 300) -> List[str]:
+    """Pack sentences into chunks of at most max_chars, never splitting inside a sentence if avoidable.
+
+    The first chunk is capped at first_chars so its audio is back (and playing) quickly
+    while the larger chunks after it are still being synthesized.
+    """
+    chunks, current = [], ""
+    for paragraph in split_sentences(text):
+        for index, sentence in enumerate(paragraph):
+            limit = min(first_chars if not chunks else max_chars, MAX_INPUT_CHARS)
+            joiner = " " if index else "\n\n"
+            for piece in _split_long(sentence, limit) if len(sentence) > limit else [sentence]:
+                if current and len(current) + len(joiner) + len(piece) > limit:
+                    chunks.append(current)
+                    current = ""
+                    limit = min(max_chars, MAX_INPUT_CHARS)
+                current = f"{current}{joiner}{piece}" if current else piece
+                joiner = " "
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def sentence_units(text: str) -> List[str]:
+    """Every sentence on its own, over-long ones split to fit the API limit."""
+    return [piece for paragraph in split_sentences(text) for sentence in paragraph
+            for piece in (_split_long(sentence, MAX_INPUT_CHARS) if len(sentence) > MAX_INPUT_CHARS else [sentence])]
+
+
+def _id3_length(data: bytes) -> int:
+    """Size of a leading ID3v2 tag, header and footer included."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] & 0x7f) << 21 | (data[7] & 0x7f) << 14 | (data[8] & 0x7f) << 7 | (data[9] & 0x7f)
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def _mp3_frame_length(header: bytes) -> int:
+    """Length of the Layer III frame starting with this 4-byte header; 0 if it is not one."""
+    if len(header) < 4 or header[0] != 0xff or header[1] & 0xe0 != 0xe0 or (header[1] >> 1) & 3 != 1:
+        return 0
+    version = (header[1] >> 3) & 3
+    bitrate_index, rate_index = header[2] >> 4, (header[2] >> 2) & 3
+    if version == 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return 0
+    bitrate = MP3_BITRATES[3 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 1
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+
+def strip_mp3_headers(data: bytes) -> bytes:
+    """Drop the ID3 tag and the Xing/Info frame an encoder puts in front of the audio frames.
+
+    The Xing frame holds the frame count of that one file, so left in place it would
+    make players show the wrong duration for the joined stream.
+    """
+    data = data[_id3_length(data):]
+    length = _mp3_frame_length(data[:4])
+    if length and (b"Xing" in data[4:48] or b"Info" in data[4:48]):
+        data = data[length:]
+    return data
+
+
+def joinable(data: bytes, response_format: str) -> bytes:
+    """A chunk's audio made ready to append to the chunks before it, byte for byte.
+
+    Only container headers are removed, so nothing is decoded or re-encoded.
+    """
+    if response_format not in JOINABLE_FORMATS:
+        raise ValueError(f"Long-form audio can only be joined for: {', '.join(JOINABLE_FORMATS)}")
+    if response_format == "mp3":
+        return strip_mp3_headers(data)
+    return data
+
@@ -0,0 +1,62 @@
+"""Tests for the content-addressed audio cache"""
+from app import TextToSpeech
+from audio_cache import AudioCache
+
+
+def test_keys_and_lru_eviction(tmp_path):
+    """Test that keys ignore layout, and the least recently used files go first past the size limit."""
+    assert AudioCache.key_for("Press  one\nfor sales.", "alloy", "tts-1", "mp3") == \
+        AudioCache.key_for("Press one for sales. ", "alloy", "tts-1", "mp3")
+    assert AudioCache.key_for("Press one", "alloy", "tts-1", "mp3") != \
+        AudioCache.key_for("Press one", "nova", "tts-1", "mp3")
+
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+    for name in "abc":
+        cache.put(name * 64, "mp3", b"x" * 100)
+    assert cache.get("a" * 64, "mp3") is None
+    assert cache.get("b" * 64, "mp3").read_bytes() == b"x" * 100
+
+    # "b" was just used, so adding "d" evicts "c"
+    cache.put("d" * 64, "mp3", b"x" * 100)
+    assert cache.get("c" * 64, "mp3") is None
+    assert cache.get("b" * 64, "mp3") is not None
+    # A new instance rebuilds the index from the files on disk
+    assert AudioCache(str(tmp_path)).stats()["entries"] == 2
+
+
+def test_long_texts_reuse_cached_sentences(monkeypatch, tmp_path):
+    """Test that warmed phrases and already seen sentences are not synthesized again."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr("app.CHUNK_CHARS", 60)
+    tts = TextToSpeech(cache=AudioCache(str(tmp_path)))
+    requests = []
+
+    def request(text, voice, response_format):
+        requests.append(text)
+        return b"\xff\xfb\x90\x64" + text.encode()
+
+    monkeypatch.setattr(tts, "_request", request)
+    assert tts.warm(["Welcome to the help line.", "Press one for sales."]) == {"phrases": 2, "synthesized": 2}
+    assert tts.warm(["Welcome to the help line."])["synthesized"] == 0
+
+    text = ("Welcome to the help line. Your call is important to us. Please stay on the line. "
+            "Press one for sales.")
+    audio = b"".join(tts.stream_long(text, "alloy"))
+    # The two new sentences between cached ones cost one request, not one each
+    assert requests[2:] == ["Your call is important to us. Please stay on the line."]
+    assert audio.count(b"\xff\xfb\x90\x64") == 3
+    assert audio.index(b"Welcome") < audio.index(b"Your call") < audio.index(b"Press one")
+    b"".join(tts.stream_long(text, "alloy"))
+    assert len(requests) == 3
+
+    # A cached file evicted between lookup and read is synthesized again instead of failing
+    path = tts.audio_file("Press one for sales.")
+    monkeypatch.setattr(tts, "audio_file", lambda *args: path)
+    path.unlink()
+    with tts.open_audio("Press one for sales.") as f:
+        assert f.read().endswith(b"Press one for sales.")
+
+    tts = TextToSpeech(cache=AudioCache(str(tmp_path)))
+    monkeypatch.setattr(tts, "_request", request)
+    tts.convert("Welcome to the help line.", "alloy", str(tmp_path / "out.mp3"))
+    assert len(requests) == 4 and (tmp_path / "out.mp3").read_bytes().endswith(b"help line.")
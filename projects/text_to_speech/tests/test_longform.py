@@ -0,0 +1,41 @@
+"""Tests for long-form text splitting and audio joining"""
+from app import CHUNK_CHARS, FIRST_CHUNK_CHARS, TextToSpeech
+from longform import MAX_INPUT_CHARS, joinable, split_text
+
+# A silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz) and a Xing header frame of the same size
+FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+XING = b"\xff\xfb\x90\x64" + b"\x00" * 32 + b"Xing" + b"\x00" * 377
+
+
+def test_split_text_keeps_sentences_whole():
+    """Test that chunks break between sentences, stay under the limits and lose no text."""
+    sentences = [f"This is sentence number {i}, which says something." for i in range(100)]
+    text = " ".join(sentences[:50]) + "\n\n" + " ".join(sentences[50:])
+    chunks = split_text(text, max_chars=500, first_chars=120)
+
+    assert len(chunks[0]) <= 120
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+    # A single run-on "sentence" is still split to fit the API limit
+    assert all(len(chunk) <= MAX_INPUT_CHARS for chunk in split_text("word " * 5000, max_chars=10_000))
+
+
+def test_stream_long_joins_chunks_in_order(monkeypatch):
+    """Test that chunks are synthesized concurrently but yielded in order, without per-file headers."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    tts = TextToSpeech(workers=4)
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x05" + b"TAG!!"
+    text = " ".join(f"Sentence {i} says a few words about the topic at hand." for i in range(200))
+    chunks = split_text(text, CHUNK_CHARS, FIRST_CHUNK_CHARS)
+
+    def synthesize(chunk, voice, response_format):
+        # Later chunks come back with more frames, so the order is visible in the output
+        return joinable(id3 + XING + FRAME * (chunks.index(chunk) + 1), response_format)
+
+    monkeypatch.setattr(tts, "_synthesize", synthesize)
+    audio = list(tts.stream_long(text, "alloy"))
+
+    assert len(chunks) > 3
+    assert [len(chunk) // len(FRAME) for chunk in audio] == list(range(1, len(chunks) + 1))
+    assert all(chunk == FRAME * (len(chunk) // len(FRAME)) for chunk in audio)
@@ -0,0 +1,81 @@
+"""Tests for streaming speech to the web client"""
+from contextlib import contextmanager
+from unittest.mock import Mock
+
+import pytest
+
+from app import TextToSpeech, create_app
+
+
+def fake_upstream(calls):
+    """Stand in for the streaming speech endpoint, recording each request and the bytes handed out."""
+    @contextmanager
+    def create(**params):
+        calls.append(params)
+        response = Mock()
+
+        def iter_bytes():
+            for i in range(3):
+                calls.append(f"chunk {i}")
+                yield f"<{params['response_format']} {i}>".encode()
+        response.iter_bytes = iter_bytes
+        yield response
+    return create
+
+
+def test_stream_relays_upstream_chunks_as_they_arrive(monkeypatch):
+    """Test that chunks are passed on one by one, in the requested format, without waiting for the rest."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    tts = TextToSpeech()
+    calls = []
+    monkeypatch.setattr(tts.client.audio.speech.with_streaming_response, "create", fake_upstream(calls))
+
+    audio = tts.stream("Hello there.", "nova", "opus")
+    assert calls[0]["response_format"] == "opus"
+    assert next(audio) == b"<opus 0>"
+    assert calls[1:] == ["chunk 0"]
+    assert list(audio) == [b"<opus 1>", b"<opus 2>"]
+
+
+def test_web_handler_streams_the_selected_format(monkeypatch):
+    """Test that the web handler streams audio with the right content type and rejects unknown formats."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("TTS_CACHE_ENABLED", raising=False)
+    calls = []
+    original = TextToSpeech.__init__
+
+    def init(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        self.client.audio.speech.with_streaming_response.create = fake_upstream(calls)
+
+    monkeypatch.setattr(TextToSpeech, "__init__", init)
+    client = create_app().test_client()
+
+    response = client.post("/", data={"text": "Hello there.", "voice": "alloy", "format": "pcm"})
+    assert response.status_code == 200
+    assert response.mimetype == "application/octet-stream"
+    assert response.headers["Content-Disposition"] == "attachment; filename=speech.pcm"
+    assert response.data == b"<pcm 0><pcm 1><pcm 2>"
+
+    response = client.post("/", data={"text": "Hello there.", "voice": "alloy", "format": "../x"})
+    assert b"Format must be one of" in response.data
+
+
+def test_long_text_errors_are_raised_before_the_response_starts(monkeypatch):
+    """Test that a failing first chunk raises from stream() and gives the error page, not a 200 with no audio."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("TTS_CACHE_ENABLED", raising=False)
+    text = " ".join(f"Sentence {i} says a few words about the topic at hand." for i in range(200))
+
+    def synthesize(self, chunk, voice, response_format):
+        raise RuntimeError("Rate limit reached")
+
+    monkeypatch.setattr(TextToSpeech, "_synthesize", synthesize)
+    tts = TextToSpeech()
+    assert tts.is_long(text)
+    with pytest.raises(RuntimeError, match="Rate limit"):
+        tts.stream(text, "alloy", "mp3")
+
+    response = create_app().test_client().post("/", data={"text": text, "voice": "alloy", "format": "mp3"})
+    assert response.mimetype == "text/html"
+    assert b"Error: Rate limit reached" in response.data